@@ -1,19 +1,21 @@
 from flask import Flask, request, jsonify
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, create_refresh_token
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, create_refresh_token, decode_token
 from flask_migrate import Migrate
 import os
 import logging
 import json
 import threading
 import time
+import uuid
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import pandas as pd
+import schedule
 import numpy as np
-from sklearn.ensemble import IsolationForest
 from collections import defaultdict, deque
+from sqlalchemy import or_
 
 from config import config
 from models import db, bcrypt, User, Device, SensorData, Alert, UserSession, MaintenanceLog, SystemMetrics
@@ -21,6 +23,25 @@ from services.analytics_service import AnalyticsService
 from services.alert_service import AlertService
 from services.notification_service import NotificationService
 from services.auth_service import AuthService
+from services.cache_service import AnalyticsCache
+from services.maintenance_job import MaintenanceBatchJob
+from services.anomaly_models import AnomalyModelService
+from services.streaming_detectors import StreamingDetectorService
+from services.thermal_exposure import ThermalExposureEngine
+from services.uptime_tracker import UptimeTracker
+from services.analytics_jobs import AnalyticsJobService, JobQueueFull
+from services.geo_index import GeoIndex
+from services.downsampling import METHODS as DOWNSAMPLING_METHODS
+from services.history_service import SensorHistoryService
+from services.columnar import columnar_query
+from services.alert_rules import AlertRuleEngine
+from services.duration_rules import DurationRuleEngine
+from services.heartbeat_watchdog import HeartbeatWatchdog
+from services.alert_suppression import AlertSuppressor
+from services.escalation_scheduler import EscalationScheduler, escalation_roles
+from services.alert_resolution import AlertResolver
+from services.incident_correlation import IncidentCorrelator, SEVERITY_RANK, incident_from_alerts
+from services.rule_backtest import RuleBacktester
 
 def create_app(config_name: str = 'development') -> Flask:
     """Create and configure Flask application"""
@@ -71,14 +92,51 @@ socketio = SocketIO(
 devices_data = {}
 connected_clients = set()
 device_rooms = defaultdict(set)
+device_sessions = {}  # socket sid -> device_id
 alert_history = deque(maxlen=1000)
 performance_metrics = defaultdict(lambda: deque(maxlen=100))
 
 # Initialize services
-analytics_service = AnalyticsService()
+analytics_service = AnalyticsService(trend_windows=app.config['TREND_WINDOWS'],
+                                     maintenance_max_age_hours=app.config['MAINTENANCE_MAX_AGE_HOURS'])
 alert_service = AlertService()
 notification_service = NotificationService(socketio)
 auth_service = AuthService()
+analytics_cache = AnalyticsCache.from_config(app.config)
+maintenance_job = MaintenanceBatchJob(workers=app.config.get('MAINTENANCE_JOB_WORKERS') or None)
+anomaly_models = AnomalyModelService(
+    contamination=app.config['ANOMALY_MODEL_CONTAMINATION'],
+    history_hours=app.config['ANOMALY_MODEL_HISTORY_HOURS']
+)
+streaming_detectors = StreamingDetectorService()
+thermal_exposure = ThermalExposureEngine(bucket_minutes=app.config['EXPOSURE_BUCKET_MINUTES'])
+heartbeat_watchdog = HeartbeatWatchdog()
+uptime_tracker = UptimeTracker(heartbeat_watchdog, heartbeat_timeout_seconds=app.config['HEARTBEAT_TIMEOUT_SECONDS'])
+geo_index = GeoIndex(precision=app.config['GEO_INDEX_PRECISION'])
+history_service = SensorHistoryService()
+
+def user_room(identity: Any) -> str:
+    """Socket room joined by every authenticated connection of a user"""
+    return f'user:{identity}'
+
+def notify_job_complete(job: Dict[str, Any]) -> None:
+    """Tell the submitting user's socket clients that their analytics job finished"""
+    if job['owner'] is not None:
+        socketio.emit('analytics_job_complete', {
+            'job_id': job['job_id'],
+            'type': job['type'],
+            'status': job['status']
+        }, room=user_room(job['owner']))
+
+analytics_jobs = AnalyticsJobService(
+    app,
+    workers=app.config['ANALYTICS_JOB_WORKERS'],
+    max_queue=app.config['ANALYTICS_JOB_QUEUE_SIZE'],
+    result_ttl=app.config['ANALYTICS_JOB_RESULT_TTL'],
+    on_complete=notify_job_complete
+)
+
+SENSOR_BATCH_FIELDS = ('temperature', 'humidity', 'battery_level', 'door_open', 'power_status', 'signal_strength')
 
 class VitalTraceBackend:
     """Enhanced backend service for Vital Trace IoT monitoring"""
@@ -86,48 +144,108 @@ class VitalTraceBackend:
     def __init__(self):
         self.devices = {}
         self.real_time_data = {}
-        self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
         self.data_buffer = defaultdict(lambda: deque(maxlen=50))
         self.alert_rules = self._initialize_alert_rules()
+        self.rule_engine = AlertRuleEngine(self.alert_rules)
+        self.duration_rules = DurationRuleEngine(self.alert_rules)
+        self.suppressor = AlertSuppressor.from_config(app.config, self.alert_rules)
+        self.escalations = EscalationScheduler(
+            self.alert_rules,
+            retry_seconds=app.config['ESCALATION_RETRY_SECONDS'],
+            max_attempts=app.config['ESCALATION_MAX_ATTEMPTS']
+        )
+        self.resolver = AlertResolver()
+        self.correlator = IncidentCorrelator(
+            window_seconds=app.config['INCIDENT_WINDOW_SECONDS'],
+            radius_km=app.config['INCIDENT_RADIUS_KM'],
+            renotify_factor=app.config['INCIDENT_RENOTIFY_FACTOR']
+        )
         self.performance_tracker = {}
         
     def _initialize_alert_rules(self) -> Dict[str, Dict[str, Any]]:
-        """Initialize alert rules for different scenarios"""
+        """Initialize alert rules for different scenarios
+        
+        Threshold rules take ``param`` (a device attribute) plus ``offset`` when the
+        device has it, else the fixed ``threshold``. Rules in one ``group`` are
+        exclusive and checked in order, so keep the most severe first.
+        """
         return {
+            'temperature_critical': {
+                'field': 'temperature',
+                'op': '>',
+                'param': 'target_temp_max',
+                'offset': 2.0,
+                'threshold': 10.0,
+                'group': 'temperature',
+                'cooldown_minutes': 15,
+                'escalate_after_minutes': 5,
+                'severity': 'critical',
+                'message': 'Critical temperature: {value}°C'
+            },
             'temperature_high': {
+                'field': 'temperature',
+                'op': '>',
+                'param': 'target_temp_max',
                 'threshold': 8.0,
+                'group': 'temperature',
+                'cooldown_minutes': 30,
+                'escalate_after_minutes': 30,
                 'severity': 'high',
-                'message': 'Temperature above safe range'
+                'message': 'High temperature: {value}°C'
             },
             'temperature_low': {
+                'field': 'temperature',
+                'op': '<',
+                'param': 'target_temp_min',
                 'threshold': 2.0,
+                'group': 'temperature',
+                'cooldown_minutes': 30,
+                'escalate_after_minutes': 30,
                 'severity': 'high', 
-                'message': 'Temperature below safe range'
+                'message': 'Low temperature: {value}°C'
             },
-            'temperature_critical': {
-                'threshold': 10.0,
+            'battery_critical': {
+                'field': 'battery_level',
+                'op': '<=',
+                'threshold': 5,
+                'group': 'battery',
+                'cooldown_minutes': 60,
+                'escalate_after_minutes': 10,
                 'severity': 'critical',
-                'message': 'Critical temperature excursion'
+                'message': 'Critical battery: {value}%'
             },
             'battery_low': {
+                'field': 'battery_level',
+                'op': '<=',
                 'threshold': 20,
+                'group': 'battery',
+                'cooldown_minutes': 120,
+                'escalate_after_minutes': 60,
                 'severity': 'medium',
-                'message': 'Battery level is low'
-            },
-            'battery_critical': {
-                'threshold': 5,
-                'severity': 'critical',
-                'message': 'Battery level critically low'
+                'message': 'Low battery: {value}%'
             },
             'door_open': {
+                'condition': 'truthy',  # holds while the reading's field is truthy
+                'field': 'door_open',
                 'duration_threshold': 300,  # 5 minutes
+                'cooldown_minutes': 60,
+                'escalate_after_minutes': 30,
                 'severity': 'medium',
                 'message': 'Storage door has been open too long'
             },
             'connectivity_loss': {
-                'duration_threshold': 600,  # 10 minutes
+                'condition': 'silence',  # holds while no readings arrive
+                'duration_threshold': app.config['HEARTBEAT_TIMEOUT_SECONDS'],  # also ends uptime sessions
+                'cooldown_minutes': 30,
+                'escalate_after_minutes': 20,
                 'severity': 'high',
                 'message': 'Device connectivity lost'
+            },
+            'anomaly': {
+                'cooldown_minutes': 60,
+                'escalate_after_minutes': 120,
+                'severity': 'medium',
+                'message': 'Anomalous sensor reading detected'
             }
         }
     
@@ -159,6 +277,15 @@ class VitalTraceBackend:
                 db.session.commit()
             
             self.devices[device_id] = device.to_dict()
+            self.rule_engine.compile_device(device_id, self.devices[device_id])
+            self.duration_rules.observe(device_id, {})  # start the connectivity clock
+            geo_index.upsert(
+                device_id,
+                device_data.get('latitude', device.latitude),
+                device_data.get('longitude', device.longitude),
+                name=device.name, location=device.location,
+                status=device.status, device_type=device.device_type
+            )
             app.logger.info(f'Device {device_id} registered successfully')
             return True
             
@@ -186,6 +313,22 @@ class VitalTraceBackend:
             )
             db.session.add(sensor_data)
             db.session.commit()
+            analytics_cache.invalidate_device(device_id)
+            
+            # Every reading doubles as a heartbeat
+            received_at = datetime.now(timezone.utc)
+            heartbeat_watchdog.heartbeat(device_id, received_at)
+            uptime_tracker.connect(device_id, received_at)
+            
+            # Accumulate time-weighted thermal exposure against the device's own range
+            temp_min, temp_max = self._target_range(device_id)
+            thermal_exposure.record(device_id, data.get('temperature'), received_at, temp_min, temp_max,
+                                    data.get('shipment_id'))
+            analytics_service.rollups.record(device_id, data, received_at)
+            
+            # Keep the spatial index in step with moving boxes
+            geo_index.upsert(device_id, data.get('latitude'), data.get('longitude'),
+                             temperature=data.get('temperature'))
             
             # Update real-time data
             self.real_time_data[device_id] = data
@@ -205,24 +348,132 @@ class VitalTraceBackend:
         except Exception as e:
             app.logger.error(f'Failed to process sensor data: {str(e)}')
     
+    def process_sensor_batch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a batch of readings and evaluate threshold alerts over it column-wise"""
+        try:
+            batches = self._batch_columns(payload)
+            summary = {'devices': 0, 'readings': 0, 'alerts_raised': 0, 'alerts_cleared': 0}
+            
+            for device_id, columns in batches.items():
+                if device_id not in self.devices:
+                    app.logger.warning(f'Unknown device: {device_id}')
+                    continue
+                
+                rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+                db.session.bulk_insert_mappings(SensorData, [
+                    {'device_id': device_id, **{f: row[f] for f in SENSOR_BATCH_FIELDS + ('timestamp',) if row.get(f) is not None}}
+                    for row in rows
+                ])
+                db.session.commit()
+                analytics_cache.invalidate_device(device_id)
+                
+                # Exposure, rollups and online detectors fold in every reading, at its own timestamp
+                device = self.devices[device_id]
+                temp_min, temp_max = self._target_range(device_id)
+                for row in rows:
+                    thermal_exposure.record(device_id, row.get('temperature'), row['timestamp'],
+                                            temp_min, temp_max, row.get('shipment_id'))
+                    analytics_service.rollups.record(device_id, row, row['timestamp'])
+                    for anomaly in streaming_detectors.observe(device_id, row, device.get('device_type')):
+                        self._create_alert(device_id, 'anomaly', 'medium',
+                                           f'Anomalous {anomaly["field"]} reading {anomaly["value"]} '
+                                           f'({anomaly["detector"]} score {anomaly["score"]})',
+                                           {**row, 'timestamp': row['timestamp'].isoformat()})
+                
+                # Only state transitions come back, so a long excursion costs one alert
+                for transition in self.rule_engine.evaluate_batch(device_id, columns):
+                    reading = rows[transition['index']]
+                    if transition['event'] == 'raised':
+                        self._create_alert(device_id, transition['alert_type'], transition['severity'],
+                                           transition['message'], {**reading, 'timestamp': reading['timestamp'].isoformat()})
+                        summary['alerts_raised'] += 1
+                    else:
+                        self._resolve_alert(device_id, transition['alert_type'],
+                                            f"Condition cleared (value {transition['value']})")
+                        summary['alerts_cleared'] += 1
+                
+                # Live state follows the newest reading only
+                latest = {**rows[-1], 'device_id': device_id, 'timestamp': rows[-1]['timestamp'].isoformat()}
+                received_at = datetime.now(timezone.utc)
+                heartbeat_watchdog.heartbeat(device_id, received_at)
+                uptime_tracker.connect(device_id, received_at)
+                geo_index.upsert(device_id, latest.get('latitude'), latest.get('longitude'),
+                                 temperature=latest.get('temperature'))
+                self.real_time_data[device_id] = latest
+                self.data_buffer[device_id].append(latest)
+                self._observe_duration_rules(device_id, latest)
+                socketio.emit('real_time_data', latest, room='dashboard')
+                
+                summary['devices'] += 1
+                summary['readings'] += len(rows)
+            
+            return summary
+            
+        except Exception as e:
+            app.logger.error(f'Failed to process sensor batch: {str(e)}')
+            db.session.rollback()
+            return {'error': str(e)}
+    
+    def _batch_columns(self, payload: Dict[str, Any]) -> Dict[str, Dict[str, list]]:
+        """Normalize a batch into time-ordered columns per device
+
+        Accepts either ``{'readings': [{...}, ...]}`` or columnar
+        ``{'device_id': id or [ids], 'timestamp': [...], 'temperature': [...], ...}``.
+        Timestamps may be ISO 8601 strings or epoch seconds/milliseconds;
+        readings without one are stamped with the time of receipt.
+        """
+        if 'readings' in payload:
+            readings = payload['readings']
+        else:
+            length = max((len(v) for v in payload.values() if isinstance(v, list)), default=0)
+            readings = [{k: (v[i] if isinstance(v, list) else v) for k, v in payload.items()} for i in range(length)]
+        
+        if len(readings) > app.config['SENSOR_BATCH_MAX_READINGS']:
+            raise ValueError(f"Batch exceeds {app.config['SENSOR_BATCH_MAX_READINGS']} readings")
+        
+        now = datetime.now(timezone.utc)
+        grouped = defaultdict(list)
+        for reading in readings:
+            timestamp = reading.get('timestamp')
+            if isinstance(timestamp, str):
+                timestamp = parse_timestamp(timestamp) or now
+            elif isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+                # Device clocks report epoch seconds or milliseconds
+                timestamp = datetime.fromtimestamp(timestamp / 1000 if timestamp > 1e11 else timestamp, tz=timezone.utc)
+            else:
+                timestamp = now
+            grouped[reading.get('device_id')].append({**reading, 'timestamp': timestamp})
+        
+        batches = {}
+        for device_id, device_readings in grouped.items():
+            device_readings.sort(key=lambda r: r['timestamp'])
+            fields = ('timestamp',) + SENSOR_BATCH_FIELDS + ('latitude', 'longitude', 'shipment_id')
+            batches[device_id] = {f: [r.get(f) for r in device_readings] for f in fields}
+        return batches
+    
+    def _target_range(self, device_id: str) -> Tuple[float, float]:
+        """Device's target temperature range; only unset bounds fall back to 2-8 °C (0.0 is a valid bound)"""
+        device = self.devices.get(device_id, {})
+        temp_min, temp_max = device.get('target_temp_min'), device.get('target_temp_max')
+        return (temp_min if temp_min is not None else 2.0, temp_max if temp_max is not None else 8.0)
+    
     def _analyze_data(self, device_id: str, data: Dict[str, Any]) -> None:
         """Perform advanced analytics on sensor data"""
         try:
-            # Anomaly detection
-            if len(self.data_buffer[device_id]) >= 10:
-                values = [[d.get('temperature', 0), d.get('humidity', 0), 
-                          d.get('battery_level', 0)] for d in self.data_buffer[device_id]]
-                
-                try:
-                    anomaly_score = self.anomaly_detector.fit_predict([values[-1]])[0]
-                    if anomaly_score == -1:  # Anomaly detected
-                        self._create_alert(device_id, 'anomaly', 'medium', 
-                                         'Anomalous sensor reading detected', data)
-                except Exception as e:
-                    app.logger.warning(f'Anomaly detection failed: {str(e)}')
+            # Anomaly detection (scored in micro-batches by the background worker)
+            anomaly_models.submit(device_id, data)
+            
+            # Online detectors run on every reading
+            device_type = self.devices[device_id].get('device_type')
+            for anomaly in streaming_detectors.observe(device_id, data, device_type):
+                self._create_alert(device_id, 'anomaly', 'medium',
+                                 f'Anomalous {anomaly["field"]} reading {anomaly["value"]} '
+                                 f'({anomaly["detector"]} score {anomaly["score"]})', data)
             
-            # Trend analysis
-            analytics_service.analyze_trends(device_id, list(self.data_buffer[device_id]))
+            # Trend analysis (published only when a trend direction changes)
+            trends = analytics_service.analyze_trends(device_id, data)
+            if trends.get('changed_fields'):
+                socketio.emit('trend_update', trends, room='dashboard')
             
             # Update performance metrics
             self._update_performance_metrics(device_id, data)
@@ -231,65 +482,70 @@ class VitalTraceBackend:
             app.logger.error(f'Analytics failed for device {device_id}: {str(e)}')
     
     def _check_alerts(self, device_id: str, data: Dict[str, Any]) -> None:
-        """Check for alert conditions"""
+        """Check for alert conditions against the device's compiled rules"""
         try:
-            temperature = data.get('temperature', 0)
-            battery_level = data.get('battery_level', 100)
-            door_open = data.get('door_open', False)
-            
-            # Temperature alerts
-            if temperature > self.alert_rules['temperature_critical']['threshold']:
-                self._create_alert(device_id, 'temperature_critical', 'critical',
-                                 f'Critical temperature: {temperature}°C', data)
-            elif temperature > self.alert_rules['temperature_high']['threshold']:
-                self._create_alert(device_id, 'temperature_high', 'high',
-                                 f'High temperature: {temperature}°C', data)
-            elif temperature < self.alert_rules['temperature_low']['threshold']:
-                self._create_alert(device_id, 'temperature_low', 'high',
-                                 f'Low temperature: {temperature}°C', data)
-            
-            # Battery alerts
-            if battery_level <= self.alert_rules['battery_critical']['threshold']:
-                self._create_alert(device_id, 'battery_critical', 'critical',
-                                 f'Critical battery: {battery_level}%', data)
-            elif battery_level <= self.alert_rules['battery_low']['threshold']:
-                self._create_alert(device_id, 'battery_low', 'medium',
-                                 f'Low battery: {battery_level}%', data)
-            
-            # Door open alert (if door has been open too long)
-            if door_open:
-                # This would require tracking door open duration
-                # Implementation would track state over time
-                pass
+            # Matches already filtered against active alerts, so the quiet path never hits the database
+            for match in self.rule_engine.evaluate(device_id, data):
+                self._create_alert(device_id, match['alert_type'], match['severity'], match['message'], data)
+            
+            # Active alerts whose condition this reading no longer meets are queued for batched resolution
+            for cleared in self.rule_engine.cleared(device_id, data):
+                self._resolve_alert(device_id, cleared['alert_type'], f"Condition cleared (value {cleared['value']})")
+            
+            self._observe_duration_rules(device_id, data)
                 
         except Exception as e:
             app.logger.error(f'Alert checking failed for device {device_id}: {str(e)}')
     
+    def _observe_duration_rules(self, device_id: str, data: Dict[str, Any]) -> None:
+        """Move duration rule state (door open, connectivity); alerts fire from the timer loop"""
+        for event in self.duration_rules.observe(device_id, data):
+            reason = 'Device reconnected' if event['alert_type'] == 'connectivity_loss' else 'Condition cleared'
+            self._resolve_alert(device_id, event['alert_type'], reason)
+            socketio.emit('alert_condition_cleared', event, room='alerts')
+    
     def _create_alert(self, device_id: str, alert_type: str, severity: str, 
-                     message: str, data: Dict[str, Any]) -> None:
-        """Create and store an alert"""
+                     message: str, data: Dict[str, Any]) -> Optional[str]:
+        """Create and store an alert; returns the suppression reason if the suppressor dropped it"""
         try:
-            # Check if similar alert already exists and is active
-            existing_alert = Alert.query.filter_by(
-                device_id=device_id,
-                alert_type=alert_type,
-                status='active'
-            ).first()
+            # Check the active-alert index instead of querying for a duplicate
+            if not self.rule_engine.index.reserve(device_id, alert_type):
+                return None  # Don't create duplicate alerts
             
-            if existing_alert:
-                return  # Don't create duplicate alerts
+            # Cooldown and hourly rate limit, checked in memory
+            suppressed = self.suppressor.check(device_id, alert_type)
+            if suppressed:
+                self.rule_engine.index.discard(device_id, alert_type)
+                app.logger.debug(f'Alert {alert_type} for device {device_id} suppressed ({suppressed})')
+                return suppressed
+            
+            # Correlate into an incident first, so the row is written once with its incident id
+            alert_id = str(uuid.uuid4())
+            position = geo_index.positions.get(device_id)
+            incident, notify = self.correlator.correlate(
+                alert_id, device_id, alert_type, severity,
+                position=position[:2] if position else None,
+                location=self.devices.get(device_id, {}).get('location')
+            )
             
             # Create new alert
             alert = Alert(
+                id=alert_id,
                 device_id=device_id,
                 alert_type=alert_type,
                 severity=severity,
-                title=f'{alert_type.replace("_", " ").title()} - {self.devices[device_id]["name"]}',
-                message=message
+                title=f'{alert_type.replace("_", " ").title()} - {self.devices.get(device_id, {}).get("name", device_id)}',
+                message=message,
+                incident_id=incident['id']
             )
             alert.set_metadata(data)
             db.session.add(alert)
             db.session.commit()
+            self.rule_engine.index.confirm(device_id, alert_type, alert.id)
+            # Only the alert opening the incident adds an escalation job; later ones attach to it
+            self.escalations.schedule(alert.id, device_id, alert_type, severity, incident['id'])
+            analytics_service.alert_metrics.record_created(device_id, alert_type, severity, alert.created_at)
+            analytics_cache.invalidate_device(device_id)
             
             # Add to history
             alert_history.append(alert.to_dict())
@@ -297,13 +553,56 @@ class VitalTraceBackend:
             # Emit alert to connected clients
             socketio.emit('new_alert', alert.to_dict(), room='alerts')
             
-            # Send notifications
-            notification_service.send_alert_notification(alert)
+            # Notifications go out per incident, not per alert
+            if notify:
+                socketio.emit('incident_updated', incident, room='alerts')
+                if incident['alert_count'] == 1:
+                    notification_service.send_alert_notification(alert)
+                else:
+                    notification_service.send_incident_notification(incident, alert)
             
             app.logger.info(f'Alert created: {alert_type} for device {device_id}')
+            return None
             
         except Exception as e:
             app.logger.error(f'Failed to create alert: {str(e)}')
+            if self.rule_engine.index.get(device_id, alert_type) is None:
+                self.rule_engine.index.discard(device_id, alert_type)
+            return None
+    
+    def _resolve_alert(self, device_id: str, alert_type: str, reason: str) -> None:
+        """Queue the active alert of a type for a device for batched resolution, if any"""
+        alert_id = self.rule_engine.index.get(device_id, alert_type)
+        if alert_id is None:
+            return
+        
+        self.rule_engine.index.discard(device_id, alert_type)
+        self.escalations.cancel(alert_id)
+        self.resolver.enqueue(alert_id, device_id, alert_type, reason)
+    
+    def flush_resolutions(self) -> int:
+        """Commit queued resolutions and emit them to the dashboard grouped by device"""
+        groups = self.resolver.flush()
+        if not groups:
+            return 0
+        
+        for device_id, alerts in groups.items():
+            analytics_cache.invalidate_device(device_id)
+            for resolved in alerts:
+                if resolved['created_at']:
+                    analytics_service.alert_metrics.record_resolved(
+                        device_id, datetime.fromisoformat(resolved['created_at']),
+                        datetime.fromisoformat(resolved['resolved_at'])
+                    )
+        
+        count = sum(len(alerts) for alerts in groups.values())
+        socketio.emit('alerts_resolved', {
+            'count': count,
+            'devices': groups,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }, room='alerts')
+        app.logger.info(f'Auto-resolved {count} alerts across {len(groups)} devices')
+        return count
     
     def _update_performance_metrics(self, device_id: str, data: Dict[str, Any]) -> None:
         """Update system performance metrics"""
@@ -332,7 +631,14 @@ class VitalTraceBackend:
             app.logger.error(f'Failed to update performance metrics: {str(e)}')
     
     def get_device_analytics(self, device_id: str, hours: int = 24) -> Dict[str, Any]:
-        """Get advanced analytics for a specific device"""
+        """Get advanced analytics for a specific device, served from the result cache"""
+        return analytics_cache.get_or_compute(
+            device_id, 'device_analytics', {'hours': hours},
+            lambda: self._compute_device_analytics(device_id, hours)
+        )
+    
+    def _compute_device_analytics(self, device_id: str, hours: int) -> Dict[str, Any]:
+        """Compute advanced analytics for a specific device"""
         try:
             end_time = datetime.now(timezone.utc)
             start_time = end_time - timedelta(hours=hours)
@@ -368,9 +674,10 @@ class VitalTraceBackend:
                     Alert.device_id == device_id,
                     Alert.created_at >= start_time
                 ).count(),
-                'uptime_percentage': self._calculate_uptime(device_id, hours),
-                'compliance_score': self._calculate_compliance_score(df),
-                'predictions': analytics_service.predict_maintenance(device_id)
+                'uptime_percentage': uptime_tracker.get_uptime(device_id, start_time, end_time),
+                'compliance_score': self._calculate_compliance_score(device_id, df, start_time, end_time),
+                'thermal_exposure': thermal_exposure.get_exposure(device_id, start_time, end_time),
+                'predictions': analytics_service.get_maintenance_prediction(device_id)
             }
             
             return analytics
@@ -392,27 +699,21 @@ class VitalTraceBackend:
         except:
             return 0.0
     
-    def _calculate_uptime(self, device_id: str, hours: int) -> float:
-        """Calculate device uptime percentage"""
+    def _calculate_compliance_score(self, device_id: str, df: pd.DataFrame,
+                                    start_time: datetime, end_time: datetime) -> float:
+        """Calculate cold chain compliance as time-weighted percentage in range"""
         try:
-            # This is a simplified calculation
-            # In production, you'd track connection/disconnection events
-            expected_readings = hours * 60 / 5  # Assuming 5-minute intervals
-            actual_readings = len(self.data_buffer[device_id])
+            exposure = thermal_exposure.get_exposure(device_id, start_time, end_time)
+            if exposure.get('time_in_range_percentage') is not None:
+                return float(exposure['time_in_range_percentage'])
             
-            return min(100.0, (actual_readings / expected_readings) * 100)
-        except:
-            return 100.0
-    
-    def _calculate_compliance_score(self, df: pd.DataFrame) -> float:
-        """Calculate cold chain compliance score"""
-        try:
             if df.empty:
                 return 100.0
             
-            # Check how many readings are within acceptable range (2-8°C)
+            # Fall back to the fraction of readings within the device's own range
+            temp_min, temp_max = self._target_range(device_id)
             compliant_readings = df[
-                (df['temperature'] >= 2.0) & (df['temperature'] <= 8.0)
+                (df['temperature'] >= temp_min) & (df['temperature'] <= temp_max)
             ]
             
             compliance_percentage = (len(compliant_readings) / len(df)) * 100
@@ -423,6 +724,28 @@ class VitalTraceBackend:
 # Initialize backend service
 backend_service = VitalTraceBackend()
 
+# Analytics job types
+def export_job(device_id: str, start_date: str, end_date: str, format: str = 'json') -> Dict[str, Any]:
+    """Export job taking ISO timestamps"""
+    return analytics_service.export_analytics_data(
+        device_id, datetime.fromisoformat(start_date), datetime.fromisoformat(end_date), format
+    )
+
+rule_backtester = RuleBacktester(backend_service.alert_rules, workers=app.config['BACKTEST_WORKERS'] or None)
+
+def rule_backtest_job(start_date: str, end_date: str, rules: Optional[Dict[str, Any]] = None,
+                      device_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Backtest job taking ISO timestamps and per-type rule overrides"""
+    return rule_backtester.run(
+        datetime.fromisoformat(start_date), datetime.fromisoformat(end_date), rules, device_ids
+    )
+
+analytics_jobs.register('device_analytics', backend_service.get_device_analytics, ('device_id', 'hours'))
+analytics_jobs.register('device_statistics', analytics_service.get_device_statistics, ('device_id', 'hours'))
+analytics_jobs.register('comparative_analysis', analytics_service.get_comparative_analysis, ('device_ids', 'hours'))
+analytics_jobs.register('export', export_job, ('device_id', 'start_date', 'end_date', 'format'))
+analytics_jobs.register('rule_backtest', rule_backtest_job, ('start_date', 'end_date', 'rules', 'device_ids'))
+
 # Authentication Routes
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -505,8 +828,14 @@ def refresh():
 def get_devices():
     """Get all registered devices"""
     try:
+        if request.args.get('format') == 'columnar':
+            fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+            return jsonify(columnar_query(Device, Device.query, fields)), 200
+        
         devices = Device.query.all()
         return jsonify([device.to_dict() for device in devices]), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -521,6 +850,223 @@ def get_device_analytics(device_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/devices/<device_id>/trend', methods=['GET'])
+@jwt_required()
+def get_device_trend(device_id):
+    """Get a sensor trend, interval-aggregated or downsampled to max_points"""
+    try:
+        sensor_type = request.args.get('sensor_type', 'temperature')
+        hours = request.args.get('hours', 24, type=int)
+        interval_minutes = request.args.get('interval_minutes', 60, type=int)
+        max_points = request.args.get('max_points', type=int)
+        method = request.args.get('method', 'lttb')
+        if method not in DOWNSAMPLING_METHODS:
+            return jsonify({'error': f'method must be one of {", ".join(DOWNSAMPLING_METHODS)}'}), 400
+        
+        trend = analytics_service.get_trend_data(device_id, sensor_type, hours, interval_minutes,
+                                                 max_points, method)
+        return jsonify({'device_id': device_id, 'sensor_type': sensor_type, 'points': trend}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO 8601 query parameter into an aware UTC datetime"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+@app.route('/api/data/batch', methods=['POST'])
+@jwt_required()
+def ingest_sensor_batch():
+    """Ingest a batch of readings (uploads, imports) for one or many devices"""
+    try:
+        data = request.get_json() or {}
+        result = backend_service.process_sensor_batch(data)
+        if 'error' in result:
+            return jsonify(result), 400
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/data/<device_id>', methods=['GET'])
+@app.route('/api/data/<device_id>/range', methods=['GET'])
+def get_device_history(device_id):
+    """Get sensor history for a device with projection, keyset paging and optional downsampling
+
+    Unauthenticated like the /api/data routes it replaces, since the
+    dashboard history views fetch it without a token.
+    """
+    try:
+        start_time = parse_timestamp(request.args.get('start'))
+        end_time = parse_timestamp(request.args.get('end'))
+        hours = request.args.get('hours', type=int)
+        if start_time is None and hours:
+            start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+        
+        fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+        method = request.args.get('method', 'lttb')
+        if method not in DOWNSAMPLING_METHODS:
+            return jsonify({'error': f'method must be one of {", ".join(DOWNSAMPLING_METHODS)}'}), 400
+        
+        page = history_service.query(
+            device_id,
+            start_time=start_time,
+            end_time=end_time,
+            limit=request.args.get('limit', type=int),
+            fields=fields,
+            cursor=request.args.get('cursor'),
+            order=request.args.get('order', 'desc'),
+            max_points=request.args.get('max_points', type=int),
+            downsample_field=request.args.get('downsample_field', 'temperature'),
+            method=method
+        )
+        
+        if request.args.get('format') == 'columnar':
+            return jsonify(history_service.to_columnar(page)), 200
+        
+        # Row format keeps the plain array the dashboard expects; paging travels in a header
+        response = jsonify(history_service.to_rows(page))
+        if page['next_cursor']:
+            response.headers['X-Next-Cursor'] = page['next_cursor']
+        return response, 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/devices/<device_id>/exposure', methods=['GET'])
+@jwt_required()
+def get_device_exposure(device_id):
+    """Get cumulative thermal exposure for a device"""
+    try:
+        hours = request.args.get('hours', 24, type=int)
+        end_time = datetime.now(timezone.utc)
+        exposure = thermal_exposure.get_exposure(device_id, end_time - timedelta(hours=hours), end_time)
+        return jsonify({'device_id': device_id, 'period_hours': hours, **exposure}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/shipments/<shipment_id>/exposure', methods=['GET'])
+@jwt_required()
+def get_shipment_exposure(shipment_id):
+    """Get cumulative thermal exposure for a shipment"""
+    try:
+        hours = request.args.get('hours', 24 * 7, type=int)
+        end_time = datetime.now(timezone.utc)
+        exposure = thermal_exposure.get_exposure(
+            shipment_id, end_time - timedelta(hours=hours), end_time, subject_type='shipment'
+        )
+        return jsonify({'shipment_id': shipment_id, 'period_hours': hours, **exposure}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/percentiles', methods=['GET'])
+@jwt_required()
+def get_percentiles():
+    """Get sensor percentiles for a window and optional device subset"""
+    try:
+        sensor_type = request.args.get('sensor_type', 'temperature')
+        hours = request.args.get('hours', 24, type=int)
+        device_ids = [d for d in request.args.get('device_ids', '').split(',') if d] or None
+        return jsonify(analytics_service.get_percentiles(sensor_type, hours, device_ids)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fleet/availability', methods=['GET'])
+@jwt_required()
+def get_fleet_availability():
+    """Get availability for all devices over a window"""
+    try:
+        hours = request.args.get('hours', 24, type=int)
+        end_time = datetime.now(timezone.utc)
+        availability = uptime_tracker.get_fleet_availability(end_time - timedelta(hours=hours), end_time)
+        return jsonify(availability), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/jobs', methods=['POST'])
+@jwt_required()
+def submit_analytics_job():
+    """Queue an analytics job and return its id"""
+    try:
+        data = request.get_json() or {}
+        job = analytics_jobs.submit(
+            data.get('type'),
+            data.get('params') or {},
+            priority=data.get('priority', 'normal'),
+            owner=str(get_jwt_identity())
+        )
+        response = jsonify(analytics_jobs.to_response(job))
+        response.headers['Location'] = f"/api/analytics/jobs/{job['job_id']}"
+        return response, 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_analytics_job(job_id):
+    """Get the status and, once finished, the result of an analytics job"""
+    try:
+        job = analytics_jobs.get_job(job_id, owner=str(get_jwt_identity()))
+        if job is None:
+            return jsonify({'error': 'Job not found or expired'}), 404
+        return jsonify(analytics_jobs.to_response(job)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/geo/nearby', methods=['GET'])
+@jwt_required()
+def get_nearby_devices():
+    """Get devices within a radius of a point"""
+    try:
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lng', type=float)
+        if latitude is None or longitude is None:
+            return jsonify({'error': 'lat and lng are required'}), 400
+        
+        radius_km = request.args.get('radius_km', 50, type=float)
+        limit = request.args.get('limit', type=int)
+        devices = geo_index.within_radius(latitude, longitude, radius_km, limit)
+        return jsonify({'radius_km': radius_km, 'count': len(devices), 'devices': devices}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/geo/bbox', methods=['GET'])
+@jwt_required()
+def get_devices_in_bbox():
+    """Get devices inside a bounding box"""
+    try:
+        bounds = [request.args.get(k, type=float) for k in ('min_lat', 'min_lng', 'max_lat', 'max_lng')]
+        if None in bounds:
+            return jsonify({'error': 'min_lat, min_lng, max_lat and max_lng are required'}), 400
+        
+        devices = geo_index.within_bbox(*bounds)
+        return jsonify({'count': len(devices), 'devices': devices}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/geo/regions', methods=['GET'])
+@jwt_required()
+def get_region_aggregates():
+    """Aggregate devices by geohash cell or location region"""
+    try:
+        by = request.args.get('by', 'geohash')
+        precision = request.args.get('precision', 4, type=int)
+        if not 1 <= precision <= 12:
+            return jsonify({'error': 'precision must be between 1 and 12'}), 400
+        bounds = [request.args.get(k, type=float) for k in ('min_lat', 'min_lng', 'max_lat', 'max_lng')]
+        bbox = tuple(bounds) if None not in bounds else None
+        return jsonify(geo_index.aggregate(by, precision, bbox)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Alert Management Routes
 @app.route('/api/alerts', methods=['GET'])
 @jwt_required()
@@ -530,6 +1076,20 @@ def get_alerts():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
         status = request.args.get('status', 'active')
+        if page < 1 or per_page < 1:
+            return jsonify({'error': 'page and per_page must be positive integers'}), 400
+        
+        if request.args.get('format') == 'columnar':
+            query = Alert.query.filter_by(status=status)
+            total = query.count()
+            fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+            page_query = query.order_by(Alert.created_at.desc()).limit(per_page).offset((page - 1) * per_page)
+            return jsonify({
+                'alerts': columnar_query(Alert, page_query, fields),
+                'total': total,
+                'pages': (total + per_page - 1) // per_page,
+                'current_page': page
+            }), 200
         
         alerts = Alert.query.filter_by(status=status)\
                           .order_by(Alert.created_at.desc())\
@@ -542,6 +1102,8 @@ def get_alerts():
             'current_page': page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -553,13 +1115,42 @@ def acknowledge_alert(alert_id):
         current_user_id = get_jwt_identity()
         alert = Alert.query.get_or_404(alert_id)
         
+        was_active = alert.status == 'active'
         alert.acknowledge(current_user_id)
+        if was_active and alert.created_at:
+            analytics_service.alert_metrics.record_acknowledged(alert.device_id, alert.created_at, alert.acknowledged_at)
+        backend_service.rule_engine.index.discard(alert.device_id, alert.alert_type)
+        backend_service.escalations.cancel(alert.id)
         
         return jsonify({'message': 'Alert acknowledged'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/alerts/analytics', methods=['GET'])
+@jwt_required()
+def get_alert_analytics():
+    """Get alert counts and TTA/TTR metrics for a device, or the fleet when no device is given"""
+    try:
+        days = request.args.get('days', 7, type=int)
+        return jsonify(analytics_service.alert_metrics.get_analytics(request.args.get('device_id'), days)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/incidents', methods=['GET'])
+@jwt_required()
+def get_incidents():
+    """Get open incidents correlated from recent alerts"""
+    try:
+        return jsonify({
+            'incidents': backend_service.correlator.get_open(),
+            'stats': backend_service.correlator.get_stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # WebSocket Events
 @socketio.on('connect')
 def handle_connect():
@@ -584,6 +1175,10 @@ def handle_disconnect():
     """Handle client disconnection"""
     try:
         connected_clients.discard(request.sid)
+        
+        device_id = device_sessions.pop(request.sid, None)
+        if device_id:
+            uptime_tracker.disconnect(device_id)
         app.logger.info(f'Client {request.sid} disconnected')
         
     except Exception as e:
@@ -599,11 +1194,24 @@ def handle_device_data(data):
         app.logger.error(f'Device data handling error: {str(e)}')
         emit('error', {'message': 'Failed to process device data'})
 
+@socketio.on('device_data_batch')
+def handle_device_data_batch(data):
+    """Handle a batch of readings from a gateway"""
+    try:
+        result = backend_service.process_sensor_batch(data)
+        emit('device_data_batch_ack', result)
+        
+    except Exception as e:
+        app.logger.error(f'Device data batch handling error: {str(e)}')
+        emit('error', {'message': 'Failed to process device data batch'})
+
 @socketio.on('device_registration')
 def handle_device_registration(data):
     """Handle device registration"""
     try:
         if backend_service.register_device(data):
+            device_sessions[request.sid] = data.get('device_id')
+            uptime_tracker.connect(data.get('device_id'))
             emit('devices_updated', list(backend_service.devices.values()), broadcast=True)
             emit('registration_success', {'device_id': data.get('device_id')})
         else:
@@ -619,6 +1227,17 @@ def handle_subscribe_alerts():
     join_room('alerts')
     emit('subscribed', {'room': 'alerts'})
 
+@socketio.on('subscribe_jobs')
+def handle_subscribe_jobs(data):
+    """Subscribe to completion notices for the caller's analytics jobs"""
+    try:
+        identity = decode_token((data or {}).get('token', ''))['sub']
+    except Exception:
+        emit('error', {'message': 'Invalid or expired token'})
+        return
+    join_room(user_room(identity))
+    emit('subscribed', {'room': 'jobs'})
+
 @socketio.on('device_command')
 def handle_device_command(data):
     """Handle device control commands"""
@@ -673,6 +1292,13 @@ def background_tasks():
                 
                 db.session.commit()
                 
+                # Persist closed thermal exposure buckets and sensor rollups
+                thermal_exposure.flush()
+                analytics_service.rollups.flush()
+                
+                # Close sessions of devices that stopped sending heartbeats
+                uptime_tracker.expire_stale()
+                
                 # Emit system status
                 socketio.emit('system_status', {
                     'active_devices': active_devices,
@@ -687,6 +1313,157 @@ def background_tasks():
                 app.logger.error(f'Background task error: {str(e)}')
                 time.sleep(60)  # Wait 1 minute on error
 
+def anomaly_model_tasks():
+    """Retrain anomaly models periodically and score queued readings in micro-batches"""
+    retrain_interval = app.config['ANOMALY_MODEL_RETRAIN_MINUTES'] * 60
+    batch_interval = app.config['ANOMALY_BATCH_INTERVAL_SECONDS']
+    next_training = 0
+    
+    with app.app_context():
+        while True:
+            try:
+                if time.monotonic() >= next_training:
+                    anomaly_models.train_models()
+                    next_training = time.monotonic() + retrain_interval
+                
+                for anomaly in anomaly_models.score_pending():
+                    backend_service._create_alert(
+                        anomaly['device_id'], 'anomaly', 'medium',
+                        f'Anomalous sensor reading detected (model v{anomaly["model_version"]}, '
+                        f'score {anomaly["score"]:.3f})',
+                        anomaly['data']
+                    )
+                
+                time.sleep(batch_interval)
+                
+            except Exception as e:
+                app.logger.error(f'Anomaly model task error: {str(e)}')
+                time.sleep(batch_interval)
+
+def duration_rule_tasks():
+    """Expire duration rule timers, raise alerts for conditions that held too long, commit auto-resolutions and persist last_seen"""
+    tick = app.config['DURATION_RULE_TICK_SECONDS']
+    flush_interval = app.config['LAST_SEEN_FLUSH_SECONDS']
+    next_flush = time.monotonic() + flush_interval
+    
+    with app.app_context():
+        while True:
+            try:
+                for event in backend_service.duration_rules.advance():
+                    minutes = event['duration_seconds'] / 60
+                    suppressed = backend_service._create_alert(
+                        event['device_id'], event['alert_type'], event['severity'],
+                        f"{event['message']} ({minutes:.0f} min)",
+                        {**backend_service.real_time_data.get(event['device_id'], {}), **event}
+                    )
+                    # A suppressed fire is retried while the condition still holds
+                    if suppressed:
+                        backend_service.duration_rules.rearm(event['device_id'], event['alert_type'])
+                
+                backend_service.flush_resolutions()
+                
+                for incident in backend_service.correlator.expire():
+                    socketio.emit('incident_closed', incident, room='alerts')
+                
+                # Batched last_seen persistence
+                if time.monotonic() >= next_flush:
+                    heartbeat_watchdog.flush()
+                    next_flush = time.monotonic() + flush_interval
+                
+                time.sleep(tick)
+                
+            except Exception as e:
+                app.logger.error(f'Duration rule task error: {str(e)}')
+                time.sleep(tick)
+
+def escalation_tasks():
+    """Escalate alerts whose escalation deadline passed without acknowledgement"""
+    tick = app.config['ESCALATION_TICK_SECONDS']
+    
+    with app.app_context():
+        while True:
+            try:
+                jobs = backend_service.escalations.run_due()
+                while jobs:
+                    # One query for every still-active alert the due jobs cover, incident members included
+                    alert_ids = [job['alert_id'] for job in jobs]
+                    incident_ids = [job['incident_id'] for job in jobs if job['incident_id']]
+                    by_id, by_incident = {}, defaultdict(list)
+                    for alert in Alert.query.filter(
+                        Alert.status == 'active',
+                        or_(Alert.id.in_(alert_ids), Alert.incident_id.in_(incident_ids))
+                    ).all():
+                        by_id[str(alert.id)] = alert
+                        if alert.incident_id:
+                            by_incident[alert.incident_id].append(alert)
+                    
+                    done = []
+                    for job in jobs:
+                        if job['incident_id']:
+                            active = sorted(by_incident.get(job['incident_id'], []), key=lambda a: a.created_at)
+                        else:
+                            active = [by_id[job['alert_id']]] if job['alert_id'] in by_id else []
+                        if not active:
+                            done.append(job['job_id'])
+                            continue
+                        
+                        # One notification per incident, addressed by its most severe active alert
+                        severity = max((a.severity for a in active), key=lambda s: SEVERITY_RANK.get(s, 1))
+                        job['notify_roles'] = escalation_roles(severity)
+                        if len(active) == 1:
+                            incident = None
+                            result = notification_service.send_alert_notification(active[0], roles=job['notify_roles'])
+                        else:
+                            incident = incident_from_alerts(job['incident_id'], [a.to_dict() for a in active],
+                                                            geo_index.positions)
+                            result = notification_service.send_incident_notification(
+                                incident, active[0], roles=job['notify_roles']
+                            )
+                        
+                        # Jobs close only once delivered; failed sends are retried with backoff
+                        if not notification_service.delivered(result):
+                            retrying = backend_service.escalations.retry(job)
+                            app.logger.warning(f"Escalation of alert {job['alert_id']} failed to deliver"
+                                               f"{', retrying' if retrying else ', giving up'}")
+                            continue
+                        
+                        socketio.emit('alert_escalated', {
+                            **active[0].to_dict(),
+                            'incident': incident,
+                            'alert_ids': [a.id for a in active],
+                            'notify_roles': job['notify_roles'],
+                            'escalated_at': datetime.now(timezone.utc).isoformat()
+                        }, room='alerts')
+                        done.append(job['job_id'])
+                        app.logger.info(f"Escalated {len(active)} alert(s) of job {job['job_id']} "
+                                        f"to {', '.join(job['notify_roles'])}")
+                    
+                    backend_service.escalations.complete(done)
+                    jobs = backend_service.escalations.run_due()
+                
+                time.sleep(tick)
+                
+            except Exception as e:
+                app.logger.error(f'Escalation task error: {str(e)}')
+                time.sleep(tick)
+
+def run_maintenance_job():
+    """Run the fleet maintenance prediction batch job"""
+    with app.app_context():
+        maintenance_job.run()
+
+def scheduled_tasks():
+    """Run scheduled batch jobs"""
+    schedule.every().day.at(app.config['MAINTENANCE_JOB_TIME']).do(run_maintenance_job)
+    schedule.every().day.do(analytics_service.alert_metrics.prune)
+    
+    while True:
+        try:
+            schedule.run_pending()
+        except Exception as e:
+            app.logger.error(f'Scheduled task error: {str(e)}')
+        time.sleep(30)
+
 if __name__ == '__main__':
     # Create database tables
     with app.app_context():
@@ -704,12 +1481,72 @@ if __name__ == '__main__':
             db.session.add(admin_user)
             db.session.commit()
             app.logger.info('Default admin user created')
+        
+        # Seed the active-alert index so deduplication needs no queries
+        backend_service.rule_engine.index.load(
+            Alert.query.with_entities(Alert.device_id, Alert.alert_type, Alert.id)
+            .filter_by(status='active').all()
+        )
+        
+        # Seed alert lifecycle aggregates for the retention window
+        metrics_since = datetime.now(timezone.utc) - timedelta(days=analytics_service.alert_metrics.retention_days)
+        analytics_service.alert_metrics.load(
+            Alert.query.with_entities(
+                Alert.device_id, Alert.alert_type, Alert.severity,
+                Alert.created_at, Alert.acknowledged_at, Alert.resolved_at
+            ).filter(Alert.created_at >= metrics_since).all()
+        )
+        
+        # Re-arm escalations that were pending before the restart
+        backend_service.escalations.load()
+        
+        # Replay exposure buckets that were still in memory when the process stopped
+        thermal_exposure.rebuild()
+        
+        # Refill sensor rollups the same way; the first start after deploy backfills the lookback window
+        analytics_service.rollups.rebuild(datetime.now(timezone.utc) - timedelta(days=app.config['ROLLUP_REBUILD_DAYS']))
+        
+        # Arm silence timers from the persisted last_seen, so devices that stay quiet after a restart still alert
+        heartbeat_watchdog.load(
+            Device.query.with_entities(Device.device_id, Device.last_seen)
+            .filter(Device.last_seen.isnot(None)).all()
+        )
+        for device_id, last_seen in list(heartbeat_watchdog.last_heard.items()):
+            backend_service.duration_rules.observe(device_id, {}, now=last_seen.timestamp())
+        
+        # Build the spatial index from stored device positions
+        geo_index.load(
+            {'device_id': d[0], 'latitude': d[1], 'longitude': d[2], 'name': d[3],
+             'location': d[4], 'status': d[5], 'device_type': d[6]}
+            for d in Device.query.with_entities(
+                Device.device_id, Device.latitude, Device.longitude, Device.name,
+                Device.location, Device.status, Device.device_type
+            ).all()
+        )
     
     # Start background tasks
     background_thread = threading.Thread(target=background_tasks)
     background_thread.daemon = True
     background_thread.start()
     
+    scheduler_thread = threading.Thread(target=scheduled_tasks)
+    scheduler_thread.daemon = True
+    scheduler_thread.start()
+    
+    anomaly_thread = threading.Thread(target=anomaly_model_tasks)
+    anomaly_thread.daemon = True
+    anomaly_thread.start()
+    
+    duration_thread = threading.Thread(target=duration_rule_tasks)
+    duration_thread.daemon = True
+    duration_thread.start()
+    
+    escalation_thread = threading.Thread(target=escalation_tasks)
+    escalation_thread.daemon = True
+    escalation_thread.start()
+    
+    analytics_jobs.start()
+    
     # Run the application
     socketio.run(
         app, 
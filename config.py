@@ -26,7 +26,41 @@ class Config:
     
     # Performance
     CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')  # memory, redis
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
     SESSION_TIMEOUT = int(os.environ.get('SESSION_TIMEOUT', 3600))
+    MAINTENANCE_JOB_TIME = os.environ.get('MAINTENANCE_JOB_TIME', '02:00')
+    MAINTENANCE_JOB_WORKERS = int(os.environ.get('MAINTENANCE_JOB_WORKERS', 0))  # 0 = all cores
+    MAINTENANCE_MAX_AGE_HOURS = int(os.environ.get('MAINTENANCE_MAX_AGE_HOURS', 36))  # older stored predictions are recomputed
+    ANOMALY_MODEL_RETRAIN_MINUTES = int(os.environ.get('ANOMALY_MODEL_RETRAIN_MINUTES', 60))
+    ANOMALY_MODEL_CONTAMINATION = float(os.environ.get('ANOMALY_MODEL_CONTAMINATION', 0.01))  # expected anomaly share
+    ANOMALY_MODEL_HISTORY_HOURS = int(os.environ.get('ANOMALY_MODEL_HISTORY_HOURS', 72))
+    HEARTBEAT_TIMEOUT_SECONDS = int(os.environ.get('HEARTBEAT_TIMEOUT_SECONDS', 600))  # silence before offline: uptime and connectivity_loss
+    EXPOSURE_BUCKET_MINUTES = int(os.environ.get('EXPOSURE_BUCKET_MINUTES', 60))
+    ROLLUP_REBUILD_DAYS = int(os.environ.get('ROLLUP_REBUILD_DAYS', 30))  # raw history folded into rollups on startup
+    TREND_WINDOWS = {
+        'temperature': int(os.environ.get('TREND_WINDOW_TEMPERATURE', 10)),
+        'humidity': int(os.environ.get('TREND_WINDOW_HUMIDITY', 10)),
+        'battery_level': int(os.environ.get('TREND_WINDOW_BATTERY', 30))
+    }
+    ANOMALY_BATCH_INTERVAL_SECONDS = float(os.environ.get('ANOMALY_BATCH_INTERVAL_SECONDS', 1.0))
+    ANALYTICS_JOB_WORKERS = int(os.environ.get('ANALYTICS_JOB_WORKERS', 2))
+    ANALYTICS_JOB_QUEUE_SIZE = int(os.environ.get('ANALYTICS_JOB_QUEUE_SIZE', 100))
+    ANALYTICS_JOB_RESULT_TTL = int(os.environ.get('ANALYTICS_JOB_RESULT_TTL', 600))
+    DURATION_RULE_TICK_SECONDS = float(os.environ.get('DURATION_RULE_TICK_SECONDS', 1.0))
+    LAST_SEEN_FLUSH_SECONDS = int(os.environ.get('LAST_SEEN_FLUSH_SECONDS', 30))
+    ALERT_SUPPRESSION_BACKEND = os.environ.get('ALERT_SUPPRESSION_BACKEND', 'memory')  # memory, redis
+    ALERT_DEFAULT_COOLDOWN_MINUTES = float(os.environ.get('ALERT_DEFAULT_COOLDOWN_MINUTES', 30))
+    ALERT_MAX_PER_HOUR = int(os.environ.get('ALERT_MAX_PER_HOUR', 5))
+    ESCALATION_TICK_SECONDS = float(os.environ.get('ESCALATION_TICK_SECONDS', 5.0))
+    ESCALATION_RETRY_SECONDS = float(os.environ.get('ESCALATION_RETRY_SECONDS', 60.0))  # grows per failed attempt
+    ESCALATION_MAX_ATTEMPTS = int(os.environ.get('ESCALATION_MAX_ATTEMPTS', 3))
+    INCIDENT_WINDOW_SECONDS = float(os.environ.get('INCIDENT_WINDOW_SECONDS', 300))
+    INCIDENT_RADIUS_KM = float(os.environ.get('INCIDENT_RADIUS_KM', 10.0))
+    INCIDENT_RENOTIFY_FACTOR = int(os.environ.get('INCIDENT_RENOTIFY_FACTOR', 5))
+    BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', 0))  # 0 = one per CPU
+    SENSOR_BATCH_MAX_READINGS = int(os.environ.get('SENSOR_BATCH_MAX_READINGS', 50000))
+    GEO_INDEX_PRECISION = int(os.environ.get('GEO_INDEX_PRECISION', 5))  # geohash length, 5 ~ 5 km cells
     
     # External APIs
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY')
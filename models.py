@@ -623,6 +623,7 @@ class Alert(db.Model):
     acknowledged_at = db.Column(db.DateTime)
     resolved_at = db.Column(db.DateTime)
     metadata = db.Column(db.Text)
+    incident_id = db.Column(db.String(36), index=True)  # correlated incident, escalated as one
     
     def set_metadata(self, data: Dict[str, Any]) -> None:
         self.metadata = json.dumps(data) if data else None
@@ -658,7 +659,8 @@ class Alert(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'acknowledged_at': self.acknowledged_at.isoformat() if self.acknowledged_at else None,
             'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
-            'metadata': self.get_metadata()
+            'metadata': self.get_metadata(),
+            'incident_id': self.incident_id
         }
 
 # ... other models if any
@@ -953,4 +955,109 @@ class Alert(db.Model):
             'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
             'device_id': self.device_id,
             'user_id': self.user_id
-        }
\ No newline at end of file
+        }
+
+class MaintenancePrediction(db.Model):
+    """Precomputed maintenance prediction per device"""
+    __tablename__ = 'maintenance_predictions'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.device_id'), unique=True, nullable=False)
+    maintenance_score = db.Column(db.Float)
+    prediction = db.Column(db.Text)
+    computed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    
+    def set_prediction(self, data: Dict[str, Any]) -> None:
+        """Set prediction as JSON string"""
+        self.prediction = json.dumps(data) if data else None
+    
+    def get_prediction(self) -> Optional[Dict[str, Any]]:
+        """Get prediction as dictionary"""
+        return json.loads(self.prediction) if self.prediction else None
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            **(self.get_prediction() or {}),
+            'device_id': self.device_id,
+            'maintenance_score': self.maintenance_score,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+class ThermalExposureBucket(db.Model):
+    """Time-bucketed cumulative thermal exposure for a device or shipment"""
+    __tablename__ = 'thermal_exposure_buckets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    subject_type = db.Column(db.String(20), nullable=False)  # device, shipment
+    subject_id = db.Column(db.String(50), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    seconds = db.Column(db.Float, default=0.0)
+    arrhenius_sum = db.Column(db.Float, default=0.0)
+    high_seconds = db.Column(db.Float, default=0.0)
+    low_seconds = db.Column(db.Float, default=0.0)
+    heat_degree_seconds = db.Column(db.Float, default=0.0)
+    cold_degree_seconds = db.Column(db.Float, default=0.0)
+    min_temperature = db.Column(db.Float)
+    max_temperature = db.Column(db.Float)
+    readings = db.Column(db.Integer, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('subject_type', 'subject_id', 'bucket_start', name='uq_exposure_bucket'),
+    )
+
+class DeviceConnectionInterval(db.Model):
+    """Closed interval during which a device was connected and reporting"""
+    __tablename__ = 'device_connection_intervals'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.device_id'), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime, nullable=False)
+    end_reason = db.Column(db.String(20))  # disconnect, heartbeat_timeout
+    
+    __table_args__ = (
+        db.Index('idx_connection_device_end', 'device_id', 'ended_at'),
+    )
+
+class SensorRollup(db.Model):
+    """Time-bucketed sensor aggregates with a mergeable quantile sketch"""
+    __tablename__ = 'sensor_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), db.ForeignKey('devices.device_id'), nullable=False)
+    sensor_type = db.Column(db.String(50), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, default=0)
+    sum = db.Column(db.Float, default=0.0)
+    min = db.Column(db.Float)
+    max = db.Column(db.Float)
+    sketch = db.Column(db.Text)
+    
+    __table_args__ = (
+        db.UniqueConstraint('device_id', 'sensor_type', 'bucket_start', name='uq_sensor_rollup'),
+        db.Index('idx_rollup_type_bucket', 'sensor_type', 'bucket_start'),
+    )
+
+class EscalationJob(db.Model):
+    """Delayed escalation of an alert that has not been acknowledged"""
+    __tablename__ = 'escalation_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    alert_id = db.Column(db.String(36), nullable=False)
+    device_id = db.Column(db.String(50), nullable=False)
+    alert_type = db.Column(db.String(50), nullable=False)
+    severity = db.Column(db.String(20))
+    incident_id = db.Column(db.String(36))  # escalates every active alert of the incident
+    due_at = db.Column(db.DateTime, nullable=False)
+    next_run_at = db.Column(db.DateTime)  # due_at until a failed delivery reschedules it
+    attempts = db.Column(db.Integer, default=0)  # failed deliveries so far
+    status = db.Column(db.String(20), default='pending')  # pending, done, cancelled, failed
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    processed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('idx_escalation_status_due', 'status', 'due_at'),
+        db.Index('idx_escalation_alert', 'alert_id'),
+        db.Index('idx_escalation_incident', 'incident_id'),
+    )
@@ -0,0 +1,215 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import bisect
+import logging
+import threading
+
+# Upper bounds (seconds) of the TTA/TTR histogram buckets; the last bucket is open-ended
+LATENCY_BOUNDS = (60, 300, 900, 1800, 3600, 7200, 14400, 43200, 86400, 259200)
+LATENCY_LABELS = ('<1m', '<5m', '<15m', '<30m', '<1h', '<2h', '<4h', '<12h', '<1d', '<3d', '>=3d')
+FLEET = None
+
+def _aware(value: datetime) -> datetime:
+    """Treat naive database timestamps as UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class _DayAggregate:
+    """Lifecycle counters for the alerts created on one UTC day"""
+
+    __slots__ = ('by_type', 'by_severity', 'by_hour', 'first_seen', 'last_seen',
+                 'tta', 'ttr', 'tta_sum', 'ttr_sum')
+
+    def __init__(self):
+        self.by_type = {}
+        self.by_severity = {}
+        self.by_hour = [0] * 24
+        self.first_seen = {}  # alert_type -> earliest created_at
+        self.last_seen = {}  # alert_type -> latest created_at
+        self.tta = [0] * len(LATENCY_LABELS)
+        self.ttr = [0] * len(LATENCY_LABELS)
+        self.tta_sum = 0.0
+        self.ttr_sum = 0.0
+
+class AlertMetrics:
+    """Alert lifecycle aggregates maintained as alerts change state
+
+    Every created alert bumps per-day counters by type, severity and hour,
+    for its device and for the fleet. Acknowledging and resolving an alert
+    add its time-to-acknowledge and time-to-resolve to fixed log-spaced
+    histograms of its creation day. Reporting over N days merges N day
+    aggregates, so alert analytics cost O(days) regardless of alert
+    volume. Days older than ``retention_days`` are dropped.
+    """
+
+    def __init__(self, retention_days: int = 90):
+        self.logger = logging.getLogger(__name__)
+        self.retention_days = retention_days
+        self.days = {}  # device_id (None for the fleet) -> {date: _DayAggregate}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[Tuple[str, str, str, datetime, Optional[datetime], Optional[datetime]]]) -> int:
+        """Rebuild from (device_id, alert_type, severity, created_at, acknowledged_at, resolved_at) rows"""
+        with self._lock:
+            self.days = {}
+        count = 0
+        for device_id, alert_type, severity, created_at, acknowledged_at, resolved_at in rows:
+            if created_at is None:
+                continue
+            self.record_created(device_id, alert_type, severity, created_at)
+            if acknowledged_at is not None:
+                self.record_acknowledged(device_id, created_at, acknowledged_at)
+            if resolved_at is not None:
+                self.record_resolved(device_id, created_at, resolved_at)
+            count += 1
+        self.loaded = True
+        return count
+
+    def record_created(self, device_id: str, alert_type: str, severity: str, created_at: datetime) -> None:
+        """Count a new alert"""
+        created_at = _aware(created_at)
+        with self._lock:
+            for day in self._days_for(device_id, created_at.date(), create=True):
+                day.by_type[alert_type] = day.by_type.get(alert_type, 0) + 1
+                day.by_severity[severity] = day.by_severity.get(severity, 0) + 1
+                day.by_hour[created_at.hour] += 1
+                if alert_type not in day.first_seen or created_at < day.first_seen[alert_type]:
+                    day.first_seen[alert_type] = created_at
+                if alert_type not in day.last_seen or created_at > day.last_seen[alert_type]:
+                    day.last_seen[alert_type] = created_at
+
+    def record_acknowledged(self, device_id: str, created_at: datetime, acknowledged_at: datetime) -> None:
+        """Add an alert's time-to-acknowledge"""
+        self._record_latency(device_id, created_at, acknowledged_at, 'tta')
+
+    def record_resolved(self, device_id: str, created_at: datetime, resolved_at: datetime) -> None:
+        """Add an alert's time-to-resolve"""
+        self._record_latency(device_id, created_at, resolved_at, 'ttr')
+
+    def get_analytics(self, device_id: Optional[str] = None, days: int = 7) -> Dict[str, Any]:
+        """Alert counts, patterns, peak hours and TTA/TTR for a device (or the fleet) over recent days"""
+        today = datetime.now(timezone.utc).date()
+        since = today - timedelta(days=days - 1)
+
+        with self._lock:
+            buckets = [day for date, day in self.days.get(device_id, {}).items() if date >= since]
+
+            by_type, by_severity = {}, {}
+            by_hour = [0] * 24
+            first_seen, last_seen = {}, {}
+            tta, ttr = [0] * len(LATENCY_LABELS), [0] * len(LATENCY_LABELS)
+            tta_sum = ttr_sum = 0.0
+
+            for day in buckets:
+                for alert_type, count in day.by_type.items():
+                    by_type[alert_type] = by_type.get(alert_type, 0) + count
+                    first_seen[alert_type] = min(first_seen.get(alert_type, day.first_seen[alert_type]),
+                                                 day.first_seen[alert_type])
+                    last_seen[alert_type] = max(last_seen.get(alert_type, day.last_seen[alert_type]),
+                                                day.last_seen[alert_type])
+                for severity, count in day.by_severity.items():
+                    by_severity[severity] = by_severity.get(severity, 0) + count
+                for hour in range(24):
+                    by_hour[hour] += day.by_hour[hour]
+                for i in range(len(LATENCY_LABELS)):
+                    tta[i] += day.tta[i]
+                    ttr[i] += day.ttr[i]
+                tta_sum += day.tta_sum
+                ttr_sum += day.ttr_sum
+
+        total = sum(by_type.values())
+        result = {
+            'device_id': device_id,
+            'period_days': days,
+            'total_alerts': total,
+            'patterns': {}
+        }
+        if not total:
+            return result
+
+        span_hours = (max(last_seen.values()) - min(first_seen.values())).total_seconds() / 3600
+        result['patterns'] = {
+            alert_type: {
+                'count': count,
+                'first_occurrence': first_seen[alert_type].isoformat(),
+                'last_occurrence': last_seen[alert_type].isoformat(),
+                'frequency': count / span_hours if span_hours else 0
+            }
+            for alert_type, count in by_type.items()
+        }
+        result['severity_distribution'] = by_severity
+
+        peak_count = max(by_hour)
+        result['peak_hours'] = {
+            'peak_hours': [hour for hour, count in enumerate(by_hour) if count == peak_count],
+            'peak_count': peak_count,
+            'by_hour': by_hour
+        }
+        result['resolution_times'] = {
+            'total_alerts': total,
+            'acknowledged_alerts': sum(tta),
+            'resolved_alerts': sum(ttr),
+            'average_acknowledge_time_hours': round(tta_sum / sum(tta) / 3600, 3) if sum(tta) else 0,
+            'average_resolution_time_hours': round(ttr_sum / sum(ttr) / 3600, 3) if sum(ttr) else 0,
+            'tta_histogram': dict(zip(LATENCY_LABELS, tta)),
+            'ttr_histogram': dict(zip(LATENCY_LABELS, ttr)),
+            'tta_p50_seconds': self._quantile(tta, 0.5),
+            'tta_p90_seconds': self._quantile(tta, 0.9),
+            'ttr_p50_seconds': self._quantile(ttr, 0.5),
+            'ttr_p90_seconds': self._quantile(ttr, 0.9)
+        }
+        return result
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop day aggregates past the retention period"""
+        cutoff = (now or datetime.now(timezone.utc)).date() - timedelta(days=self.retention_days)
+        removed = 0
+        with self._lock:
+            for device_days in self.days.values():
+                for date in [d for d in device_days if d < cutoff]:
+                    del device_days[date]
+                    removed += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tracked devices and day aggregates"""
+        return {
+            'devices': len(self.days) - (1 if FLEET in self.days else 0),
+            'day_aggregates': sum(len(d) for d in self.days.values()),
+            'loaded': self.loaded
+        }
+
+    def _record_latency(self, device_id: str, created_at: datetime, event_at: datetime, kind: str) -> None:
+        """Bin a lifecycle latency into the creation day's histogram"""
+        created_at = _aware(created_at)
+        seconds = max(0.0, (_aware(event_at) - created_at).total_seconds())
+        bucket = bisect.bisect_left(LATENCY_BOUNDS, seconds)
+        with self._lock:
+            for day in self._days_for(device_id, created_at.date(), create=False):
+                getattr(day, kind)[bucket] += 1
+                setattr(day, f'{kind}_sum', getattr(day, f'{kind}_sum') + seconds)
+
+    def _days_for(self, device_id: str, date, create: bool) -> List[_DayAggregate]:
+        """Device and fleet aggregates for a date"""
+        result = []
+        for key in (device_id, FLEET):
+            device_days = self.days.setdefault(key, {}) if create else self.days.get(key, {})
+            day = device_days.get(date)
+            if day is None and create:
+                day = device_days[date] = _DayAggregate()
+            if day is not None:
+                result.append(day)
+        return result
+
+    def _quantile(self, histogram: List[int], q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile; None past the last bound"""
+        total = sum(histogram)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(histogram):
+            cumulative += count
+            if cumulative >= rank:
+                return float(LATENCY_BOUNDS[i]) if i < len(LATENCY_BOUNDS) else None
+        return None
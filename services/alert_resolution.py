@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+import logging
+import threading
+from models import Alert, db
+
+class AlertResolver:
+    """Batched auto-resolution of alerts whose condition has cleared
+
+    The live path only queues the ids of alerts that its latest reading
+    shows as cleared. ``flush`` resolves every queued alert with one
+    UPDATE per batch, guarded on ``status='active'`` so alerts acknowledged
+    in the meantime are left alone, and returns the resolutions grouped by
+    device for a single dashboard event.
+    """
+
+    def __init__(self, batch_size: int = 500):
+        self.logger = logging.getLogger(__name__)
+        self.batch_size = batch_size
+        self._pending = {}  # alert_id -> resolution
+        self._lock = threading.Lock()
+        self.stats = {'queued': 0, 'resolved': 0, 'flushes': 0}
+
+    def enqueue(self, alert_id: Any, device_id: str, alert_type: str, reason: str) -> None:
+        """Queue an alert for resolution in the next flush"""
+        with self._lock:
+            self._pending[str(alert_id)] = {
+                'id': str(alert_id),
+                'device_id': device_id,
+                'alert_type': alert_type,
+                'reason': reason
+            }
+            self.stats['queued'] += 1
+
+    def flush(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Resolve queued alerts; returns the resolved ones grouped by device_id"""
+        with self._lock:
+            if not self._pending:
+                return {}
+            pending, self._pending = list(self._pending.values()), {}
+
+        resolved_at = datetime.now(timezone.utc)
+        resolved = []
+
+        try:
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                ids = [r['id'] for r in batch]
+
+                # Only alerts still active are resolved; the rest were acknowledged meanwhile
+                active = dict(Alert.query.with_entities(Alert.id, Alert.created_at).filter(
+                    Alert.id.in_(ids), Alert.status == 'active'
+                ).all())
+                Alert.query.filter(Alert.id.in_(active), Alert.status == 'active').update(
+                    {'status': 'resolved', 'resolved_at': resolved_at}, synchronize_session=False
+                )
+                resolved.extend({**r, 'created_at': active[r['id']]} for r in batch if r['id'] in active)
+
+            db.session.commit()
+
+        except Exception as e:
+            self.logger.error(f"Failed to resolve alerts: {str(e)}")
+            db.session.rollback()
+            with self._lock:
+                for r in pending:
+                    self._pending.setdefault(r['id'], r)
+            return {}
+
+        self.stats['resolved'] += len(resolved)
+        self.stats['flushes'] += 1
+
+        groups = {}
+        for r in resolved:
+            groups.setdefault(r['device_id'], []).append({
+                **r,
+                'created_at': r['created_at'].isoformat() if r['created_at'] else None,
+                'resolved_at': resolved_at.isoformat()
+            })
+        return groups
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue size and resolution counts"""
+        return {**self.stats, 'pending': len(self._pending)}
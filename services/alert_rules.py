@@ -0,0 +1,250 @@
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable
+import logging
+import operator
+import threading
+import numpy as np
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value forward, as the live path ignores missing fields"""
+    valid = ~np.isnan(values)
+    if valid.all() or not valid.any():
+        return values
+    positions = np.where(valid, np.arange(len(values)), 0)
+    np.maximum.accumulate(positions, out=positions)
+    return values[positions]
+
+def episodes(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end indices of runs of True; end is the first False index, or len(mask) if still running"""
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def rule_state(values: np.ndarray, known: np.ndarray, compare: Callable, threshold: float,
+               taken: np.ndarray, active: bool) -> np.ndarray:
+    """Per-reading active state of one rule in a group, updating ``taken`` in place
+
+    A reading raises the rule when it is the group's first match there (not
+    already ``taken`` by a more severe rule); the alert then stays active
+    while its own condition holds, even if a more severe rule takes over.
+    ``active`` is the state before the first reading, and readings before
+    the field's first value leave it unchanged.
+    """
+    holds = np.where(known, compare(values, threshold), active)
+    hit = holds & known & ~taken
+    taken |= hit
+
+    # Within each run of `holds` the alert is on from the first hit (or from the start if already active)
+    run_start = holds & ~np.concatenate(([active], holds[:-1]))
+    run_id = np.cumsum(run_start)
+    hits = np.cumsum(hit)
+    hits_before_run = np.zeros(run_id[-1] + 1, dtype=hits.dtype)
+    hits_before_run[run_id[run_start]] = hits[run_start] - hit[run_start]
+    return holds & (((hits - hits_before_run[run_id]) > 0) | ((run_id == 0) & active))
+
+class ActiveAlertIndex:
+    """In-memory set of active alerts keyed by (device_id, alert_type)
+
+    Mirrors the ``status='active'`` rows of the alerts table so duplicate
+    checks never touch the database. ``reserve`` is an atomic
+    check-and-insert, so two readings racing for the same alert create it
+    only once.
+    """
+
+    def __init__(self):
+        self._active = {}  # (device_id, alert_type) -> alert id (None while being created)
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[Tuple[str, str, Any]]) -> int:
+        """Replace the index with (device_id, alert_type, alert_id) rows of active alerts"""
+        with self._lock:
+            self._active = {(device_id, alert_type): alert_id for device_id, alert_type, alert_id in rows}
+            return len(self._active)
+
+    def is_active(self, device_id: str, alert_type: str) -> bool:
+        """Whether an alert of this type is active for the device"""
+        return (device_id, alert_type) in self._active
+
+    def reserve(self, device_id: str, alert_type: str) -> bool:
+        """Claim the slot for a new alert; False when one is already active"""
+        key = (device_id, alert_type)
+        with self._lock:
+            if key in self._active:
+                return False
+            self._active[key] = None
+            return True
+
+    def confirm(self, device_id: str, alert_type: str, alert_id: Any) -> None:
+        """Record the id of an alert created after reserve"""
+        with self._lock:
+            self._active[(device_id, alert_type)] = alert_id
+
+    def discard(self, device_id: str, alert_type: str) -> None:
+        """Forget an alert that was acknowledged, resolved or failed to persist"""
+        with self._lock:
+            self._active.pop((device_id, alert_type), None)
+
+    def get(self, device_id: str, alert_type: str) -> Optional[Any]:
+        """Return the active alert id for a key, if known"""
+        return self._active.get((device_id, alert_type))
+
+    def for_device(self, device_id: str) -> Dict[str, Any]:
+        """Active alert types and ids for a device"""
+        with self._lock:
+            return {alert_type: alert_id for (d, alert_type), alert_id in self._active.items() if d == device_id}
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+class AlertRuleEngine:
+    """Threshold rules compiled per device into flat evaluators
+
+    Rule definitions name a reading field, a comparison and either a fixed
+    ``threshold`` or a device parameter (``param`` plus ``offset``), so each
+    device's own target range is honoured. Rules sharing a ``group`` are
+    mutually exclusive and tried in definition order, so the most severe
+    match wins. Compiling resolves every threshold once; evaluating a
+    reading is then a handful of comparisons and dictionary lookups.
+    Rules without a ``field`` (duration rules) are not handled here.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]]):
+        self.logger = logging.getLogger(__name__)
+        self.rules = rules
+        self.index = ActiveAlertIndex()
+        self.evaluators = {}  # device_id -> compiled evaluator
+
+    def compile_device(self, device_id: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """Compile rules against a device's parameters (target range etc.)"""
+        self.evaluators[device_id] = self._compile(params or {})
+
+    def remove_device(self, device_id: str) -> None:
+        """Drop a device's compiled rules"""
+        self.evaluators.pop(device_id, None)
+
+    def evaluate(self, device_id: str, reading: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return rule matches for a reading that do not already have an active alert"""
+        evaluator = self.evaluators.get(device_id)
+        if evaluator is None:
+            evaluator = self.evaluators[device_id] = self._compile({})
+
+        matches = []
+        for field, checks in evaluator:
+            value = reading.get(field)
+            if value is None:
+                continue
+            for compare, threshold, alert_type, severity, template in checks:
+                if compare(value, threshold):
+                    if not self.index.is_active(device_id, alert_type):
+                        matches.append({
+                            'alert_type': alert_type,
+                            'severity': severity,
+                            'message': template.format(value=value, threshold=threshold)
+                        })
+                    break
+
+        return matches
+
+    def evaluate_batch(self, device_id: str, columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Evaluate a columnar batch of readings in order; returns raise/clear transitions only
+
+        Each rule becomes a boolean mask over the batch, seeded with whether
+        its alert is currently active and following the same raise/clear
+        semantics as ``evaluate`` and ``cleared``, so a contiguous excursion
+        yields one ``raised`` transition at its first reading and one
+        ``cleared`` at the first reading back in range. Transitions are
+        sorted by reading index.
+        """
+        evaluator = self.evaluators.get(device_id)
+        if evaluator is None:
+            evaluator = self.evaluators[device_id] = self._compile({})
+
+        transitions = []
+        for field, checks in evaluator:
+            if columns.get(field) is None:
+                continue
+            values = forward_fill(np.asarray(columns[field], dtype=float))
+            known = ~np.isnan(values)
+            if not known.any():
+                continue
+            taken = np.zeros(len(values), dtype=bool)
+
+            with np.errstate(invalid='ignore'):
+                for compare, threshold, alert_type, severity, template in checks:
+                    active = self.index.is_active(device_id, alert_type)
+                    state = rule_state(values, known, compare, threshold, taken, active)
+
+                    mask = np.concatenate(([active], state))
+                    rises = np.flatnonzero(mask[1:] & ~mask[:-1])
+                    falls = np.flatnonzero(~mask[1:] & mask[:-1])
+
+                    for i in rises:
+                        transitions.append({
+                            'event': 'raised',
+                            'index': int(i),
+                            'alert_type': alert_type,
+                            'severity': severity,
+                            'message': template.format(value=values[i], threshold=threshold)
+                        })
+                    for i in falls:
+                        transitions.append({
+                            'event': 'cleared',
+                            'index': int(i),
+                            'alert_type': alert_type,
+                            'value': float(values[i])
+                        })
+
+        # Clears before raises at the same index, so a group moving between levels frees its slot first
+        transitions.sort(key=lambda t: (t['index'], t['event'] == 'raised'))
+        return transitions
+
+    def cleared(self, device_id: str, reading: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return active alerts whose condition no longer holds for a reading"""
+        evaluator = self.evaluators.get(device_id)
+        if evaluator is None:
+            return []
+
+        resolutions = []
+        for field, checks in evaluator:
+            value = reading.get(field)
+            if value is None:
+                continue
+            for compare, threshold, alert_type, _, _ in checks:
+                alert_id = self.index.get(device_id, alert_type)
+                # Pending reservations (None) are still being created
+                if alert_id is not None and not compare(value, threshold):
+                    resolutions.append({'alert_type': alert_type, 'alert_id': alert_id, 'value': value})
+
+        return resolutions
+
+    def get_thresholds(self, device_id: str) -> Dict[str, float]:
+        """Resolved thresholds for a device, keyed by alert type"""
+        evaluator = self.evaluators.get(device_id) or self._compile({})
+        return {alert_type: threshold for _, checks in evaluator for _, threshold, alert_type, _, _ in checks}
+
+    def _compile(self, params: Dict[str, Any]) -> List[Tuple[str, List[Tuple[Callable, float, str, str, str]]]]:
+        """Resolve thresholds and group checks by field into an evaluation plan"""
+        groups = {}
+        for alert_type, rule in self.rules.items():
+            field = rule.get('field')
+            if field is None or rule.get('op') not in OPERATORS:
+                continue
+
+            threshold = rule.get('threshold')
+            param = params.get(rule['param']) if rule.get('param') else None
+            if param is not None:
+                threshold = float(param) + rule.get('offset', 0.0)
+            if threshold is None:
+                self.logger.warning(f"Alert rule {alert_type} has no threshold, skipping")
+                continue
+
+            group = groups.setdefault(rule.get('group', alert_type), (field, []))
+            group[1].append((OPERATORS[rule['op']], threshold, alert_type, rule.get('severity', 'medium'),
+                             rule.get('message', alert_type)))
+
+        return list(groups.values())
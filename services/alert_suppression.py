@@ -0,0 +1,158 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import logging
+import math
+import threading
+import time
+
+HOUR = 3600.0
+
+class InMemorySuppressionStore:
+    """Cooldown timestamps and decaying hourly counters in one bounded LRU map
+
+    Each (device, alert type) key holds ``[last_alert_at, rate, rate_at]``.
+    ``rate`` decays exponentially with a one-hour time constant, so it
+    approximates the number of alerts in the last hour without storing
+    event lists or ever needing a reset. Least recently used keys are
+    evicted beyond ``max_keys``.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check_and_record(self, key: str, now: float, cooldown_seconds: float,
+                         max_per_hour: int) -> Optional[str]:
+        """Return the suppression reason, or record the alert and return None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [None, 0.0, now]
+            self._entries.move_to_end(key)
+
+            if entry[0] is not None and now - entry[0] < cooldown_seconds:
+                return 'cooldown'
+
+            rate = entry[1] * math.exp(-(now - entry[2]) / HOUR)
+            if rate + 1 > max_per_hour:
+                entry[1], entry[2] = rate, now
+                return 'rate_limit'
+
+            entry[0], entry[1], entry[2] = now, rate + 1, now
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return None
+
+    def clear(self, key: str) -> None:
+        """Forget a key's cooldown and counter"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisSuppressionStore:
+    """Suppression state shared across workers through any Redis-compatible client
+
+    The cooldown is an atomic ``SET NX PX`` on a key that expires with the
+    cooldown. The hourly rate is a sliding-window estimate from the current
+    and previous hour buckets, weighting the previous bucket by how much of
+    it still overlaps the window.
+    """
+
+    def __init__(self, client, prefix: str = 'vital_trace:suppress:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> 'RedisSuppressionStore':
+        """Create a store connected to the given Redis URL"""
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def check_and_record(self, key: str, now: float, cooldown_seconds: float,
+                         max_per_hour: int) -> Optional[str]:
+        """Return the suppression reason, or record the alert and return None"""
+        bucket = int(now // HOUR)
+        current_key = f'{self.prefix}rate:{key}:{bucket}'
+        previous_key = f'{self.prefix}rate:{key}:{bucket - 1}'
+
+        current, previous = self.client.mget(current_key, previous_key)
+        overlap = 1 - (now % HOUR) / HOUR
+        rate = int(current or 0) + int(previous or 0) * overlap
+        if rate + 1 > max_per_hour:
+            return 'rate_limit'
+
+        cooldown_ms = max(1, int(cooldown_seconds * 1000))
+        if not self.client.set(f'{self.prefix}cooldown:{key}', 1, nx=True, px=cooldown_ms):
+            return 'cooldown'
+
+        pipeline = self.client.pipeline()
+        pipeline.incr(current_key)
+        pipeline.expire(current_key, int(2 * HOUR))
+        pipeline.execute()
+        return None
+
+    def clear(self, key: str) -> None:
+        """Forget a key's cooldown"""
+        self.client.delete(f'{self.prefix}cooldown:{key}')
+
+class AlertSuppressor:
+    """Cooldown and rate-limit checks for alert creation, without database queries"""
+
+    def __init__(self, store=None, rules: Optional[Dict[str, Dict[str, Any]]] = None,
+                 default_cooldown_minutes: float = 30, max_per_hour: int = 5):
+        self.logger = logging.getLogger(__name__)
+        self.store = store if store is not None else InMemorySuppressionStore()
+        self.rules = rules or {}
+        self.default_cooldown_minutes = default_cooldown_minutes
+        self.max_per_hour = max_per_hour
+        self.stats = {'allowed': 0, 'cooldown': 0, 'rate_limit': 0}
+
+    @classmethod
+    def from_config(cls, app_config: Dict[str, Any],
+                    rules: Optional[Dict[str, Dict[str, Any]]] = None) -> 'AlertSuppressor':
+        """Build the suppressor from Flask configuration, falling back to in-process storage"""
+        max_per_hour = app_config.get('ALERT_MAX_PER_HOUR', 5)
+        default_cooldown = app_config.get('ALERT_DEFAULT_COOLDOWN_MINUTES', 30)
+
+        if app_config.get('ALERT_SUPPRESSION_BACKEND', 'memory') == 'redis':
+            try:
+                return cls(RedisSuppressionStore.from_url(app_config['REDIS_URL']), rules,
+                           default_cooldown, max_per_hour)
+            except Exception as e:
+                logging.getLogger(__name__).warning(
+                    f"Redis suppression store unavailable, using in-memory store: {str(e)}"
+                )
+
+        return cls(InMemorySuppressionStore(), rules, default_cooldown, max_per_hour)
+
+    def check(self, device_id: str, alert_type: str, now: Optional[float] = None) -> Optional[str]:
+        """Return why an alert should be suppressed, or None after recording it as raised"""
+        now = now if now is not None else time.time()
+        rule = self.rules.get(alert_type, {})
+        cooldown_seconds = rule.get('cooldown_minutes', self.default_cooldown_minutes) * 60
+        max_per_hour = rule.get('max_per_hour', self.max_per_hour)
+
+        try:
+            reason = self.store.check_and_record(f'{device_id}:{alert_type}', now,
+                                                 cooldown_seconds, max_per_hour)
+        except Exception as e:
+            # Fail open: a broken store must not swallow alerts
+            self.logger.error(f"Alert suppression check failed: {str(e)}")
+            reason = None
+
+        self.stats[reason or 'allowed'] += 1
+        return reason
+
+    def reset(self, device_id: str, alert_type: str) -> None:
+        """Lift the cooldown for a device and alert type"""
+        try:
+            self.store.clear(f'{device_id}:{alert_type}')
+        except Exception as e:
+            self.logger.error(f"Failed to reset suppression: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Allowed and suppressed counts"""
+        return dict(self.stats)
@@ -0,0 +1,180 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Callable, Iterable
+import itertools
+import logging
+import queue
+import threading
+import time
+import uuid
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+class AnalyticsJobService:
+    """Asynchronous analytics jobs on a bounded, prioritized worker pool
+
+    Heavy analytics calls are submitted as jobs and return a job id
+    immediately. A fixed number of worker threads drain a bounded priority
+    queue (FIFO within a priority), so slow requests can no longer tie up
+    request or socket threads. Finished results are kept for ``result_ttl``
+    seconds and the submitter is notified through ``on_complete``. Each
+    job type declares the parameter names its handler accepts; anything
+    else is rejected at submission.
+    """
+
+    def __init__(self, app=None, workers: int = 2, max_queue: int = 100, result_ttl: int = 600,
+                 on_complete: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.app = app
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.on_complete = on_complete
+        self.handlers = {}  # job type -> callable(**params)
+        self.allowed_params = {}  # job type -> accepted parameter names
+        self.jobs = {}  # job_id -> job record
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def register(self, job_type: str, handler: Callable[..., Dict[str, Any]], params: Iterable[str] = ()) -> None:
+        """Register a callable that executes a job type and the parameter names it accepts"""
+        self.handlers[job_type] = handler
+        self.allowed_params[job_type] = frozenset(params)
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        for index in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._worker, name=f'analytics-job-{index}')
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job_type: str, params: Dict[str, Any], priority: Any = 'normal',
+               owner: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a job and return its record"""
+        if job_type not in self.handlers:
+            raise ValueError(f'Unknown job type: {job_type}')
+        if not isinstance(params, dict):
+            raise ValueError('Job params must be an object')
+        unknown = set(params) - self.allowed_params[job_type]
+        if unknown:
+            raise ValueError(f"Unknown params for {job_type}: {', '.join(sorted(map(str, unknown)))}")
+
+        rank = self._rank(priority)
+
+        self._expire()
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'type': job_type,
+            'params': params,
+            'priority': rank,
+            'status': 'queued',
+            'owner': owner,
+            'submitted_at': datetime.now(timezone.utc).isoformat(),
+            'started_at': None,
+            'completed_at': None,
+            'result': None,
+            'error': None,
+            'expires_at': None
+        }
+
+        with self._lock:
+            self.jobs[job_id] = job
+        try:
+            self._queue.put_nowait((rank, next(self._sequence), job_id))
+        except queue.Full:
+            with self._lock:
+                del self.jobs[job_id]
+            raise JobQueueFull('Analytics job queue is full')
+
+        return job
+
+    def get_job(self, job_id: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return a job record, or None when unknown, expired or owned by someone else"""
+        self._expire()
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None or (owner is not None and job['owner'] != owner):
+            return None
+        return job
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and job counts by status"""
+        self._expire()
+        with self._lock:
+            statuses = [job['status'] for job in self.jobs.values()]
+        return {
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize(),
+            'jobs': {status: statuses.count(status) for status in set(statuses)}
+        }
+
+    def to_response(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job record"""
+        return {k: v for k, v in job.items() if k not in ('owner', 'expires_at', 'params')}
+
+    def _rank(self, priority: Any) -> int:
+        """Queue rank for a priority name or number"""
+        if isinstance(priority, str) and priority in PRIORITIES:
+            return PRIORITIES[priority]
+        # bool is an int subclass, so True/False would otherwise pass as 1/0
+        if isinstance(priority, int) and not isinstance(priority, bool) \
+                and min(PRIORITIES.values()) <= priority <= max(PRIORITIES.values()):
+            return priority
+        raise ValueError(f'Invalid priority: {priority!r}')
+
+    def _worker(self) -> None:
+        """Execute queued jobs until the process exits"""
+        while True:
+            _, _, job_id = self._queue.get()
+            try:
+                with self._lock:
+                    job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        """Run one job inside the application context and store its outcome"""
+        job['status'] = 'running'
+        job['started_at'] = datetime.now(timezone.utc).isoformat()
+
+        try:
+            handler = self.handlers[job['type']]
+            if self.app is not None:
+                with self.app.app_context():
+                    result = handler(**job['params'])
+            else:
+                result = handler(**job['params'])
+
+            if isinstance(result, dict) and 'error' in result:
+                job['status'], job['error'] = 'failed', result['error']
+            else:
+                job['status'], job['result'] = 'completed', result
+
+        except Exception as e:
+            self.logger.error(f"Analytics job {job['job_id']} failed: {str(e)}")
+            job['status'], job['error'] = 'failed', str(e)
+
+        job['completed_at'] = datetime.now(timezone.utc).isoformat()
+        job['expires_at'] = time.monotonic() + self.result_ttl
+
+        if self.on_complete:
+            try:
+                self.on_complete(job)
+            except Exception as e:
+                self.logger.error(f"Failed to notify completion of job {job['job_id']}: {str(e)}")
+
+    def _expire(self) -> None:
+        """Drop finished jobs whose results outlived the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            for job_id in [j for j, job in self.jobs.items()
+                           if job['expires_at'] is not None and job['expires_at'] <= now]:
+                del self.jobs[job_id]
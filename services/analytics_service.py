@@ -7,28 +7,82 @@ import pandas as pd
 from sqlalchemy import func, and_, or_, text
 from collections import defaultdict
 import json
-from models import SensorData, Device, Alert, db
+from models import SensorData, Device, Alert, MaintenancePrediction, db
+from services.fleet_analytics import FleetComparisonEngine
+from services.streaming_detectors import DETECTORS, detect_series
+from services.trend_tracker import TrendTracker
+from services.sensor_rollups import ROLLUP_FIELDS, ROLLUP_UNITS, SensorRollupService
+from services.quantile_sketch import QuantileSketch
+from services.cache_service import SingleFlight, single_flight
+from services.downsampling import downsample_indices
+from services.alert_metrics import AlertMetrics
 
 class AnalyticsService:
     """Service for analytics and data processing"""
     
-    def __init__(self):
+    def __init__(self, trend_windows: Optional[Dict[str, int]] = None, maintenance_max_age_hours: int = 36):
         self.logger = logging.getLogger(__name__)
         self.anomaly_threshold = 2.0  # Standard deviations for anomaly detection
+        self.anomaly_method = 'zscore'  # zscore or a streaming detector name (ewma, mad, seasonal)
         self.trend_window = 10  # Number of points for trend analysis
+        self.maintenance_max_age = timedelta(hours=maintenance_max_age_hours)  # stored predictions older than this are recomputed
+        self.trend_tracker = TrendTracker(default_window=self.trend_window, windows=trend_windows)
+        self.rollups = SensorRollupService()
+        self.alert_metrics = AlertMetrics()  # fed by alert lifecycle events once loaded
+        self.flights = SingleFlight()  # coalesces concurrent identical queries
+        self.fleet_engine = FleetComparisonEngine(
+            anomaly_threshold=self.anomaly_threshold,
+            health_scorer=self._calculate_device_health_score
+        )
     
+    @single_flight
     def get_device_statistics(self, device_id: str, hours: int = 24) -> Dict[str, Any]:
-        """Get comprehensive statistics for a device"""
+        """Get comprehensive statistics for a device from its hourly rollups
+
+        Every figure comes from the rollup sketches, so no raw sensor rows
+        are read. Trend and anomalies are computed over the per-bucket means.
+        """
         try:
-            start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+            end_time = datetime.now(timezone.utc)
+            start_time = end_time - timedelta(hours=hours)
             
-            # Get sensor data for the time period
-            sensor_data = SensorData.query.filter(
-                SensorData.device_id == device_id,
-                SensorData.timestamp >= start_time
-            ).order_by(SensorData.timestamp).all()
+            statistics = {}
+            total_readings = 0
+            bucket_starts = []
+            for sensor_type in ROLLUP_FIELDS:
+                series = self.rollups.get_series([device_id], sensor_type, start_time, end_time)
+                if not series:
+                    continue
+                
+                sketch = QuantileSketch(self.rollups.relative_accuracy)
+                for _, bucket in series:
+                    sketch.merge(bucket)
+                summary = self.rollups.summarize(sketch)
+                if not summary['count']:
+                    continue
+                
+                means = [bucket.mean() for _, bucket in series if bucket.count]
+                latest = self.rollups.get_latest(device_id, sensor_type)
+                total_readings = max(total_readings, summary['count'])
+                bucket_starts.extend((series[0][0], series[-1][0]))
+                
+                statistics[sensor_type] = {
+                    'count': summary['count'],
+                    'min': float(summary['min']),
+                    'max': float(summary['max']),
+                    'avg': float(summary['mean']),
+                    'median': float(summary['median']),
+                    'p95': summary['p95'],
+                    'p99': summary['p99'],
+                    'std': float(summary['std'] or 0.0) if summary['count'] > 1 else 0.0,
+                    'latest': latest if latest is not None else means[-1],
+                    'unit': ROLLUP_UNITS.get(sensor_type),
+                    'trend': self._calculate_trend(means),
+                    'anomalies': self._detect_anomalies(means),
+                    'data_quality': self._assess_sketch_quality(sketch, summary['outlier_bounds'])
+                }
             
-            if not sensor_data:
+            if not statistics:
                 return {
                     'device_id': device_id,
                     'period_hours': hours,
@@ -37,46 +91,15 @@ class AnalyticsService:
                     'message': 'No data available for the specified period'
                 }
             
-            # Group by sensor type
-            stats_by_type = defaultdict(list)
-            timestamps = []
-            
-            for data in sensor_data:
-                stats_by_type[data.sensor_type].append({
-                    'value': data.value,
-                    'timestamp': data.timestamp,
-                    'unit': data.unit
-                })
-                timestamps.append(data.timestamp)
-            
-            # Calculate statistics for each sensor type
-            statistics = {}
-            for sensor_type, values in stats_by_type.items():
-                numeric_values = [v['value'] for v in values if v['value'] is not None]
-                
-                if numeric_values:
-                    statistics[sensor_type] = {
-                        'count': len(numeric_values),
-                        'min': float(min(numeric_values)),
-                        'max': float(max(numeric_values)),
-                        'avg': float(np.mean(numeric_values)),
-                        'median': float(np.median(numeric_values)),
-                        'std': float(np.std(numeric_values)) if len(numeric_values) > 1 else 0.0,
-                        'latest': numeric_values[-1],
-                        'unit': values[-1]['unit'] if values else None,
-                        'trend': self._calculate_trend(numeric_values),
-                        'anomalies': self._detect_anomalies(numeric_values),
-                        'data_quality': self._assess_data_quality(values)
-                    }
-            
             return {
                 'device_id': device_id,
                 'period_hours': hours,
-                'total_readings': len(sensor_data),
+                'total_readings': total_readings,
                 'statistics': statistics,
                 'data_range': {
-                    'start': min(timestamps).isoformat() if timestamps else None,
-                    'end': max(timestamps).isoformat() if timestamps else None
+                    'start': datetime.fromtimestamp(min(bucket_starts), tz=timezone.utc).isoformat(),
+                    'end': datetime.fromtimestamp(max(bucket_starts) + self.rollups.bucket_seconds,
+                                                  tz=timezone.utc).isoformat()
                 },
                 'health_score': self._calculate_device_health_score(statistics)
             }
@@ -85,12 +108,17 @@ class AnalyticsService:
             self.logger.error(f"Failed to get device statistics: {str(e)}")
             return {'error': str(e)}
     
+    @single_flight
     def get_trend_data(self, device_id: str, sensor_type: str, 
-                      hours: int = 24, interval_minutes: int = 60) -> List[Dict[str, Any]]:
-        """Get trend data for a specific sensor with time intervals"""
+                      hours: int = 24, interval_minutes: int = 60,
+                      max_points: Optional[int] = None, method: str = 'lttb') -> List[Dict[str, Any]]:
+        """Get trend data for a specific sensor with time intervals, or a raw downsample when max_points is set"""
         try:
             start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
             
+            if max_points:
+                return self._get_downsampled_series(device_id, sensor_type, start_time, max_points, method)
+            
             # Get raw data and group manually for better compatibility
             sensor_data = SensorData.query.filter(
                 SensorData.device_id == device_id,
@@ -131,26 +159,19 @@ class AnalyticsService:
             self.logger.error(f"Failed to get trend data: {str(e)}")
             return []
     
-    def analyze_trends(self, device_id: str, data_buffer: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze trends in real-time data buffer"""
+    def analyze_trends(self, device_id: str, reading: Dict[str, Any]) -> Dict[str, Any]:
+        """Update sliding-window trends with a new reading"""
         try:
-            if len(data_buffer) < self.trend_window:
-                return {'status': 'insufficient_data', 'required_points': self.trend_window}
-            
-            # Extract recent data points
-            recent_data = data_buffer[-self.trend_window:]
+            trends, changed_fields = self.trend_tracker.update(device_id, reading)
             
-            trends = {}
-            for key in ['temperature', 'humidity', 'battery_level', 'pressure']:
-                if key in recent_data[0]:
-                    values = [d.get(key, 0) for d in recent_data if d.get(key) is not None]
-                    if values:
-                        trends[key] = self._analyze_single_trend(values)
+            if not trends:
+                return {'status': 'insufficient_data', 'required_points': self.trend_window}
             
             return {
                 'device_id': device_id,
                 'analysis_window': self.trend_window,
                 'trends': trends,
+                'changed_fields': changed_fields,
                 'overall_trend': self._determine_overall_trend(trends),
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }
@@ -159,6 +180,7 @@ class AnalyticsService:
             self.logger.error(f"Failed to analyze trends: {str(e)}")
             return {'error': str(e)}
     
+    @single_flight
     def predict_maintenance(self, device_id: str) -> Dict[str, Any]:
         """Predict maintenance needs based on historical data"""
         try:
@@ -170,75 +192,111 @@ class AnalyticsService:
                 SensorData.timestamp >= start_time
             ).order_by(SensorData.timestamp).all()
             
-            if len(sensor_data) < 100:  # Need sufficient data for prediction
-                return {
-                    'prediction': 'insufficient_data',
-                    'confidence': 0,
-                    'message': 'Need at least 100 data points for reliable prediction'
-                }
-            
-            # Analyze battery degradation
-            battery_data = [d for d in sensor_data if d.sensor_type == 'battery_level']
-            battery_prediction = self._predict_battery_maintenance(battery_data)
-            
-            # Analyze sensor drift
-            sensor_drift = self._analyze_sensor_drift(sensor_data)
-            
-            # Calculate overall maintenance score
-            maintenance_score = self._calculate_maintenance_score(
-                battery_prediction, sensor_drift, sensor_data
-            )
+            return self.build_maintenance_prediction(device_id, sensor_data)
             
+        except Exception as e:
+            self.logger.error(f"Failed to predict maintenance: {str(e)}")
+            return {'error': str(e)}
+    
+    def build_maintenance_prediction(self, device_id: str, sensor_data: List[Any]) -> Dict[str, Any]:
+        """Build a maintenance prediction from readings exposing sensor_type and value"""
+        if len(sensor_data) < 100:  # Need sufficient data for prediction
             return {
-                'device_id': device_id,
-                'maintenance_score': maintenance_score,
-                'battery_prediction': battery_prediction,
-                'sensor_drift': sensor_drift,
-                'recommendations': self._generate_maintenance_recommendations(
-                    maintenance_score, battery_prediction, sensor_drift
-                ),
-                'next_check_date': self._calculate_next_maintenance_date(maintenance_score)
+                'prediction': 'insufficient_data',
+                'confidence': 0,
+                'message': 'Need at least 100 data points for reliable prediction'
             }
+        
+        # Analyze battery degradation
+        battery_data = [d for d in sensor_data if d.sensor_type == 'battery_level']
+        battery_prediction = self._predict_battery_maintenance(battery_data)
+        
+        # Analyze sensor drift
+        sensor_drift = self._analyze_sensor_drift(sensor_data)
+        
+        # Calculate overall maintenance score
+        maintenance_score = self._calculate_maintenance_score(
+            battery_prediction, sensor_drift, sensor_data
+        )
+        
+        return {
+            'device_id': device_id,
+            'maintenance_score': maintenance_score,
+            'battery_prediction': battery_prediction,
+            'sensor_drift': sensor_drift,
+            'recommendations': self._generate_maintenance_recommendations(
+                maintenance_score, battery_prediction, sensor_drift
+            ),
+            'next_check_date': self._calculate_next_maintenance_date(maintenance_score)
+        }
+    
+    @single_flight
+    def get_maintenance_prediction(self, device_id: str) -> Dict[str, Any]:
+        """Get the precomputed maintenance prediction, computing inline if none is stored or it is stale
+
+        A stored prediction older than ``maintenance_max_age`` (the batch job
+        missed its run) is recomputed; if that fails the stored one is served
+        with ``stale`` set.
+        """
+        try:
+            stored = MaintenancePrediction.query.filter_by(device_id=device_id).first()
+            if stored and stored.computed_at:
+                computed_at = stored.computed_at
+                if computed_at.tzinfo is None:
+                    computed_at = computed_at.replace(tzinfo=timezone.utc)
+                if datetime.now(timezone.utc) - computed_at <= self.maintenance_max_age:
+                    return {**stored.to_dict(), 'stale': False}
+            
+            prediction = self.predict_maintenance(device_id)
+            if stored and 'error' in prediction:
+                return {**stored.to_dict(), 'stale': True}
+            return prediction
             
         except Exception as e:
-            self.logger.error(f"Failed to predict maintenance: {str(e)}")
+            self.logger.error(f"Failed to get maintenance prediction: {str(e)}")
             return {'error': str(e)}
     
+    @single_flight
     def get_comparative_analysis(self, device_ids: List[str], 
                                hours: int = 24) -> Dict[str, Any]:
-        """Compare performance across multiple devices"""
+        """Compare performance across multiple devices in a single pass"""
         try:
-            start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-            
-            comparison_data = {}
-            
-            for device_id in device_ids:
-                device_stats = self.get_device_statistics(device_id, hours)
-                if 'error' not in device_stats:
-                    comparison_data[device_id] = device_stats
-            
-            if not comparison_data:
+            if not device_ids:
                 return {'error': 'No valid data for comparison'}
             
-            # Perform comparative analysis
-            comparative_metrics = self._calculate_comparative_metrics(comparison_data)
+            return self.fleet_engine.compare(device_ids, hours)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to perform comparative analysis: {str(e)}")
+            return {'error': str(e)}
+    
+    @single_flight
+    def get_percentiles(self, sensor_type: str, hours: int = 24,
+                        device_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get median, IQR and tail percentiles for a device subset from rollup sketches"""
+        try:
+            end_time = datetime.now(timezone.utc)
+            start_time = end_time - timedelta(hours=hours)
             
             return {
-                'comparison_period_hours': hours,
-                'devices_analyzed': len(comparison_data),
-                'individual_stats': comparison_data,
-                'comparative_metrics': comparative_metrics,
-                'rankings': self._rank_devices(comparison_data),
-                'outliers': self._identify_outlier_devices(comparison_data)
+                'sensor_type': sensor_type,
+                'period_hours': hours,
+                'device_ids': device_ids,
+                **self.rollups.get_quantiles(device_ids, sensor_type, start_time, end_time)
             }
             
         except Exception as e:
-            self.logger.error(f"Failed to perform comparative analysis: {str(e)}")
+            self.logger.error(f"Failed to get percentiles: {str(e)}")
             return {'error': str(e)}
     
+    @single_flight
     def get_alert_analytics(self, device_id: str, days: int = 7) -> Dict[str, Any]:
         """Analyze alert patterns for a device"""
         try:
+            # Served from lifecycle aggregates once they are seeded; the scan below is the fallback
+            if self.alert_metrics.loaded:
+                return self.alert_metrics.get_analytics(device_id, days)
+            
             start_time = datetime.now(timezone.utc) - timedelta(days=days)
             
             alerts = Alert.query.filter(
@@ -271,6 +329,7 @@ class AnalyticsService:
             self.logger.error(f"Failed to analyze alerts: {str(e)}")
             return {'error': str(e)}
     
+    @single_flight
     def export_analytics_data(self, device_id: str, start_date: datetime, 
                             end_date: datetime, format: str = 'json') -> Dict[str, Any]:
         """Export analytics data in specified format"""
@@ -316,6 +375,30 @@ class AnalyticsService:
     
     # Private helper methods
     
+    def _get_downsampled_series(self, device_id: str, sensor_type: str, start_time: datetime,
+                                max_points: int, method: str) -> List[Dict[str, Any]]:
+        """Load a sensor series as column arrays and keep a shape-preserving subset"""
+        rows = db.session.query(SensorData.timestamp, SensorData.value, SensorData.unit).filter(
+            SensorData.device_id == device_id,
+            SensorData.sensor_type == sensor_type,
+            SensorData.timestamp >= start_time,
+            SensorData.value.isnot(None)
+        ).order_by(SensorData.timestamp).all()
+        
+        if not rows:
+            return []
+        
+        timestamps, values, units = zip(*rows)
+        epochs = np.array([t.timestamp() for t in timestamps])
+        indices = downsample_indices(epochs, values, max_points, method)
+        unit = units[0]
+        
+        return [{
+            'timestamp': timestamps[i].isoformat(),
+            'value': float(values[i]),
+            'unit': unit
+        } for i in indices]
+    
     def _calculate_trend(self, values: List[float]) -> Dict[str, Any]:
         """Calculate trend direction and strength"""
         if len(values) < 2:
@@ -344,12 +427,16 @@ class AnalyticsService:
         except Exception:
             return {'direction': 'stable', 'strength': 0, 'slope': 0}
     
-    def _detect_anomalies(self, values: List[float]) -> Dict[str, Any]:
-        """Detect anomalies using statistical methods"""
+    def _detect_anomalies(self, values: List[float], method: Optional[str] = None) -> Dict[str, Any]:
+        """Detect anomalies using statistical methods or a streaming detector"""
         if len(values) < 3:
             return {'count': 0, 'indices': []}
         
         try:
+            method = method or self.anomaly_method
+            if method in DETECTORS:
+                return detect_series(values, method)
+            
             mean_val = np.mean(values)
             std_val = np.std(values)
             
@@ -370,7 +457,8 @@ class AnalyticsService:
         except Exception:
             return {'count': 0, 'indices': []}
     
-    def _assess_data_quality(self, data_points: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _assess_data_quality(self, data_points: List[Dict[str, Any]],
+                             outlier_bounds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """Assess the quality of sensor data"""
         if not data_points:
             return {'score': 0, 'issues': ['no_data']}
@@ -393,11 +481,15 @@ class AnalyticsService:
             
             # Check for extreme outliers
             if len(values) > 3:
-                q1 = np.percentile(values, 25)
-                q3 = np.percentile(values, 75)
-                iqr = q3 - q1
-                lower_bound = q1 - 1.5 * iqr
-                upper_bound = q3 + 1.5 * iqr
+                if outlier_bounds:
+                    lower_bound = outlier_bounds['lower']
+                    upper_bound = outlier_bounds['upper']
+                else:
+                    q1 = np.percentile(values, 25)
+                    q3 = np.percentile(values, 75)
+                    iqr = q3 - q1
+                    lower_bound = q1 - 1.5 * iqr
+                    upper_bound = q3 + 1.5 * iqr
                 
                 outliers = [v for v in values if v < lower_bound or v > upper_bound]
                 if outliers:
@@ -416,6 +508,28 @@ class AnalyticsService:
             self.logger.error(f"Error assessing data quality: {str(e)}")
             return {'score': 0, 'issues': ['quality_assessment_error']}
     
+    def _assess_sketch_quality(self, sketch: QuantileSketch,
+                               outlier_bounds: Dict[str, float]) -> Dict[str, Any]:
+        """Assess data quality from a rollup sketch, like _assess_data_quality"""
+        issues = []
+        score = 100
+        
+        if sketch.min == sketch.max and sketch.count > 1:
+            score -= 20
+            issues.append('constant_values')
+        
+        if sketch.count > 3:
+            outliers = sketch.count_outside(outlier_bounds['lower'], outlier_bounds['upper'])
+            if outliers:
+                outlier_ratio = outliers / sketch.count
+                score -= outlier_ratio * 20
+                issues.append(f'outliers: {outlier_ratio:.2%}')
+        
+        return {
+            'score': round(max(0, min(100, score)), 2),
+            'issues': issues
+        }
+    
     def _calculate_device_health_score(self, statistics: Dict[str, Any]) -> float:
         """Calculate overall health score for device"""
         if not statistics:
@@ -460,35 +574,6 @@ class AnalyticsService:
         
         return round(total_score / total_weight if total_weight > 0 else 0, 2)
     
-    def _analyze_single_trend(self, values: List[float]) -> Dict[str, Any]:
-        """Analyze trend for a single sensor"""
-        if len(values) < 2:
-            return {'direction': 'stable', 'strength': 0}
-        
-        try:
-            # Use linear regression to determine trend
-            x = np.arange(len(values))
-            slope, _ = np.polyfit(x, values, 1)
-            
-            # Determine direction
-            if abs(slope) < 0.01:
-                direction = 'stable'
-            elif slope > 0:
-                direction = 'increasing'
-            else:
-                direction = 'decreasing'
-            
-            # Calculate strength (normalized)
-            strength = min(abs(slope) * 100, 100)
-            
-            return {
-                'direction': direction,
-                'strength': round(strength, 2),
-                'slope': round(slope, 4)
-            }
-        except Exception:
-            return {'direction': 'stable', 'strength': 0}
-    
     def _determine_overall_trend(self, trends: Dict[str, Any]) -> Dict[str, Any]:
         """Determine overall trend from individual sensor trends"""
         if not trends:
@@ -671,78 +756,6 @@ class AnalyticsService:
         except Exception:
             return base_date.isoformat()
     
-    def _calculate_comparative_metrics(self, comparison_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Calculate comparative metrics across devices"""
-        try:
-            if len(comparison_data) < 2:
-                return {}
-            
-            # Collect all statistics
-            all_stats = []
-            for device_id, stats in comparison_data.items():
-                if 'statistics' in stats:
-                    all_stats.extend(stats['statistics'].values())
-            
-            if not all_stats:
-                return {}
-            
-            # Calculate overall averages
-            metrics = {}
-            for stat in all_stats:
-                if 'avg' in stat:
-                    metrics['avg_' + stat.get('sensor_type', 'unknown')] = stat['avg']
-                if 'std' in stat:
-                    metrics['std_' + stat.get('sensor_type', 'unknown')] = stat['std']
-            
-            return metrics
-        except Exception as e:
-            self.logger.error(f"Error calculating comparative metrics: {str(e)}")
-            return {}
-    
-    def _rank_devices(self, comparison_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Rank devices by health score"""
-        try:
-            rankings = []
-            for device_id, stats in comparison_data.items():
-                health_score = stats.get('health_score', 0)
-                rankings.append((device_id, health_score))
-            
-            # Sort by health score descending
-            rankings.sort(key=lambda x: x[1], reverse=True)
-            
-            return {
-                'ranked_devices': [{'device_id': d[0], 'health_score': d[1]} for d in rankings],
-                'top_device': rankings[0][0] if rankings else None
-            }
-        except Exception as e:
-            self.logger.error(f"Error ranking devices: {str(e)}")
-            return {}
-    
-    def _identify_outlier_devices(self, comparison_data: Dict[str, Any]) -> List[str]:
-        """Identify outlier devices based on health scores"""
-        try:
-            if len(comparison_data) < 3:
-                return []
-            
-            scores = [stats.get('health_score', 0) for stats in comparison_data.values()]
-            if not scores:
-                return []
-            
-            mean_score = np.mean(scores)
-            std_score = np.std(scores)
-            
-            # Identify outliers (more than 2 standard deviations from mean)
-            outliers = []
-            for device_id, stats in comparison_data.items():
-                score = stats.get('health_score', 0)
-                if abs(score - mean_score) > 2 * std_score:
-                    outliers.append(device_id)
-            
-            return outliers
-        except Exception as e:
-            self.logger.error(f"Error identifying outlier devices: {str(e)}")
-            return []
-    
     def _analyze_alert_patterns(self, alerts: List[Alert]) -> Dict[str, Any]:
         """Analyze patterns in alerts"""
         try:
@@ -786,12 +799,16 @@ class AnalyticsService:
             if not alerts:
                 return {}
             
-            # For simplicity, assume all alerts were resolved immediately
-            # In a real implementation, you'd need resolved_at timestamps
+            ack_hours = [(a.acknowledged_at - a.created_at).total_seconds() / 3600
+                         for a in alerts if a.acknowledged_at and a.created_at]
+            resolve_hours = [(a.resolved_at - a.created_at).total_seconds() / 3600
+                             for a in alerts if a.resolved_at and a.created_at]
             return {
-                'average_resolution_time_hours': 0,
+                'average_acknowledge_time_hours': round(sum(ack_hours) / len(ack_hours), 3) if ack_hours else 0,
+                'average_resolution_time_hours': round(sum(resolve_hours) / len(resolve_hours), 3) if resolve_hours else 0,
                 'total_alerts': len(alerts),
-                'resolved_alerts': 0
+                'acknowledged_alerts': len(ack_hours),
+                'resolved_alerts': len(resolve_hours)
             }
         except Exception as e:
             self.logger.error(f"Error calculating resolution times: {str(e)}")
@@ -0,0 +1,182 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict, deque
+import logging
+import threading
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from models import SensorData, Device, db
+
+FEATURES = ('temperature', 'humidity', 'battery_level')
+
+class AnomalyModelService:
+    """Lifecycle management for per-device and per-cohort anomaly models
+
+    Models are trained in the background on historical windows and kept in
+    memory with a version number. The ingest path only queues feature
+    vectors; queued readings are scored in micro-batches, one ``predict``
+    call per model, by the background worker. Missing features are imputed
+    with the medians of the data the scoring model was trained on.
+    """
+
+    def __init__(self, contamination: float = 0.01, min_samples: int = 50,
+                 history_hours: int = 72, max_pending: int = 10000):
+        self.logger = logging.getLogger(__name__)
+        self.contamination = contamination
+        self.min_samples = min_samples
+        self.history_hours = history_hours
+        self.models = {}  # (scope, key) -> model entry
+        self.device_cohorts = {}
+        self.pending = deque(maxlen=max_pending)
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def submit(self, device_id: str, data: Dict[str, Any]) -> None:
+        """Queue a reading for the next scoring batch"""
+        features = [float(data[f]) if data.get(f) is not None else np.nan for f in FEATURES]
+        self.pending.append((device_id, features, data))
+
+    def score_pending(self) -> List[Dict[str, Any]]:
+        """Score all queued readings and return those flagged as anomalous"""
+        batch = []
+        while self.pending:
+            try:
+                batch.append(self.pending.popleft())
+            except IndexError:
+                break
+
+        if not batch:
+            return []
+
+        groups = defaultdict(list)
+        for item in batch:
+            entry = self.get_model(item[0])
+            if entry is not None:
+                groups[(entry['scope'], entry['key'])].append(item)
+
+        anomalies = []
+        for model_key, items in groups.items():
+            entry = self.models.get(model_key)
+            if entry is None:
+                continue
+            try:
+                X = self._impute(np.array([features for _, features, _ in items], dtype=float),
+                                 entry['medians'])
+                labels = entry['model'].predict(X)
+                scores = entry['model'].decision_function(X)
+                for (device_id, _, data), label, score in zip(items, labels, scores):
+                    if label == -1:
+                        anomalies.append({
+                            'device_id': device_id,
+                            'data': data,
+                            'score': float(score),
+                            'model_version': entry['version'],
+                            'model_scope': entry['scope']
+                        })
+            except Exception as e:
+                self.logger.warning(f"Anomaly scoring failed for model {model_key}: {str(e)}")
+
+        return anomalies
+
+    def get_model(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Get the device model, falling back to the device's cohort model"""
+        entry = self.models.get(('device', device_id))
+        if entry is None:
+            entry = self.models.get(('cohort', self.device_cohorts.get(device_id, 'default')))
+        return entry
+
+    def train_models(self) -> Dict[str, Any]:
+        """Retrain models from the historical window"""
+        try:
+            device_ids, X = self._load_training_data()
+            if len(X) == 0:
+                return {'device_models': 0, 'cohort_models': 0}
+
+            self.device_cohorts = {
+                device_id: device_type or 'default'
+                for device_id, device_type in db.session.query(Device.device_id, Device.device_type).all()
+            }
+
+            order = np.argsort(device_ids, kind='stable')
+            device_ids, X = device_ids[order], X[order]
+            unique_ids, starts = np.unique(device_ids, return_index=True)
+            bounds = np.append(starts, len(device_ids))
+
+            device_models = 0
+            cohort_samples = defaultdict(list)
+            for i, device_id in enumerate(unique_ids):
+                samples = X[bounds[i]:bounds[i + 1]]
+                if len(samples) >= self.min_samples:
+                    self._fit('device', device_id, samples)
+                    device_models += 1
+                cohort_samples[self.device_cohorts.get(device_id, 'default')].append(samples)
+
+            cohort_models = 0
+            for cohort, sample_list in cohort_samples.items():
+                samples = np.concatenate(sample_list)
+                if len(samples) >= self.min_samples:
+                    self._fit('cohort', cohort, samples)
+                    cohort_models += 1
+
+            self.logger.info(f"Trained {device_models} device and {cohort_models} cohort anomaly models")
+            return {'device_models': device_models, 'cohort_models': cohort_models}
+
+        except Exception as e:
+            self.logger.error(f"Anomaly model training failed: {str(e)}")
+            return {'error': str(e)}
+
+    def get_model_info(self) -> List[Dict[str, Any]]:
+        """Get metadata for all loaded models"""
+        return [{
+            'scope': entry['scope'],
+            'key': entry['key'],
+            'version': entry['version'],
+            'samples': entry['samples'],
+            'trained_at': entry['trained_at'].isoformat()
+        } for entry in list(self.models.values())]
+
+    def _load_training_data(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Load the training window as column arrays"""
+        start_time = datetime.now(timezone.utc) - timedelta(hours=self.history_hours)
+        rows = db.session.query(
+            SensorData.device_id,
+            SensorData.temperature,
+            SensorData.humidity,
+            SensorData.battery_level
+        ).filter(
+            SensorData.timestamp >= start_time,
+            SensorData.temperature.isnot(None)
+        ).all()
+
+        if not rows:
+            return np.array([], dtype=object), np.empty((0, len(FEATURES)))
+
+        device_ids = np.array([r[0] for r in rows], dtype=object)
+        X = np.array([r[1:] for r in rows], dtype=float)  # None becomes NaN, imputed per model
+        return device_ids, X
+
+    def _fit(self, scope: str, key: str, samples: np.ndarray) -> None:
+        """Fit a model and swap it in with a new version"""
+        # Features never reported in the window fall back to 0
+        medians = np.nanmedian(np.where(np.isnan(samples).all(axis=0), 0.0, samples), axis=0)
+        model = IsolationForest(contamination=self.contamination, random_state=42)
+        model.fit(self._impute(samples, medians))
+
+        with self._lock:
+            self._versions[(scope, key)] += 1
+            self.models[(scope, key)] = {
+                'scope': scope,
+                'key': key,
+                'model': model,
+                'version': self._versions[(scope, key)],
+                'medians': medians,
+                'samples': int(len(samples)),
+                'trained_at': datetime.now(timezone.utc)
+            }
+
+    def _impute(self, X: np.ndarray, medians: np.ndarray) -> np.ndarray:
+        """Replace missing features with the training medians"""
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, medians, X)
+        return X
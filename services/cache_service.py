@@ -0,0 +1,269 @@
+import logging
+import json
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+
+class InMemoryCacheBackend:
+    """Thread-safe in-process cache with LRU eviction and per-entry TTL
+
+    Counters are capped the same way. An evicted counter's value is folded
+    into a floor that missing counters read as, so a counter never goes back
+    to a value it had before and generation keys stay unique.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_counters: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_counters = max_counters or max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._counters = OrderedDict()
+        self._counter_floor = 0  # highest value of any evicted counter
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        """Store a value for ttl seconds, evicting least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        """Atomically increment a counter and return the new value"""
+        with self._lock:
+            self._counters[key] = self._counters.get(key, self._counter_floor) + 1
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_counters:
+                _, evicted = self._counters.popitem(last=False)
+                self._counter_floor = max(self._counter_floor, evicted)
+            return self._counters[key]
+
+    def get_counter(self, key: str) -> int:
+        """Return the current value of a counter"""
+        with self._lock:
+            value = self._counters.get(key)
+            if value is None:
+                return self._counter_floor
+            self._counters.move_to_end(key)
+            return value
+
+    def clear(self) -> None:
+        """Drop all entries and counters"""
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+            self._counter_floor = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisCacheBackend:
+    """Cache backend for any Redis-compatible client (redis-py or a local fake)"""
+
+    def __init__(self, client, prefix: str = 'vital_trace:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> 'RedisCacheBackend':
+        """Create a backend connected to the given Redis URL"""
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None when missing or expired"""
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        """Store a value for ttl seconds; Redis handles eviction via maxmemory-policy"""
+        self.client.setex(self.prefix + key, ttl, json.dumps(value, default=str))
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry"""
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key: str) -> int:
+        """Atomically increment a counter and return the new value"""
+        return int(self.client.incr(self.prefix + key))
+
+    def get_counter(self, key: str) -> int:
+        """Return the current value of a counter"""
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one in-flight computation
+
+    The first caller for a key runs the computation; callers arriving while
+    it is running wait for it and receive the same result (or exception).
+    Nothing is retained once the call finishes, so this only deduplicates
+    overlapping work and never serves stale results.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> [done event, result, exception, waiters]
+        self._lock = threading.Lock()
+        self.stats = {'executions': 0, 'coalesced': 0}
+
+    def do(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """Run compute for key, or wait for the identical call already running"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call[3] += 1
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = [threading.Event(), None, None, 0]
+                self.stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = compute()
+            return call[1]
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+
+def single_flight(method: Callable) -> Callable:
+    """Coalesce concurrent identical calls of a service method through ``self.flights``"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, repr(args), repr(sorted(kwargs.items())))
+        return self.flights.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+class AnalyticsCache:
+    """Result cache for device analytics keyed by device, endpoint and aligned window
+
+    Each device has a generation counter that is bumped whenever a new reading
+    or alert arrives. The generation is part of every cache key, so invalidating
+    all cached results for a device is a single increment and stale entries
+    simply age out through TTL/LRU.
+    """
+
+    def __init__(self, backend=None, ttl: int = 300):
+        self.logger = logging.getLogger(__name__)
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.ttl = max(1, int(ttl))
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self.flights = SingleFlight()
+
+    @classmethod
+    def from_config(cls, app_config: Dict[str, Any]) -> 'AnalyticsCache':
+        """Build the cache from Flask configuration, falling back to in-process storage"""
+        ttl = app_config.get('CACHE_TIMEOUT', 300)
+        backend_name = app_config.get('CACHE_BACKEND', 'memory')
+
+        if backend_name == 'redis':
+            try:
+                return cls(RedisCacheBackend.from_url(app_config['REDIS_URL']), ttl)
+            except Exception as e:
+                logging.getLogger(__name__).warning(
+                    f"Redis cache unavailable, using in-memory cache: {str(e)}"
+                )
+
+        return cls(InMemoryCacheBackend(app_config.get('CACHE_MAX_ENTRIES', 1024)), ttl)
+
+    def get_or_compute(self, device_id: str, endpoint: str, params: Dict[str, Any],
+                       compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the cached result for this request or compute and store it"""
+        try:
+            key = self._build_key(device_id, endpoint, params)
+        except Exception as e:
+            # Generation counter unavailable: skip the cache rather than fail the request
+            self.logger.warning(f"Cache key lookup failed for {device_id}/{endpoint}: {str(e)}")
+            self.stats['misses'] += 1
+            return compute()
+
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            self.logger.warning(f"Cache read failed for {key}: {str(e)}")
+            cached = None
+
+        if cached is not None:
+            self.stats['hits'] += 1
+            return cached
+
+        self.stats['misses'] += 1
+        # Concurrent misses for the same key share one computation
+        return self.flights.do(key, lambda: self._compute_and_store(key, compute))
+
+    def _compute_and_store(self, key: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Compute a result and cache it unless it is an error"""
+        result = compute()
+
+        # Errors are not cached so the next request retries the computation
+        if isinstance(result, dict) and 'error' not in result:
+            try:
+                self.backend.set(key, result, self.ttl)
+            except Exception as e:
+                self.logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+        return result
+
+    def invalidate_device(self, device_id: str) -> None:
+        """Invalidate every cached result for a device"""
+        try:
+            self.backend.incr(f'gen:{device_id}')
+            self.stats['invalidations'] += 1
+        except Exception as e:
+            self.logger.warning(f"Cache invalidation failed for device {device_id}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters"""
+        total = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            **self.flights.stats,
+            'hit_rate': round(self.stats['hits'] / total * 100, 2) if total > 0 else 0.0,
+            'ttl_seconds': self.ttl
+        }
+
+    def _aligned_window(self) -> int:
+        """Return the index of the current TTL-aligned window"""
+        return int(time.time() // self.ttl)
+
+    def _build_key(self, device_id: str, endpoint: str, params: Dict[str, Any]) -> str:
+        """Build a cache key from device, endpoint, parameters, generation and window"""
+        generation = self.backend.get_counter(f'gen:{device_id}')
+        param_key = ','.join(f'{k}={params[k]}' for k in sorted(params))
+        return f'analytics:{device_id}:{endpoint}:{param_key}:g{generation}:w{self._aligned_window()}'
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Sequence
+
+# Columns that may be projected, per table; anything else (owner ids, network addresses) stays private
+PUBLIC_COLUMNS = {
+    'devices': ('id', 'device_id', 'name', 'location', 'latitude', 'longitude', 'target_temp_min',
+                'target_temp_max', 'battery_capacity', 'device_type', 'status', 'priority', 'firmware_version',
+                'last_maintenance', 'last_seen', 'created_at', 'updated_at'),
+    'alerts': ('id', 'device_id', 'alert_type', 'title', 'message', 'severity', 'status',
+               'created_at', 'acknowledged_at', 'resolved_at')
+}
+
+def to_epoch_ms(value: Optional[datetime]) -> Optional[int]:
+    """Epoch milliseconds for a datetime, treating naive values as UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def model_fields(model, fields: Optional[Sequence[str]] = None) -> List[str]:
+    """Validate a projection against a model's public columns, defaulting to all of them"""
+    public = PUBLIC_COLUMNS.get(model.__tablename__, ())
+    available = [column.name for column in model.__table__.columns if column.name in public]
+    if not fields:
+        return available
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return list(dict.fromkeys(fields))
+
+def columnar_from_rows(fields: List[str], rows: Sequence[Sequence[Any]]) -> Dict[str, Any]:
+    """Transpose result tuples into {field: [values]} with epoch-ms timestamps"""
+    columns = {}
+    for field, values in zip(fields, zip(*rows) if rows else [()] * len(fields)):
+        if any(isinstance(v, datetime) for v in values):
+            columns[field] = [to_epoch_ms(v) for v in values]
+        else:
+            columns[field] = list(values)
+
+    return {'fields': fields, 'count': len(rows), 'columns': columns}
+
+def columnar_query(model, query, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Run a model query selecting only the projected columns and return it columnar
+
+    Rows come back as plain tuples, so no ORM objects are hydrated and no
+    per-row dict or isoformat() call is made.
+    """
+    fields = model_fields(model, fields)
+    rows = query.with_entities(*[getattr(model, f) for f in fields]).all()
+    return columnar_from_rows(fields, rows)
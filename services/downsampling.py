@@ -0,0 +1,79 @@
+from typing import List, Dict, Any, Optional, Sequence
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+# Smallest output each method can produce; smaller max_points are raised to it
+MIN_POINTS = {'lttb': 3, 'minmax': 4}
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets
+
+    Bucket averages are computed for all buckets at once with reduceat;
+    only the per-bucket triangle argmax depends on the previous pick, so
+    the Python loop runs once per output point, not per input point.
+    """
+    n = len(x)
+    max_points = max(max_points, MIN_POINTS['lttb'])
+    if max_points >= n:
+        return np.arange(n)
+
+    # Interior points split into max_points - 2 buckets; first and last are always kept
+    edges = (np.floor(np.arange(max_points - 1) * (n - 2) / (max_points - 2)) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - next_x[bucket]) * (by - y[a]) - (x[a] - bx) * (next_y[bucket] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+
+    return selected
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the min and max of each bucket plus the endpoints, fully vectorized"""
+    n = len(x)
+    max_points = max(max_points, MIN_POINTS['minmax'])
+    if max_points >= n:
+        return np.arange(n)
+
+    buckets = (max_points - 2) // 2
+    bucket_ids = np.arange(n) * buckets // n
+    # Sort by (bucket, value): the first entry of each bucket is its min, the last its max
+    order = np.lexsort((y, bucket_ids))
+    sorted_ids = bucket_ids[order]
+    first = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+
+    return np.unique(np.concatenate(([0, n - 1], order[first], order[last])))
+
+def downsample_indices(timestamps: Sequence[float], values: Sequence[float], max_points: int,
+                       method: str = 'lttb') -> np.ndarray:
+    """Indices of a shape-preserving subset of at most max(max_points, MIN_POINTS[method]) samples"""
+    x = np.asarray(timestamps, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    if method == 'minmax':
+        return minmax_indices(x, y, max_points)
+    if method == 'lttb':
+        return lttb_indices(x, y, max_points)
+    raise ValueError(f'Unknown downsampling method: {method}')
+
+def downsample_records(records: List[Dict[str, Any]], max_points: Optional[int],
+                       value_key: str = 'value', time_key: str = 'timestamp',
+                       method: str = 'lttb') -> List[Dict[str, Any]]:
+    """Downsample a time-ordered list of records on one value column"""
+    if not max_points or len(records) <= max_points:
+        return records
+
+    records = [r for r in records if r.get(value_key) is not None]
+    timestamps = np.array([r[time_key].timestamp() for r in records])
+    values = np.array([r[value_key] for r in records], dtype=np.float64)
+    return [records[i] for i in downsample_indices(timestamps, values, max_points, method)]
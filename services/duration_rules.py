@@ -0,0 +1,149 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+import heapq
+import itertools
+import logging
+import threading
+
+CLEARED, PENDING, FIRING = 'cleared', 'pending', 'firing'
+
+class DurationRuleEngine:
+    """Per-device state machines for rules that must hold for a duration
+
+    Each (device, rule) moves cleared -> pending when its condition starts,
+    pending -> firing once it has held for ``duration_threshold`` seconds,
+    and back to cleared when the condition ends. Pending deadlines live in
+    a min-heap; entries are never removed eagerly. A popped entry whose
+    deadline no longer matches its state is dropped, and one whose deadline
+    was pushed back is re-queued, so readings cost O(1) and ``advance``
+    costs O(log n) per expiring timer rather than a scan of every device.
+
+    Conditions: ``truthy`` holds while a reading's ``field`` is truthy (door
+    open); ``silence`` holds while no reading arrives (connectivity loss).
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]]):
+        self.logger = logging.getLogger(__name__)
+        self.rules = {t: r for t, r in rules.items() if r.get('duration_threshold') and r.get('condition')}
+        self.states = {}  # (device_id, alert_type) -> [state, entered_at, deadline, scheduled_deadline]
+        self._heap = []  # (deadline, sequence, key)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def observe(self, device_id: str, reading: Dict[str, Any],
+                now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Feed a reading; returns 'cleared' events for rules that stopped firing"""
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        events = []
+
+        with self._lock:
+            for alert_type, rule in self.rules.items():
+                key = (device_id, alert_type)
+                state = self.states.get(key)
+
+                if rule['condition'] == 'silence':
+                    # A reading ends any silence and starts the next one
+                    if state is not None and state[0] == FIRING:
+                        events.append(self._event('cleared', key, state, now))
+                    self._enter_pending(key, state, now, rule)
+                    continue
+
+                value = reading.get(rule['field'])
+                if value is None:
+                    continue
+
+                if value:
+                    if state is None or state[0] == CLEARED:
+                        self._enter_pending(key, state, now, rule)
+                elif state is not None and state[0] != CLEARED:
+                    if state[0] == FIRING:
+                        events.append(self._event('cleared', key, state, now))
+                    state[0] = CLEARED
+
+        return events
+
+    def advance(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Expire due timers; returns 'fired' events for rules that held long enough"""
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        events = []
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, key = heapq.heappop(self._heap)
+                state = self.states.get(key)
+                if state is None or state[3] != deadline:
+                    continue  # superseded entry
+                state[3] = None
+
+                if state[0] != PENDING:
+                    continue
+                if state[2] > now:
+                    self._schedule(key, state)  # deadline moved later since this entry was queued
+                    continue
+
+                state[0] = FIRING
+                events.append(self._event('fired', key, state, now))
+
+        return events
+
+    def rearm(self, device_id: str, alert_type: str, now: Optional[float] = None) -> bool:
+        """Return a firing rule to pending so it fires again after another ``duration_threshold``
+
+        Used when the fired alert was suppressed: the condition still holds,
+        so the rule must get another chance rather than stay firing with no
+        alert. The original ``entered_at`` is kept.
+        """
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        key = (device_id, alert_type)
+        with self._lock:
+            state = self.states.get(key)
+            if state is None or state[0] != FIRING:
+                return False
+            state[0], state[2] = PENDING, now + self.rules[alert_type]['duration_threshold']
+            if state[3] is None or state[3] > state[2]:
+                self._schedule(key, state)
+            return True
+
+    def remove_device(self, device_id: str) -> None:
+        """Drop all state for a device; its queued timers become stale"""
+        with self._lock:
+            for alert_type in self.rules:
+                self.states.pop((device_id, alert_type), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """State counts and timer queue size"""
+        with self._lock:
+            counts = {CLEARED: 0, PENDING: 0, FIRING: 0}
+            for state in self.states.values():
+                counts[state[0]] += 1
+            return {**counts, 'queued_timers': len(self._heap)}
+
+    def _enter_pending(self, key, state, now: float, rule: Dict[str, Any]) -> None:
+        """Start (or restart) the condition clock for a key"""
+        deadline = now + rule['duration_threshold']
+        if state is None:
+            state = self.states[key] = [PENDING, now, deadline, None]
+        else:
+            state[0], state[1], state[2] = PENDING, now, deadline
+
+        # An entry due no later than the new deadline will re-queue itself when popped
+        if state[3] is None or state[3] > deadline:
+            self._schedule(key, state)
+
+    def _schedule(self, key, state) -> None:
+        """Queue a timer for the state's current deadline"""
+        state[3] = state[2]
+        heapq.heappush(self._heap, (state[2], next(self._sequence), key))
+
+    def _event(self, kind: str, key, state, now: float) -> Dict[str, Any]:
+        """Build a state transition event"""
+        rule = self.rules[key[1]]
+        return {
+            'event': kind,
+            'device_id': key[0],
+            'alert_type': key[1],
+            'severity': rule.get('severity', 'medium'),
+            'message': rule.get('message', key[1]),
+            'entered_at': datetime.fromtimestamp(state[1], tz=timezone.utc).isoformat(),
+            'duration_seconds': round(now - state[1], 1)
+        }
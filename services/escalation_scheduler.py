@@ -0,0 +1,233 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional
+import heapq
+import logging
+import threading
+from models import EscalationJob, db
+
+ESCALATION_ROLES = {
+    'critical': ['admin', 'operator'],
+    'high': ['operator', 'admin'],
+    'medium': ['operator'],
+    'low': ['operator']
+}
+
+def escalation_roles(severity: str) -> List[str]:
+    """Roles notified when an alert of a severity escalates"""
+    return ESCALATION_ROLES.get(severity, ['operator'])
+
+class EscalationScheduler:
+    """Durable delayed jobs for escalating unacknowledged alerts
+
+    Every job is a row in ``escalation_jobs`` and an entry in an in-memory
+    min-heap ordered by due time, and pending jobs are reloaded into the
+    heap on startup. ``cancel`` only drops the job from the live map and
+    marks its row by primary key; the heap entry is skipped when it
+    surfaces. ``run_due`` pops due jobs, whose rows stay pending until the
+    caller has delivered them: ``complete`` closes a batch with a single
+    UPDATE, and ``retry`` re-queues a failed delivery with a growing delay
+    until ``max_attempts``. The attempt count and next run time are kept on
+    the row, so a restart resumes the backoff rather than starting it over.
+    Idle ticks touch neither the database nor any alert.
+
+    Alerts correlated into one incident share one job: the alert that opens
+    the incident gets it, later alerts only attach to it. Acknowledging the
+    opening alert leaves the job in place once others have attached, since
+    the caller escalates whatever in the incident is still active.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]], batch_size: int = 100,
+                 default_minutes: Optional[float] = None, retry_seconds: float = 60.0,
+                 max_attempts: int = 3):
+        self.logger = logging.getLogger(__name__)
+        self.rules = rules
+        self.batch_size = batch_size
+        self.default_minutes = default_minutes
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.live = {}  # job_id -> job dict
+        self.jobs_by_alert = {}  # alert_id -> job_id
+        self.jobs_by_incident = {}  # incident_id -> job_id
+        self._heap = []  # (due epoch, job_id)
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        """Rebuild the heap from pending jobs after a restart"""
+        rows = EscalationJob.query.with_entities(
+            EscalationJob.id, EscalationJob.alert_id, EscalationJob.device_id,
+            EscalationJob.alert_type, EscalationJob.severity, EscalationJob.incident_id,
+            EscalationJob.due_at, EscalationJob.next_run_at, EscalationJob.attempts
+        ).filter_by(status='pending').all()
+
+        with self._lock:
+            self.live, self.jobs_by_alert, self.jobs_by_incident, self._heap = {}, {}, {}, []
+            for job_id, alert_id, device_id, alert_type, severity, incident_id, due_at, next_run_at, attempts in rows:
+                # How many alerts attached before the restart is unknown
+                self._heap.append(self._track(job_id, alert_id, device_id, alert_type, severity,
+                                              self._aware(due_at), incident_id, attached=None,
+                                              next_run_at=self._aware(next_run_at) if next_run_at else None,
+                                              attempts=attempts or 0))
+            heapq.heapify(self._heap)
+        return len(rows)
+
+    def schedule(self, alert_id: Any, device_id: str, alert_type: str,
+                 severity: str, incident_id: Optional[str] = None) -> Optional[int]:
+        """Persist and queue an escalation per the alert type's escalate_after_minutes
+
+        An alert whose incident already has a pending job attaches to it
+        instead, without a row of its own.
+        """
+        if incident_id is not None:
+            with self._lock:
+                job_id = self.jobs_by_incident.get(incident_id)
+                if job_id is not None:
+                    job = self.live[job_id]
+                    if job['attached'] is not None:
+                        job['attached'] += 1
+                    return job_id
+
+        minutes = self.rules.get(alert_type, {}).get('escalate_after_minutes', self.default_minutes)
+        if minutes is None:
+            return None
+
+        try:
+            due_at = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+            job = EscalationJob(alert_id=str(alert_id), device_id=device_id, alert_type=alert_type,
+                                severity=severity, incident_id=incident_id, due_at=due_at,
+                                next_run_at=due_at, attempts=0)
+            db.session.add(job)
+            db.session.commit()
+
+            with self._lock:
+                entry = self._track(job.id, str(alert_id), device_id, alert_type, severity, due_at, incident_id)
+                heapq.heappush(self._heap, entry)
+            return job.id
+
+        except Exception as e:
+            self.logger.error(f"Failed to schedule escalation for alert {alert_id}: {str(e)}")
+            db.session.rollback()
+            return None
+
+    def cancel(self, alert_id: Any) -> bool:
+        """Cancel the pending escalation of an alert, unless other alerts of its incident share it"""
+        with self._lock:
+            job_id = self.jobs_by_alert.get(str(alert_id))
+            if job_id is None:
+                return False
+            job = self.live[job_id]
+            if job['incident_id'] is not None and job['attached'] != 0:
+                return False
+            self.jobs_by_alert.pop(str(alert_id), None)
+            self._untrack(job)
+
+        try:
+            EscalationJob.query.filter_by(id=job_id, status='pending').update(
+                {'status': 'cancelled', 'processed_at': datetime.now(timezone.utc)}
+            )
+            db.session.commit()
+        except Exception as e:
+            self.logger.error(f"Failed to cancel escalation job {job_id}: {str(e)}")
+            db.session.rollback()
+        return True
+
+    def run_due(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Pop up to batch_size due jobs and return them; rows stay pending until complete or retry"""
+        now_epoch = (now or datetime.now(timezone.utc)).timestamp()
+        due = []
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_epoch and len(due) < self.batch_size:
+                _, job_id = heapq.heappop(self._heap)
+                job = self.live.get(job_id)
+                if job is None:
+                    continue  # cancelled
+                self.jobs_by_alert.pop(job['alert_id'], None)
+                self._untrack(job)
+                due.append(job)
+
+        for job in due:
+            job['notify_roles'] = escalation_roles(job['severity'])
+        return due
+
+    def complete(self, job_ids: List[int], status: str = 'done') -> None:
+        """Close delivered (or no longer needed) jobs with one UPDATE"""
+        if not job_ids:
+            return
+        try:
+            EscalationJob.query.filter(
+                EscalationJob.id.in_(job_ids),
+                EscalationJob.status == 'pending'
+            ).update({'status': status, 'processed_at': datetime.now(timezone.utc)}, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            self.logger.error(f"Failed to mark escalation jobs {status}: {str(e)}")
+            db.session.rollback()
+
+    def retry(self, job: Dict[str, Any], now: Optional[datetime] = None) -> bool:
+        """Re-queue a job whose delivery failed; marks it failed after max_attempts"""
+        now = now or datetime.now(timezone.utc)
+        job['attempts'] += 1
+        giving_up = job['attempts'] >= self.max_attempts
+        next_run_at = now + timedelta(seconds=self.retry_seconds * job['attempts'])
+        try:
+            changes = {'status': 'failed', 'processed_at': now} if giving_up else {'next_run_at': next_run_at}
+            EscalationJob.query.filter_by(id=job['job_id'], status='pending').update(
+                {'attempts': job['attempts'], **changes}
+            )
+            db.session.commit()
+        except Exception as e:
+            self.logger.error(f"Failed to reschedule escalation job {job['job_id']}: {str(e)}")
+            db.session.rollback()
+        if giving_up:
+            return False
+
+        with self._lock:
+            job['next_run_at'] = next_run_at
+            self.live[job['job_id']] = job
+            self.jobs_by_alert[job['alert_id']] = job['job_id']
+            if job['incident_id'] is not None:
+                self.jobs_by_incident.setdefault(job['incident_id'], job['job_id'])
+            heapq.heappush(self._heap, (next_run_at.timestamp(), job['job_id']))
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pending job count and next due time"""
+        with self._lock:
+            next_due = min((job['next_run_at'] for job in self.live.values()), default=None)
+            return {
+                'pending': len(self.live),
+                'queued': len(self._heap),
+                'next_due': next_due.isoformat() if next_due else None
+            }
+
+    def _track(self, job_id: int, alert_id: str, device_id: str, alert_type: str, severity: str,
+               due_at: datetime, incident_id: Optional[str] = None, attached: Optional[int] = 0,
+               next_run_at: Optional[datetime] = None, attempts: int = 0) -> tuple:
+        """Register a live job and return its heap entry"""
+        next_run_at = next_run_at or due_at
+        self.live[job_id] = {
+            'job_id': job_id,
+            'alert_id': alert_id,
+            'device_id': device_id,
+            'alert_type': alert_type,
+            'severity': severity,
+            'incident_id': incident_id,
+            'attached': attached,  # alerts attached since, None when unknown
+            'due_at': due_at,
+            'next_run_at': next_run_at,
+            'attempts': attempts
+        }
+        self.jobs_by_alert[alert_id] = job_id
+        if incident_id is not None:
+            self.jobs_by_incident[incident_id] = job_id
+        return (next_run_at.timestamp(), job_id)
+
+    def _untrack(self, job: Dict[str, Any]) -> None:
+        """Drop a job from the live and incident maps; caller holds the lock"""
+        self.live.pop(job['job_id'], None)
+        if self.jobs_by_incident.get(job['incident_id']) == job['job_id']:
+            del self.jobs_by_incident[job['incident_id']]
+
+    def _aware(self, value: datetime) -> datetime:
+        """Treat naive database timestamps as UTC"""
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
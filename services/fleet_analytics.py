@@ -0,0 +1,228 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Callable
+import logging
+import numpy as np
+import pandas as pd
+from models import SensorData, db
+
+class FleetComparisonEngine:
+    """Single-pass comparative analytics across many devices
+
+    All requested devices are loaded with one range query over
+    ``idx_device_timestamp`` as plain tuples (no ORM hydration) and every
+    per-device/per-sensor statistic is computed with vectorized group-bys.
+    """
+
+    def __init__(self, anomaly_threshold: float = 2.0,
+                 health_scorer: Callable[[Dict[str, Any]], float] = None):
+        self.logger = logging.getLogger(__name__)
+        self.anomaly_threshold = anomaly_threshold
+        self.health_scorer = health_scorer
+        self.stable_slope = 0.01
+
+    def compare(self, device_ids: List[str], hours: int = 24) -> Dict[str, Any]:
+        """Compare devices over the last ``hours`` in one database scan"""
+        start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+        frame = self.load_frame(device_ids, start_time)
+
+        individual_stats = self._compute_device_statistics(frame, device_ids, hours)
+
+        # Devices without readings are reported but neither ranked nor scored as outliers
+        with_data = {d: s for d, s in individual_stats.items() if s['total_readings']}
+        if not with_data:
+            return {'error': 'No valid data for comparison'}
+
+        return {
+            'comparison_period_hours': hours,
+            'devices_analyzed': len(with_data),
+            'individual_stats': individual_stats,
+            'comparative_metrics': self._compute_comparative_metrics(frame),
+            'rankings': self._rank_devices(with_data),
+            'outliers': self._identify_outliers(with_data)
+        }
+
+    def load_frame(self, device_ids: List[str], start_time: datetime) -> pd.DataFrame:
+        """Load readings for all devices as a column frame with one query"""
+        rows = db.session.query(
+            SensorData.device_id,
+            SensorData.sensor_type,
+            SensorData.value,
+            SensorData.unit,
+            SensorData.timestamp
+        ).filter(
+            SensorData.device_id.in_(device_ids),
+            SensorData.timestamp >= start_time
+        ).order_by(SensorData.device_id, SensorData.timestamp).all()
+
+        frame = pd.DataFrame(rows, columns=['device_id', 'sensor_type', 'value', 'unit', 'timestamp'])
+        frame['value'] = pd.to_numeric(frame['value'], errors='coerce')
+        return frame
+
+    def _compute_sensor_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Compute one row of statistics per (device, sensor type)"""
+        keys = ['device_id', 'sensor_type']
+        frame = frame.copy()
+        frame['missing'] = frame['value'].isna()
+        valid = frame[~frame['missing']].copy()
+
+        grouped = valid.groupby(keys, sort=False)['value']
+        stats = grouped.agg(['count', 'min', 'max', 'mean', 'median', 'last', 'nunique'])
+        stats['std'] = grouped.std(ddof=0)
+
+        # Least-squares slope against reading index from grouped sums
+        valid['x'] = grouped.cumcount().astype(float)
+        valid['xy'] = valid['x'] * valid['value']
+        valid['xx'] = valid['x'] * valid['x']
+        sums = valid.groupby(keys, sort=False)[['x', 'value', 'xy', 'xx']].sum()
+        n = stats['count']
+        denominator = n * sums['xx'] - sums['x'] ** 2
+        stats['slope'] = ((n * sums['xy'] - sums['x'] * sums['value']) /
+                          denominator.replace(0, np.nan)).fillna(0.0)
+
+        # Z-score anomalies per group
+        group_mean = grouped.transform('mean')
+        group_count = grouped.transform('count')
+        group_std = (grouped.transform('std') *
+                     np.sqrt((group_count - 1) / group_count)).replace(0, np.nan)
+        valid['anomaly'] = ((valid['value'] - group_mean).abs() / group_std) > self.anomaly_threshold
+        stats['anomaly_count'] = valid.groupby(keys, sort=False)['anomaly'].sum()
+
+        # IQR outliers for data quality
+        quartiles = grouped.quantile([0.25, 0.75]).unstack()
+        bounds = valid[keys].join(quartiles, on=keys)
+        iqr = bounds[0.75] - bounds[0.25]
+        valid['outlier'] = ((valid['value'] < bounds[0.25] - 1.5 * iqr) |
+                            (valid['value'] > bounds[0.75] + 1.5 * iqr))
+        stats['outlier_count'] = valid.groupby(keys, sort=False)['outlier'].sum()
+
+        totals = frame.groupby(keys, sort=False).agg(
+            total=('missing', 'size'), missing=('missing', 'sum'), unit=('unit', 'last')
+        )
+        return stats.join(totals, how='left')
+
+    def _compute_device_statistics(self, frame: pd.DataFrame, device_ids: List[str],
+                                   hours: int) -> Dict[str, Any]:
+        """Build the per-device statistics dictionaries"""
+        individual_stats = {
+            device_id: {
+                'device_id': device_id,
+                'period_hours': hours,
+                'total_readings': 0,
+                'statistics': {},
+                'message': 'No data available for the specified period'
+            } for device_id in device_ids
+        }
+        if frame.empty:
+            return individual_stats
+
+        sensor_stats = self._compute_sensor_frame(frame)
+        readings = frame.groupby('device_id')['timestamp'].agg(['size', 'min', 'max'])
+
+        for (device_id, sensor_type), row in sensor_stats.iterrows():
+            individual_stats[device_id]['statistics'][sensor_type] = self._format_sensor_stats(row)
+
+        for device_id, row in readings.iterrows():
+            statistics = individual_stats[device_id]['statistics']
+            individual_stats[device_id] = {
+                'device_id': device_id,
+                'period_hours': hours,
+                'total_readings': int(row['size']),
+                'statistics': statistics,
+                'data_range': {
+                    'start': row['min'].isoformat(),
+                    'end': row['max'].isoformat()
+                },
+                'health_score': self.health_scorer(statistics) if self.health_scorer else 0.0
+            }
+
+        return individual_stats
+
+    def _format_sensor_stats(self, row: pd.Series) -> Dict[str, Any]:
+        """Format one statistics row like AnalyticsService.get_device_statistics"""
+        count = int(row['count'])
+        slope = float(row['slope'])
+        if abs(slope) < self.stable_slope:
+            direction = 'stable'
+        elif slope > 0:
+            direction = 'increasing'
+        else:
+            direction = 'decreasing'
+
+        score = 100.0
+        issues = []
+        total = int(row['total'])
+        if total > count:
+            missing_ratio = (total - count) / total
+            score -= missing_ratio * 30
+            issues.append(f'missing_values: {missing_ratio:.2%}')
+        if int(row['nunique']) == 1 and count > 1:
+            score -= 20
+            issues.append('constant_values')
+        if count > 3 and row['outlier_count'] > 0:
+            outlier_ratio = float(row['outlier_count']) / count
+            score -= outlier_ratio * 20
+            issues.append(f'outliers: {outlier_ratio:.2%}')
+
+        return {
+            'count': count,
+            'min': float(row['min']),
+            'max': float(row['max']),
+            'avg': float(row['mean']),
+            'median': float(row['median']),
+            'std': float(row['std']) if count > 1 else 0.0,
+            'latest': float(row['last']),
+            'unit': row['unit'],
+            'trend': {
+                'direction': direction,
+                'strength': float(min(abs(slope) * 100, 100)),
+                'slope': slope
+            },
+            'anomalies': {
+                'count': int(row['anomaly_count']) if count >= 3 else 0,
+                'threshold': self.anomaly_threshold
+            },
+            'data_quality': {
+                'score': round(max(0, min(100, score)), 2),
+                'issues': issues
+            }
+        }
+
+    def _compute_comparative_metrics(self, frame: pd.DataFrame) -> Dict[str, Any]:
+        """Compare device averages within each sensor type"""
+        if frame.empty or frame['device_id'].nunique() < 2:
+            return {}
+
+        device_means = frame.dropna(subset=['value']).groupby(
+            ['sensor_type', 'device_id'])['value'].mean()
+
+        metrics = {}
+        for sensor_type, means in device_means.groupby(level=0):
+            means = means.droplevel(0)
+            metrics[sensor_type] = {
+                'fleet_avg': float(means.mean()),
+                'fleet_std': float(means.std(ddof=0)),
+                'min_device': means.idxmin(),
+                'max_device': means.idxmax(),
+                'devices': int(means.size)
+            }
+        return metrics
+
+    def _rank_devices(self, individual_stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Rank devices by health score"""
+        scores = pd.Series({d: s.get('health_score', 0) for d, s in individual_stats.items()})
+        scores = scores.sort_values(ascending=False, kind='stable')
+
+        return {
+            'ranked_devices': [{'device_id': d, 'health_score': float(v)} for d, v in scores.items()],
+            'top_device': scores.index[0] if len(scores) else None
+        }
+
+    def _identify_outliers(self, individual_stats: Dict[str, Any]) -> List[str]:
+        """Identify devices whose health score is over two standard deviations from the mean"""
+        if len(individual_stats) < 3:
+            return []
+
+        device_ids = np.array(list(individual_stats.keys()), dtype=object)
+        scores = np.array([s.get('health_score', 0) for s in individual_stats.values()], dtype=float)
+        mask = np.abs(scores - scores.mean()) > 2 * scores.std()
+        return device_ids[mask].tolist()
@@ -0,0 +1,232 @@
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from collections import defaultdict
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash_encode(latitude: float, longitude: float, precision: int) -> str:
+    """Encode a coordinate as a geohash of the given length"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return ''.join(chars)
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash cell"""
+    lat_bits = (5 * precision) // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class GeoIndex:
+    """In-memory geohash grid over device positions
+
+    Devices are bucketed by a fixed-precision geohash cell (precision 5 is
+    roughly 5 km x 5 km). Radius and bounding-box queries only visit the
+    cells covering the query box, then filter exactly, so their cost tracks
+    the number of nearby devices rather than the fleet size. Moving a device
+    is O(1): it leaves one cell and joins another.
+    """
+
+    def __init__(self, precision: int = 5):
+        self.precision = precision
+        self.cell_height, self.cell_width = cell_size(precision)
+        self.cells = defaultdict(set)  # geohash -> device_ids
+        self.positions = {}  # device_id -> (latitude, longitude, geohash)
+        self.attributes = {}  # device_id -> dict of indexed attributes
+        self._lock = threading.RLock()
+
+    def upsert(self, device_id: str, latitude: Optional[float], longitude: Optional[float],
+               **attributes) -> bool:
+        """Insert or move a device; returns False when the position is missing or invalid"""
+        if latitude is None or longitude is None:
+            if attributes:
+                self.update_attributes(device_id, **attributes)
+            return False
+
+        latitude, longitude = float(latitude), float(longitude)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return False
+
+        cell = geohash_encode(latitude, longitude, self.precision)
+        with self._lock:
+            previous = self.positions.get(device_id)
+            if previous is not None and previous[2] != cell:
+                self._leave(device_id, previous[2])
+            self.cells[cell].add(device_id)
+            self.positions[device_id] = (latitude, longitude, cell)
+            self.attributes.setdefault(device_id, {}).update(attributes)
+        return True
+
+    def update_attributes(self, device_id: str, **attributes) -> None:
+        """Update attributes (status, temperature, ...) used in aggregations"""
+        with self._lock:
+            if device_id in self.positions:
+                self.attributes.setdefault(device_id, {}).update(attributes)
+
+    def remove(self, device_id: str) -> None:
+        """Drop a device from the index"""
+        with self._lock:
+            previous = self.positions.pop(device_id, None)
+            self.attributes.pop(device_id, None)
+            if previous is not None:
+                self._leave(device_id, previous[2])
+
+    def load(self, devices: Iterable[Dict[str, Any]]) -> int:
+        """Bulk index device dicts carrying device_id, latitude and longitude"""
+        count = 0
+        for device in devices:
+            if self.upsert(device['device_id'], device.get('latitude'), device.get('longitude'),
+                           **{k: device.get(k) for k in ('name', 'location', 'status', 'device_type')}):
+                count += 1
+        return count
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Devices within radius_km of a point, nearest first"""
+        d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+        d_lng = min(180.0, d_lat / cos_lat)
+
+        results = []
+        with self._lock:
+            for device_id in self._candidates(latitude - d_lat, longitude - d_lng,
+                                              latitude + d_lat, longitude + d_lng):
+                device_lat, device_lng, _ = self.positions[device_id]
+                distance = haversine_km(latitude, longitude, device_lat, device_lng)
+                if distance <= radius_km:
+                    results.append(self._entry(device_id, distance_km=round(distance, 3)))
+
+        results.sort(key=lambda entry: entry['distance_km'])
+        return results[:limit] if limit else results
+
+    def within_bbox(self, min_lat: float, min_lng: float, max_lat: float,
+                    max_lng: float) -> List[Dict[str, Any]]:
+        """Devices inside a bounding box"""
+        with self._lock:
+            return [
+                self._entry(device_id)
+                for device_id in self._candidates(min_lat, min_lng, max_lat, max_lng)
+                if min_lat <= self.positions[device_id][0] <= max_lat
+                and min_lng <= self.positions[device_id][1] <= max_lng
+            ]
+
+    def aggregate(self, by: str = 'geohash', precision: int = 4,
+                  bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict[str, Any]:
+        """Aggregate devices by geohash cell or by the region part of their location label"""
+        groups = defaultdict(lambda: {
+            'count': 0, 'lat_sum': 0.0, 'lng_sum': 0.0, 'statuses': defaultdict(int),
+            'temperature_sum': 0.0, 'temperature_count': 0
+        })
+
+        with self._lock:
+            device_ids = self._candidates(*bbox) if bbox else self.positions.keys()
+            for device_id in device_ids:
+                latitude, longitude, cell = self.positions[device_id]
+                if bbox and not (bbox[0] <= latitude <= bbox[2] and bbox[1] <= longitude <= bbox[3]):
+                    continue
+                attributes = self.attributes.get(device_id, {})
+
+                if by == 'region':
+                    label = attributes.get('location') or 'Unknown'
+                    key = label.split(',')[-1].strip() or 'Unknown'
+                elif precision <= self.precision:
+                    key = cell[:precision]
+                else:
+                    key = geohash_encode(latitude, longitude, precision)
+
+                group = groups[key]
+                group['count'] += 1
+                group['lat_sum'] += latitude
+                group['lng_sum'] += longitude
+                group['statuses'][attributes.get('status') or 'unknown'] += 1
+                if attributes.get('temperature') is not None:
+                    group['temperature_sum'] += attributes['temperature']
+                    group['temperature_count'] += 1
+
+        regions = {}
+        for key, group in groups.items():
+            regions[key] = {
+                'device_count': group['count'],
+                'centroid': {
+                    'latitude': round(group['lat_sum'] / group['count'], 5),
+                    'longitude': round(group['lng_sum'] / group['count'], 5)
+                },
+                'statuses': dict(group['statuses']),
+                'avg_temperature': round(group['temperature_sum'] / group['temperature_count'], 2)
+                if group['temperature_count'] else None
+            }
+
+        return {'group_by': by, 'precision': precision if by == 'geohash' else None,
+                'total_devices': sum(g['device_count'] for g in regions.values()), 'regions': regions}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size information"""
+        with self._lock:
+            return {'devices': len(self.positions), 'cells': len(self.cells), 'precision': self.precision}
+
+    def _candidates(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> List[str]:
+        """Device ids in every cell overlapping a bounding box"""
+        min_lat, max_lat = max(-90.0, min_lat), min(90.0, max_lat)
+        min_lng, max_lng = max(-180.0, min_lng), min(180.0, max_lng)
+
+        rows = math.floor((max_lat + 90) / self.cell_height) - math.floor((min_lat + 90) / self.cell_height) + 1
+        cols = math.floor((max_lng + 180) / self.cell_width) - math.floor((min_lng + 180) / self.cell_width) + 1
+
+        # For boxes spanning more cells than there are devices a direct scan is cheaper
+        if rows * cols > len(self.positions):
+            return [device_id for device_id, (lat, lng, _) in self.positions.items()
+                    if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng]
+
+        first_lat = (math.floor((min_lat + 90) / self.cell_height) + 0.5) * self.cell_height - 90
+        first_lng = (math.floor((min_lng + 180) / self.cell_width) + 0.5) * self.cell_width - 180
+
+        candidates = []
+        for row in range(rows):
+            cell_lat = min(first_lat + row * self.cell_height, 90.0)
+            for col in range(cols):
+                cell_lng = min(first_lng + col * self.cell_width, 180.0)
+                cell = self.cells.get(geohash_encode(cell_lat, cell_lng, self.precision))
+                if cell:
+                    candidates.extend(cell)
+        return candidates
+
+    def _entry(self, device_id: str, **extra) -> Dict[str, Any]:
+        """Result record for a device"""
+        latitude, longitude, cell = self.positions[device_id]
+        return {'device_id': device_id, 'latitude': latitude, 'longitude': longitude,
+                'geohash': cell, **self.attributes.get(device_id, {}), **extra}
+
+    def _leave(self, device_id: str, cell: str) -> None:
+        """Remove a device from a cell, dropping the cell when empty"""
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(device_id)
+            if not members:
+                del self.cells[cell]
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Iterable, Tuple
+import logging
+import threading
+from sqlalchemy import bindparam
+from models import Device, db
+
+class HeartbeatWatchdog:
+    """Last-heard tracking with batched ``last_seen`` persistence
+
+    Heartbeats only update an in-memory map and mark the device dirty.
+    ``flush`` writes every dirty device's ``last_seen`` in one executemany
+    UPDATE per batch, so persistence costs one statement per interval
+    instead of one per reading. Silence detection itself is a ``silence``
+    duration rule on the timer heap. This is the one last-heard record;
+    uptime sessions read from it.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.logger = logging.getLogger(__name__)
+        self.batch_size = batch_size
+        self.last_heard = {}  # device_id -> datetime
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[Tuple[str, Optional[datetime]]]) -> int:
+        """Seed last-heard times from persisted (device_id, last_seen) rows without marking them dirty"""
+        with self._lock:
+            for device_id, last_seen in rows:
+                if last_seen is not None and device_id not in self.last_heard:
+                    self.last_heard[device_id] = last_seen if last_seen.tzinfo else last_seen.replace(tzinfo=timezone.utc)
+            return len(self.last_heard)
+
+    def heartbeat(self, device_id: str, timestamp: Optional[datetime] = None) -> None:
+        """Record that a device was heard from"""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        with self._lock:
+            self.last_heard[device_id] = timestamp
+            self._dirty.add(device_id)
+
+    def get_last_seen(self, device_id: str) -> Optional[datetime]:
+        """Most recent time a device was heard from since startup"""
+        return self.last_heard.get(device_id)
+
+    def flush(self) -> int:
+        """Persist last_seen for devices heard from since the previous flush"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            updates = [{'b_device_id': d, 'b_last_seen': self.last_heard[d]} for d in self._dirty]
+            self._dirty = set()
+
+        table = Device.__table__
+        statement = table.update().where(
+            table.c.device_id == bindparam('b_device_id')
+        ).values(last_seen=bindparam('b_last_seen'))
+
+        try:
+            for start in range(0, len(updates), self.batch_size):
+                db.session.execute(statement, updates[start:start + self.batch_size])
+            db.session.commit()
+            return len(updates)
+
+        except Exception as e:
+            self.logger.error(f"Failed to persist last_seen: {str(e)}")
+            db.session.rollback()
+            with self._lock:
+                self._dirty.update(u['b_device_id'] for u in updates)
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tracked and pending-write device counts"""
+        return {'tracked_devices': len(self.last_heard), 'pending_writes': len(self._dirty)}
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+import base64
+import logging
+import numpy as np
+from sqlalchemy import and_, or_
+from models import SensorData, db
+from services.downsampling import downsample_indices
+from services.columnar import to_epoch_ms
+
+HISTORY_FIELDS = ('temperature', 'humidity', 'battery_level', 'door_open', 'power_status',
+                  'signal_strength', 'sensor_type', 'value', 'unit')
+
+class SensorHistoryService:
+    """Range queries over sensor history on the (device_id, timestamp) index
+
+    Only the projected columns are selected, as tuples, and pages continue
+    from an opaque (timestamp, id) keyset cursor instead of an OFFSET, so
+    every page is an index range scan regardless of depth.
+    """
+
+    def __init__(self, default_limit: int = 100, max_limit: int = 50000):
+        self.logger = logging.getLogger(__name__)
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+
+    def query(self, device_id: str, start_time: Optional[datetime] = None,
+              end_time: Optional[datetime] = None, limit: Optional[int] = None,
+              fields: Optional[List[str]] = None, cursor: Optional[str] = None,
+              order: str = 'desc', max_points: Optional[int] = None,
+              downsample_field: str = 'temperature', method: str = 'lttb') -> Dict[str, Any]:
+        """Fetch one page of history as column arrays
+
+        With ``max_points`` and no explicit ``limit`` the page covers the
+        window up to ``max_limit`` rows, so downsampling sees the whole range
+        rather than the newest ``default_limit`` readings.
+        """
+        fields = self._resolve_fields(fields)
+        if limit is None and max_points:
+            limit = self.max_limit
+        limit = min(max(1, limit or self.default_limit), self.max_limit)
+        descending = order != 'asc'
+
+        columns = [SensorData.timestamp, SensorData.id] + [getattr(SensorData, f) for f in fields]
+        query = db.session.query(*columns).filter(SensorData.device_id == device_id)
+        if start_time is not None:
+            query = query.filter(SensorData.timestamp >= start_time)
+        if end_time is not None:
+            query = query.filter(SensorData.timestamp <= end_time)
+
+        if cursor:
+            cursor_time, cursor_id = self._decode_cursor(cursor)
+            if descending:
+                query = query.filter(or_(
+                    SensorData.timestamp < cursor_time,
+                    and_(SensorData.timestamp == cursor_time, SensorData.id < cursor_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    SensorData.timestamp > cursor_time,
+                    and_(SensorData.timestamp == cursor_time, SensorData.id > cursor_id)
+                ))
+
+        if descending:
+            query = query.order_by(SensorData.timestamp.desc(), SensorData.id.desc())
+        else:
+            query = query.order_by(SensorData.timestamp, SensorData.id)
+
+        # One extra row tells whether another page exists
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = self._encode_cursor(rows[-1][0], rows[-1][1]) if has_more and rows else None
+
+        downsampled = False
+        if max_points and len(rows) > max_points and downsample_field in fields:
+            rows = self._downsample(rows, 2 + fields.index(downsample_field), max_points, method, descending)
+            downsampled = True
+
+        columns_out = {'timestamp': [r[0] for r in rows]}
+        for offset, field in enumerate(fields, start=2):
+            columns_out[field] = [r[offset] for r in rows]
+
+        return {
+            'device_id': device_id,
+            'fields': ['timestamp'] + fields,
+            'count': len(rows),
+            'columns': columns_out,
+            'next_cursor': next_cursor,
+            'downsampled': downsampled
+        }
+
+    def to_rows(self, page: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Row-per-reading view of a page, with ISO timestamps"""
+        columns = page['columns']
+        rows = []
+        for index, timestamp in enumerate(columns['timestamp']):
+            row = {'device_id': page['device_id'], 'timestamp': timestamp.isoformat()}
+            for field in page['fields'][1:]:
+                row[field] = columns[field][index]
+            rows.append(row)
+        return rows
+
+    def to_columnar(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Columnar view of a page, with epoch-millisecond timestamps"""
+        columns = dict(page['columns'])
+        columns['timestamp'] = [to_epoch_ms(t) for t in columns['timestamp']]
+        return {**page, 'columns': columns}
+
+    def _downsample(self, rows: List[Tuple], value_index: int, max_points: int,
+                    method: str, descending: bool) -> List[Tuple]:
+        """Keep a shape-preserving subset of rows, skipping rows without a value"""
+        rows = [r for r in rows if r[value_index] is not None]
+        if descending:
+            rows.reverse()
+        epochs = np.array([self._aware(r[0]).timestamp() for r in rows])
+        values = np.array([r[value_index] for r in rows], dtype=np.float64)
+        kept = [rows[i] for i in downsample_indices(epochs, values, max_points, method)]
+        if descending:
+            kept.reverse()
+        return kept
+
+    def _resolve_fields(self, fields: Optional[List[str]]) -> List[str]:
+        """Validate a projection, defaulting to all history fields"""
+        if not fields:
+            return list(HISTORY_FIELDS)
+        unknown = [f for f in fields if f not in HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        return list(dict.fromkeys(fields))
+
+    def _encode_cursor(self, timestamp: datetime, row_id: str) -> str:
+        """Opaque continuation token for the last row of a page"""
+        raw = f'{timestamp.isoformat()}|{row_id}'.encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def _decode_cursor(self, cursor: str) -> Tuple[datetime, str]:
+        """Decode a continuation token"""
+        try:
+            timestamp, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+            return datetime.fromisoformat(timestamp), row_id
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+    def _aware(self, value: datetime) -> datetime:
+        """Treat naive database timestamps as UTC"""
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -0,0 +1,229 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+import math
+import threading
+import time
+import uuid
+from services.geo_index import haversine_km
+
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+KM_PER_DEGREE = 111.32
+
+def incident_from_alerts(incident_id: str, alerts: List[Dict[str, Any]],
+                         positions: Optional[Dict[str, Tuple[float, ...]]] = None) -> Dict[str, Any]:
+    """Incident summary rebuilt from alert dicts, for incidents the correlator has already closed
+
+    ``positions`` maps device ids to (latitude, longitude, ...); the
+    centroid is the mean over alerts whose device has one.
+    """
+    alert_types, devices, points = {}, set(), []
+    severity = 'low'
+    for alert in alerts:
+        alert_types[alert['alert_type']] = alert_types.get(alert['alert_type'], 0) + 1
+        devices.add(alert['device_id'])
+        if SEVERITY_RANK.get(alert['severity'], 1) > SEVERITY_RANK.get(severity, 1):
+            severity = alert['severity']
+        position = (positions or {}).get(alert['device_id'])
+        if position is not None:
+            points.append(position[:2])
+
+    return {
+        'id': incident_id,
+        'opened_at': min((a['created_at'] for a in alerts if a.get('created_at')), default=None),
+        'last_alert_at': max((a['created_at'] for a in alerts if a.get('created_at')), default=None),
+        'centroid': [sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)]
+        if points else None,
+        'location': None,
+        'severity': severity,
+        'alert_count': len(alerts),
+        'device_count': len(devices),
+        'device_ids': sorted(devices),
+        'alert_types': alert_types
+    }
+
+class IncidentCorrelator:
+    """Incremental clustering of alerts into location/time incidents
+
+    An alert joins the open incident whose centroid lies within
+    ``radius_km`` of the device and that saw an alert in the last
+    ``window_seconds``; otherwise it opens a new incident. Open incidents
+    are bucketed on a grid of ``radius_km`` cells, so a lookup only
+    inspects the 3x3 cells around the device. Devices without coordinates
+    cluster by their location label. An incident closes once it has been
+    quiet for a full window.
+
+    ``correlate`` also decides whether the incident is worth a
+    notification: when it opens, when its severity rises, and when its
+    alert count has grown ``renotify_factor`` times since the last one, so
+    a storm of N alerts notifies O(log N) times instead of N.
+    """
+
+    def __init__(self, window_seconds: float = 300, radius_km: float = 10.0,
+                 renotify_factor: int = 5):
+        self.logger = logging.getLogger(__name__)
+        self.window_seconds = window_seconds
+        self.radius_km = radius_km
+        self.renotify_factor = renotify_factor
+        self.cell_degrees = radius_km / KM_PER_DEGREE
+        self.incidents = {}  # incident_id -> open incident
+        self.cells = {}  # grid cell or location label -> set of incident ids
+        self.alert_incidents = {}  # alert_id -> incident_id
+        self._lock = threading.Lock()
+        self.stats = {'alerts': 0, 'incidents': 0, 'notifications': 0}
+
+    def correlate(self, alert_id: Any, device_id: str, alert_type: str, severity: str,
+                  position: Optional[Tuple[float, float]] = None, location: Optional[str] = None,
+                  now: Optional[float] = None) -> Tuple[Dict[str, Any], bool]:
+        """Attach an alert to an incident; returns (incident summary, whether to notify)"""
+        now = now if now is not None else time.time()
+
+        with self._lock:
+            incident = self._match(position, location or device_id, now)
+            if incident is None:
+                incident = self._open(position, location or device_id, now)
+
+            incident['alert_ids'].append(str(alert_id))
+            incident['device_ids'].add(device_id)
+            incident['alert_types'][alert_type] = incident['alert_types'].get(alert_type, 0) + 1
+            incident['last_alert_at'] = now
+            if SEVERITY_RANK.get(severity, 1) > SEVERITY_RANK.get(incident['severity'], 1):
+                incident['severity'] = severity
+            if position is not None:
+                self._move_centroid(incident, position)
+            self.alert_incidents[str(alert_id)] = incident['id']
+
+            count = len(incident['alert_ids'])
+            notify = (
+                incident['notified_count'] == 0
+                or SEVERITY_RANK.get(incident['severity'], 1) > SEVERITY_RANK.get(incident['notified_severity'], 1)
+                or count >= incident['notified_count'] * self.renotify_factor
+            )
+            if notify:
+                incident['notified_count'] = count
+                incident['notified_severity'] = incident['severity']
+                self.stats['notifications'] += 1
+
+            self.stats['alerts'] += 1
+            return self._summary(incident), notify
+
+    def expire(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Close incidents quiet for a full window; returns their summaries"""
+        with self._lock:
+            return self._expire(now if now is not None else time.time())
+
+    def get_incident(self, alert_id: Any) -> Optional[Dict[str, Any]]:
+        """Open incident an alert belongs to"""
+        with self._lock:
+            incident = self.incidents.get(self.alert_incidents.get(str(alert_id)))
+            return self._summary(incident) if incident else None
+
+    def get_open(self) -> List[Dict[str, Any]]:
+        """Open incidents, most recently active first"""
+        with self._lock:
+            incidents = sorted(self.incidents.values(), key=lambda i: i['last_alert_at'], reverse=True)
+            return [self._summary(incident) for incident in incidents]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Alert, incident and notification counts"""
+        stats = dict(self.stats)
+        stats['open_incidents'] = len(self.incidents)
+        if stats['alerts']:
+            stats['notification_ratio'] = round(stats['notifications'] / stats['alerts'], 3)
+        return stats
+
+    def _match(self, position, label: str, now: float) -> Optional[Dict[str, Any]]:
+        """Nearest open incident within the radius that is still inside its window"""
+        best, best_distance = None, None
+        for key in self._neighbour_keys(position, label):
+            for incident_id in self.cells.get(key, ()):
+                incident = self.incidents[incident_id]
+                if now - incident['last_alert_at'] > self.window_seconds:
+                    continue
+                if position is None:
+                    return incident
+                if incident['centroid'] is None:
+                    continue
+                distance = haversine_km(position[0], position[1], *incident['centroid'])
+                if distance <= self.radius_km and (best_distance is None or distance < best_distance):
+                    best, best_distance = incident, distance
+        return best
+
+    def _open(self, position, label: str, now: float) -> Dict[str, Any]:
+        """Start a new incident at a position or location label"""
+        incident = {
+            'id': str(uuid.uuid4()),
+            'opened_at': now,
+            'last_alert_at': now,
+            'centroid': tuple(position) if position is not None else None,
+            'location': label if position is None else None,
+            'cell': self._cell(position) if position is not None else label,
+            'alert_ids': [],
+            'device_ids': set(),
+            'alert_types': {},
+            'severity': 'low',
+            'notified_count': 0,
+            'notified_severity': None
+        }
+        self.incidents[incident['id']] = incident
+        self.cells.setdefault(incident['cell'], set()).add(incident['id'])
+        self.stats['incidents'] += 1
+        return incident
+
+    def _move_centroid(self, incident: Dict[str, Any], position) -> None:
+        """Running mean of alert positions; re-buckets the incident if it drifts across cells"""
+        n = len(incident['alert_ids'])
+        lat, lng = incident['centroid']
+        incident['centroid'] = (lat + (position[0] - lat) / n, lng + (position[1] - lng) / n)
+
+        cell = self._cell(incident['centroid'])
+        if cell != incident['cell']:
+            self._unbucket(incident)
+            incident['cell'] = cell
+            self.cells.setdefault(cell, set()).add(incident['id'])
+
+    def _expire(self, now: float) -> List[Dict[str, Any]]:
+        """Close and unbucket incidents past their window"""
+        closed = [i for i in self.incidents.values() if now - i['last_alert_at'] > self.window_seconds]
+        for incident in closed:
+            del self.incidents[incident['id']]
+            self._unbucket(incident)
+            for alert_id in incident['alert_ids']:
+                self.alert_incidents.pop(alert_id, None)
+        return [self._summary(incident) for incident in closed]
+
+    def _unbucket(self, incident: Dict[str, Any]) -> None:
+        """Remove an incident from its grid cell"""
+        bucket = self.cells.get(incident['cell'])
+        if bucket is not None:
+            bucket.discard(incident['id'])
+            if not bucket:
+                del self.cells[incident['cell']]
+
+    def _cell(self, position) -> Tuple[int, int]:
+        """Grid cell of a coordinate"""
+        return (math.floor(position[0] / self.cell_degrees), math.floor(position[1] / self.cell_degrees))
+
+    def _neighbour_keys(self, position, label: str) -> List[Any]:
+        """Cells that can hold an incident within the radius"""
+        if position is None:
+            return [label]
+        row, col = self._cell(position)
+        # Longitude degrees shrink with latitude, so widen the column span accordingly
+        span = max(1, math.ceil(1 / max(math.cos(math.radians(position[0])), 0.01)))
+        return [(row + dr, col + dc) for dr in (-1, 0, 1) for dc in range(-span, span + 1)]
+
+    def _summary(self, incident: Dict[str, Any]) -> Dict[str, Any]:
+        """Serializable view of an incident"""
+        return {
+            'id': incident['id'],
+            'opened_at': datetime.fromtimestamp(incident['opened_at'], tz=timezone.utc).isoformat(),
+            'last_alert_at': datetime.fromtimestamp(incident['last_alert_at'], tz=timezone.utc).isoformat(),
+            'centroid': list(incident['centroid']) if incident['centroid'] else None,
+            'location': incident['location'],
+            'severity': incident['severity'],
+            'alert_count': len(incident['alert_ids']),
+            'device_count': len(incident['device_ids']),
+            'device_ids': sorted(incident['device_ids']),
+            'alert_types': dict(incident['alert_types'])
+        }
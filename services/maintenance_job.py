@@ -0,0 +1,166 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import logging
+import os
+import numpy as np
+from models import SensorData, MaintenancePrediction, db
+
+Reading = namedtuple('Reading', ['sensor_type', 'value'])
+
+# Per-process state for pool workers
+_worker_service = None
+
+def _get_worker_service():
+    """Create the analytics service once per worker process"""
+    global _worker_service
+    if _worker_service is None:
+        from services.analytics_service import AnalyticsService
+        _worker_service = AnalyticsService()
+    return _worker_service
+
+def _predict_chunk(shm_values: str, shm_codes: str, total: int, sensor_types: List[str],
+                   devices: List[Tuple[str, int, int]]) -> List[Dict[str, Any]]:
+    """Compute predictions for a chunk of devices from shared-memory arrays"""
+    values_block = shared_memory.SharedMemory(name=shm_values)
+    codes_block = shared_memory.SharedMemory(name=shm_codes)
+    try:
+        values = np.ndarray((total,), dtype=np.float64, buffer=values_block.buf)
+        codes = np.ndarray((total,), dtype=np.int16, buffer=codes_block.buf)
+        service = _get_worker_service()
+
+        results = []
+        for device_id, start, end in devices:
+            readings = [
+                Reading(sensor_types[code], None if np.isnan(value) else float(value))
+                for code, value in zip(codes[start:end].tolist(), values[start:end].tolist())
+            ]
+            prediction = service.build_maintenance_prediction(device_id, readings)
+            prediction.setdefault('device_id', device_id)
+            results.append(prediction)
+        return results
+    finally:
+        values_block.close()
+        codes_block.close()
+
+class MaintenanceBatchJob:
+    """Fleet-wide maintenance prediction job run on a process pool
+
+    The history window is loaded with one ordered query, packed into
+    shared-memory arrays and partitioned by device across worker processes,
+    so workers read the data without pickling it per task. Results are
+    upserted into ``maintenance_predictions`` with their computed_at time.
+    """
+
+    def __init__(self, workers: Optional[int] = None, history_days: int = 30):
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers or os.cpu_count() or 1
+        self.history_days = history_days
+        self.last_run = None
+
+    def run(self) -> Dict[str, Any]:
+        """Compute and persist predictions for every device with recent data"""
+        started_at = datetime.now(timezone.utc)
+        try:
+            device_ids, offsets, values, codes, sensor_types = self._load_arrays(started_at)
+            if not device_ids:
+                return {'devices': 0, 'computed_at': started_at.isoformat()}
+
+            predictions = self._predict_parallel(device_ids, offsets, values, codes, sensor_types)
+            self._persist(predictions, started_at)
+
+            self.last_run = {
+                'devices': len(predictions),
+                'readings': int(len(values)),
+                'workers': self.workers,
+                'duration_seconds': round((datetime.now(timezone.utc) - started_at).total_seconds(), 2),
+                'computed_at': started_at.isoformat()
+            }
+            self.logger.info(f"Maintenance batch job completed: {self.last_run}")
+            return self.last_run
+
+        except Exception as e:
+            self.logger.error(f"Maintenance batch job failed: {str(e)}")
+            db.session.rollback()
+            return {'error': str(e)}
+
+    def _load_arrays(self, now: datetime) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """Load recent readings into column arrays grouped by device"""
+        start_time = now - timedelta(days=self.history_days)
+        rows = db.session.query(
+            SensorData.device_id,
+            SensorData.sensor_type,
+            SensorData.value
+        ).filter(
+            SensorData.timestamp >= start_time
+        ).order_by(SensorData.device_id, SensorData.timestamp).all()
+
+        if not rows:
+            return [], np.array([], dtype=np.int64), np.array([]), np.array([], dtype=np.int16), []
+
+        device_column, type_column, value_column = zip(*rows)
+        values = np.array([np.nan if v is None else v for v in value_column], dtype=np.float64)
+        sensor_types, codes = np.unique(np.array(type_column, dtype=object).astype(str), return_inverse=True)
+
+        devices = np.array(device_column, dtype=object)
+        boundaries = np.flatnonzero(devices[1:] != devices[:-1]) + 1
+        offsets = np.concatenate(([0], boundaries, [len(devices)]))
+        device_ids = devices[offsets[:-1]].tolist()
+
+        return device_ids, offsets, values, codes.astype(np.int16), sensor_types.tolist()
+
+    def _predict_parallel(self, device_ids: List[str], offsets: np.ndarray, values: np.ndarray,
+                          codes: np.ndarray, sensor_types: List[str]) -> List[Dict[str, Any]]:
+        """Fan device ranges out to the process pool over shared memory"""
+        values_block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        codes_block = shared_memory.SharedMemory(create=True, size=max(codes.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=values.dtype, buffer=values_block.buf)[:] = values
+            np.ndarray(codes.shape, dtype=codes.dtype, buffer=codes_block.buf)[:] = codes
+
+            devices = [(device_id, int(offsets[i]), int(offsets[i + 1]))
+                       for i, device_id in enumerate(device_ids)]
+            chunk_size = max(1, len(devices) // (self.workers * 4))
+            chunks = [devices[i:i + chunk_size] for i in range(0, len(devices), chunk_size)]
+
+            predictions = []
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(_predict_chunk, values_block.name, codes_block.name,
+                                    len(values), sensor_types, chunk)
+                    for chunk in chunks
+                ]
+                for future in futures:
+                    predictions.extend(future.result())
+            return predictions
+        finally:
+            values_block.close()
+            values_block.unlink()
+            codes_block.close()
+            codes_block.unlink()
+
+    def _persist(self, predictions: List[Dict[str, Any]], computed_at: datetime) -> None:
+        """Upsert predictions in a single transaction"""
+        existing = {
+            p.device_id: p for p in MaintenancePrediction.query.filter(
+                MaintenancePrediction.device_id.in_([p.get('device_id') for p in predictions])
+            ).all()
+        }
+
+        for prediction in predictions:
+            device_id = prediction.get('device_id')
+            if not device_id:
+                continue
+
+            record = existing.get(device_id)
+            if record is None:
+                record = MaintenancePrediction(device_id=device_id)
+                db.session.add(record)
+
+            record.maintenance_score = prediction.get('maintenance_score')
+            record.set_prediction(prediction)
+            record.computed_at = computed_at
+
+        db.session.commit()
@@ -4,12 +4,15 @@ import json
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from flask import current_app
 import requests
 
 from models import Alert, User, Device
 
+# Channels addressed to individual users; escalations route these by role
+ROLE_CHANNELS = ('email', 'sms')
+
 class NotificationService:
     """Multi-channel notification service for alert delivery"""
     
@@ -24,26 +27,39 @@ class NotificationService:
             'webhook': self._send_webhook_notification
         }
         
-    def send_alert_notification(self, alert: Alert) -> Dict[str, Any]:
-        """Send alert notification through multiple channels"""
+    def send_alert_notification(self, alert: Union[Alert, Dict[str, Any]],
+                                roles: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Send alert notification through multiple channels
+
+        ``alert`` is an Alert row or a plain dict shaped like ``Alert.to_dict()``
+        (incident and maintenance summaries). ``roles`` overrides the
+        severity-based recipients of user-addressed channels (email, SMS),
+        as escalations notify specific roles.
+        """
+        if isinstance(alert, Alert):
+            alert = alert.to_dict()
         try:
             results = {
-                'alert_id': alert.id,
+                'alert_id': alert['id'],
                 'timestamp': datetime.now(timezone.utc).isoformat(),
                 'channels': {}
             }
             
             # Get device information
-            device = Device.query.filter_by(device_id=alert.device_id).first()
+            device = Device.query.filter_by(device_id=alert['device_id']).first()
             
             # Get notification preferences based on alert severity
-            notification_config = self._get_notification_config(alert.severity)
+            notification_config = self._get_notification_config(alert['severity'])
             
             # Send through configured channels
             for channel in notification_config.get('channels', ['websocket']):
                 try:
                     if channel in self.notification_channels:
-                        result = self.notification_channels[channel](alert, device)
+                        sender = self.notification_channels[channel]
+                        if channel in ROLE_CHANNELS:
+                            result = sender(alert, device, roles)
+                        else:
+                            result = sender(alert, device)
                         results['channels'][channel] = result
                     else:
                         self.logger.warning(f"Unknown notification channel: {channel}")
@@ -56,9 +72,15 @@ class NotificationService:
             return results
             
         except Exception as e:
-            self.logger.error(f"Notification sending failed for alert {alert.id}: {str(e)}")
+            self.logger.error(f"Notification sending failed for alert {alert.get('id')}: {str(e)}")
             return {'error': str(e)}
     
+    def delivered(self, results: Dict[str, Any]) -> bool:
+        """Whether a send completed with no channel reporting an error"""
+        if 'error' in results or results.get('status') == 'error':
+            return False
+        return all(result.get('status') != 'error' for result in results.get('channels', {}).values())
+    
     def _get_notification_config(self, severity: str) -> Dict[str, Any]:
         """Get notification configuration based on alert severity"""
         configs = {
@@ -86,10 +108,10 @@ class NotificationService:
                 'retry_attempts': 1,
                 'escalate_minutes': 120
             }
-        }\
+        }
         return configs.get(severity, configs['medium'])
     
-    def _send_websocket_notification(self, alert: Alert, device: Optional[Device]) -> Dict[str, Any]:
+    def _send_websocket_notification(self, alert: Dict[str, Any], device: Optional[Device]) -> Dict[str, Any]:
         """Send real-time notification via WebSocket"""
         try:
             if not self.socketio:
@@ -97,7 +119,7 @@ class NotificationService:
             
             notification_data = {
                 'type': 'alert',
-                'alert': alert.to_dict(),
+                'alert': alert,
                 'device': device.to_dict() if device else None,
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }
@@ -113,7 +135,8 @@ class NotificationService:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
-    def _send_email_notification(self, alert: Alert, device: Optional[Device]) -> Dict[str, Any]:
+    def _send_email_notification(self, alert: Dict[str, Any], device: Optional[Device],
+                                 roles: Optional[List[str]] = None) -> Dict[str, Any]:
         """Send email notification"""
         try:
             # Get email configuration from Flask config
@@ -125,8 +148,8 @@ class NotificationService:
             if not all([smtp_host, smtp_username, smtp_password]):
                 return {'status': 'skipped', 'message': 'Email configuration not complete'}
             
-            # Get recipients based on alert severity
-            recipients = self._get_email_recipients(alert.severity)
+            # Get recipients based on alert severity, or the requested roles
+            recipients = self._get_email_recipients(alert['severity'], roles)
             
             if not recipients:
                 return {'status': 'skipped', 'message': 'No email recipients configured'}
@@ -135,7 +158,7 @@ class NotificationService:
             msg = MIMEMultipart()
             msg['From'] = smtp_username
             msg['To'] = ', '.join(recipients)
-            msg['Subject'] = f"[Vital Trace] {alert.title}"
+            msg['Subject'] = f"[Vital Trace] {alert['title']}"
             
             # Create HTML email body
             html_body = self._create_email_html(alert, device)
@@ -156,11 +179,13 @@ class NotificationService:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
-    def _get_email_recipients(self, severity: str) -> List[str]:
-        """Get email recipients based on alert severity"""
+    def _get_email_recipients(self, severity: str, roles: Optional[List[str]] = None) -> List[str]:
+        """Get email recipients based on alert severity, or for the given roles"""
         try:
             # Get users based on severity
-            if severity == 'critical':
+            if roles:
+                users = User.query.filter(User.role.in_(roles)).all()
+            elif severity == 'critical':
                 users = User.query.filter(User.role.in_(['admin', 'operator'])).all()
             elif severity == 'high':
                 users = User.query.filter(User.role.in_(['operator', 'admin'])).all()
@@ -173,7 +198,7 @@ class NotificationService:
             self.logger.error(f"Failed to get email recipients: {str(e)}")
             return []
     
-    def _create_email_html(self, alert: Alert, device: Optional[Device]) -> str:
+    def _create_email_html(self, alert: Dict[str, Any], device: Optional[Device]) -> str:
         """Create HTML email body for alert notification"""
         severity_colors = {
             'critical': '#dc3545',
@@ -182,7 +207,7 @@ class NotificationService:
             'low': '#28a745'
         }
         
-        color = severity_colors.get(alert.severity, '#6c757d')
+        color = severity_colors.get(alert['severity'], '#6c757d')
         
         html = f"""
         <!DOCTYPE html>
@@ -205,19 +230,19 @@ class NotificationService:
             <div class="container">
                 <div class="header">
                     <h1>🩺 Vital Trace Alert</h1>
-                    <h2>{alert.severity.upper()} ALERT</h2>
+                    <h2>{alert['severity'].upper()} ALERT</h2>
                 </div>
                 <div class="content">
-                    <h2>{alert.title}</h2>
-                    <p>{alert.message}</p>
+                    <h2>{alert['title']}</h2>
+                    <p>{alert['message']}</p>
                     
                     <div class="alert-info">
                         <h3>Alert Details</h3>
-                        <p><strong>Alert ID:</strong> {alert.id}</p>
-                        <p><strong>Type:</strong> {alert.alert_type}</p>
-                        <p><strong>Severity:</strong> {alert.severity}</p>
-                        <p><strong>Created:</strong> {alert.created_at.strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
-                        <p><strong>Status:</strong> {alert.status}</p>
+                        <p><strong>Alert ID:</strong> {alert['id']}</p>
+                        <p><strong>Type:</strong> {alert['alert_type']}</p>
+                        <p><strong>Severity:</strong> {alert['severity']}</p>
+                        <p><strong>Created:</strong> {self._created_at(alert).strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
+                        <p><strong>Status:</strong> {alert['status']}</p>
                     </div>
         """
         
@@ -233,7 +258,7 @@ class NotificationService:
                     </div>
             """
         
-        metadata = alert.get_metadata()
+        metadata = alert.get('metadata')
         if metadata:
             html += """
                     <div class="alert-info">
@@ -269,7 +294,8 @@ class NotificationService:
         
         return html
     
-    def _send_sms_notification(self, alert: Alert, device: Optional[Device]) -> Dict[str, Any]:
+    def _send_sms_notification(self, alert: Dict[str, Any], device: Optional[Device],
+                               roles: Optional[List[str]] = None) -> Dict[str, Any]:
         """Send SMS notification (placeholder implementation)"""
         try:
             # This would integrate with SMS service like Twilio, AWS SNS, etc.
@@ -280,12 +306,12 @@ class NotificationService:
                 return {'status': 'skipped', 'message': 'SMS service not configured'}
             
             # Get phone numbers for critical alerts
-            phone_numbers = self._get_sms_recipients(alert.severity)
+            phone_numbers = self._get_sms_recipients(alert['severity'], roles)
             
             if not phone_numbers:
                 return {'status': 'skipped', 'message': 'No SMS recipients configured'}
             
-            message = f"VITAL TRACE ALERT: {alert.title} - {alert.message}"
+            message = f"VITAL TRACE ALERT: {alert['title']} - {alert['message']}"
             
             # Placeholder for SMS sending logic
             # In production, you would integrate with your SMS provider
@@ -300,13 +326,13 @@ class NotificationService:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
-    def _get_sms_recipients(self, severity: str) -> List[str]:
-        """Get SMS recipients based on alert severity"""
+    def _get_sms_recipients(self, severity: str, roles: Optional[List[str]] = None) -> List[str]:
+        """Get SMS recipients based on alert severity, or for the given roles"""
         # In production, this would return actual phone numbers from user profiles
         # For now, return empty list
         return []
     
-    def _send_slack_notification(self, alert: Alert, device: Optional[Device]) -> Dict[str, Any]:
+    def _send_slack_notification(self, alert: Dict[str, Any], device: Optional[Device]) -> Dict[str, Any]:
         """Send Slack notification"""
         try:
             webhook_url = current_app.config.get('SLACK_WEBHOOK_URL')
@@ -322,27 +348,27 @@ class NotificationService:
                 'low': 'good'
             }
             
-            color = color_map.get(alert.severity, 'good')
+            color = color_map.get(alert['severity'], 'good')
             
             payload = {
-                'text': f'🚨 Vital Trace Alert: {alert.title}',
+                'text': f'🚨 Vital Trace Alert: {alert["title"]}',
                 'attachments': [
                     {
                         'color': color,
                         'fields': [
                             {
                                 'title': 'Alert Type',
-                                'value': alert.alert_type,
+                                'value': alert['alert_type'],
                                 'short': True
                             },
                             {
                                 'title': 'Severity',
-                                'value': alert.severity.upper(),
+                                'value': alert['severity'].upper(),
                                 'short': True
                             },
                             {
                                 'title': 'Device',
-                                'value': f"{device.name} ({alert.device_id})" if device else alert.device_id,
+                                'value': f"{device.name} ({alert['device_id']})" if device else alert['device_id'],
                                 'short': True
                             },
                             {
@@ -352,18 +378,18 @@ class NotificationService:
                             },
                             {
                                 'title': 'Message',
-                                'value': alert.message,
+                                'value': alert['message'],
                                 'short': False
                             }
                         ],
                         'footer': 'Vital Trace',
-                        'ts': int(alert.created_at.timestamp())
+                        'ts': int(self._created_at(alert).timestamp())
                     }
                 ]
             }
             
             # Add sensor data if available
-            metadata = alert.get_metadata()
+            metadata = alert.get('metadata')
             if metadata:
                 sensor_fields = []
                 for key, value in metadata.items():
@@ -389,7 +415,7 @@ class NotificationService:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
-    def _send_webhook_notification(self, alert: Alert, device: Optional[Device]) -> Dict[str, Any]:
+    def _send_webhook_notification(self, alert: Dict[str, Any], device: Optional[Device]) -> Dict[str, Any]:
         """Send webhook notification to external systems"""
         try:
             webhook_url = current_app.config.get('EXTERNAL_WEBHOOK_URL')
@@ -401,7 +427,7 @@ class NotificationService:
             payload = {
                 'event': 'alert_created',
                 'timestamp': datetime.now(timezone.utc).isoformat(),
-                'alert': alert.to_dict(),
+                'alert': alert,
                 'device': device.to_dict() if device else None
             }
             
@@ -443,31 +469,69 @@ class NotificationService:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
+    def send_incident_notification(self, incident: Dict[str, Any], alert: Alert,
+                                   roles: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Send one notification summarising a correlated incident; ``roles`` as for alerts"""
+        try:
+            types = ', '.join(f"{count} {alert_type.replace('_', ' ')}"
+                              for alert_type, count in sorted(incident['alert_types'].items()))
+            where = incident['location'] or (
+                f"{incident['centroid'][0]:.3f}, {incident['centroid'][1]:.3f}" if incident['centroid'] else 'unknown location'
+            )
+            
+            return self.send_alert_notification(self._summary_alert(
+                alert_id=alert.id,
+                device_id=alert.device_id,
+                alert_type='incident',
+                severity=incident['severity'],
+                title=f"Incident - {incident['alert_count']} alerts on {incident['device_count']} devices",
+                message=f"{types} near {where} since {incident['opened_at']}",
+                metadata={'incident_id': incident['id']}
+            ), roles=roles)
+            
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+    
     def send_maintenance_notification(self, device_id: str, maintenance_type: str, 
                                     message: str) -> Dict[str, Any]:
         """Send maintenance-related notifications"""
         try:
             device = Device.query.filter_by(device_id=device_id).first()
             
-            # Create maintenance alert
-            alert_data = {
-                'device_id': device_id,
-                'alert_type': 'maintenance_due',
-                'severity': 'medium',
-                'title': f'Maintenance Required - {device.name if device else device_id}',
-                'message': message,
-                'metadata': {'maintenance_type': maintenance_type}
-            }
-            
-            # Create alert object for notification
-            alert = Alert(**alert_data)
-            
-            # Send notification
-            return self.send_alert_notification(alert)
+            # Send a maintenance alert summary
+            return self.send_alert_notification(self._summary_alert(
+                alert_id=None,
+                device_id=device_id,
+                alert_type='maintenance_due',
+                severity='medium',
+                title=f'Maintenance Required - {device.name if device else device_id}',
+                message=message,
+                metadata={'maintenance_type': maintenance_type}
+            ))
             
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
+    def _summary_alert(self, alert_id: Any, device_id: str, alert_type: str, severity: str,
+                       title: str, message: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Alert-shaped dict for notifications that have no alert row of their own"""
+        return {
+            'id': alert_id,
+            'device_id': device_id,
+            'alert_type': alert_type,
+            'title': title,
+            'message': message,
+            'severity': severity,
+            'status': 'active',
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'metadata': metadata
+        }
+    
+    def _created_at(self, alert: Dict[str, Any]) -> datetime:
+        """Creation time of an alert dict, as an aware datetime"""
+        created_at = datetime.fromisoformat(alert['created_at']) if alert.get('created_at') else datetime.now(timezone.utc)
+        return created_at if created_at.tzinfo else created_at.replace(tzinfo=timezone.utc)
+    
     def get_notification_statistics(self, hours: int = 24) -> Dict[str, Any]:
         """Get notification delivery statistics"""
         try:
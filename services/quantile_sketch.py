@@ -0,0 +1,171 @@
+from typing import List, Dict, Any, Optional
+import json
+import math
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative-error guarantees (DDSketch)
+
+    Values are counted in logarithmically spaced bins, so any quantile is
+    answered within ``relative_accuracy`` of the true value and two sketches
+    merge exactly by adding bin counts. That makes sketches safe to store
+    per time bucket and combine across buckets and devices.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_indexable = 1e-9
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.sum_squares = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """Add a value to the sketch"""
+        if value is None or math.isnan(value):
+            return
+
+        if value > self.min_indexable:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + weight
+        elif value < -self.min_indexable:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + weight
+        else:
+            self.zero_count += weight
+
+        self.count += weight
+        self.total += value * weight
+        self.sum_squares += value * value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if len(self.positive) + len(self.negative) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Merge another sketch with the same accuracy into this one"""
+        for key, count in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + count
+        for key, count in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.sum_squares += other.sum_squares
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        if len(self.positive) + len(self.negative) > self.max_bins:
+            self._collapse()
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the approximate q-quantile (0 <= q <= 1)"""
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = 0
+
+        # Negative values from most negative (largest key) upwards
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return self._clamp(-self._value(key))
+
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._clamp(self._value(key))
+
+        return self.max
+
+    def quantiles(self, qs: List[float]) -> Dict[str, Optional[float]]:
+        """Return several quantiles keyed like 'p50'"""
+        return {f'p{int(round(q * 100))}': self.quantile(q) for q in qs}
+
+    def mean(self) -> Optional[float]:
+        """Return the exact mean of added values"""
+        return self.total / self.count if self.count else None
+
+    def std(self) -> Optional[float]:
+        """Return the population standard deviation; None for sketches stored without squares"""
+        if not self.count or math.isnan(self.sum_squares):
+            return None
+        mean = self.total / self.count
+        return math.sqrt(max(self.sum_squares / self.count - mean * mean, 0.0))
+
+    def count_outside(self, lower: float, upper: float) -> int:
+        """Approximate number of values below lower or above upper"""
+        outside = sum(count for key, count in self.negative.items()
+                      if not lower <= self._clamp(-self._value(key)) <= upper)
+        if not lower <= 0.0 <= upper:
+            outside += self.zero_count
+        outside += sum(count for key, count in self.positive.items()
+                       if not lower <= self._clamp(self._value(key)) <= upper)
+        return outside
+
+    def to_json(self) -> str:
+        """Serialize to a compact JSON string"""
+        return json.dumps({
+            'a': self.relative_accuracy,
+            'p': self.positive,
+            'n': self.negative,
+            'z': self.zero_count,
+            'c': self.count,
+            's': self.total,
+            'q': self.sum_squares,
+            'lo': self.min if self.count else None,
+            'hi': self.max if self.count else None
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, raw: str) -> 'QuantileSketch':
+        """Deserialize a sketch produced by to_json"""
+        data = json.loads(raw)
+        sketch = cls(relative_accuracy=data['a'])
+        sketch.positive = {int(k): v for k, v in data['p'].items()}
+        sketch.negative = {int(k): v for k, v in data['n'].items()}
+        sketch.zero_count = data['z']
+        sketch.count = data['c']
+        sketch.total = data['s']
+        sketch.sum_squares = data.get('q', math.nan)
+        sketch.min = data['lo'] if data['lo'] is not None else math.inf
+        sketch.max = data['hi'] if data['hi'] is not None else -math.inf
+        return sketch
+
+    def _key(self, value: float) -> int:
+        return int(math.ceil(math.log(value) / self.log_gamma))
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _clamp(self, value: float) -> float:
+        return max(self.min, min(self.max, value))
+
+    def _collapse(self) -> None:
+        """Fold the bins closest to zero together to respect max_bins"""
+        while len(self.positive) + len(self.negative) > self.max_bins:
+            if len(self.positive) >= 2:
+                lowest, second = sorted(self.positive)[:2]
+                self.positive[second] += self.positive.pop(lowest)
+            elif len(self.negative) >= 2:
+                lowest, second = sorted(self.negative)[:2]
+                self.negative[second] += self.negative.pop(lowest)
+            else:
+                break
@@ -0,0 +1,90 @@
+from typing import List, Dict, Any, Tuple
+import numpy as np
+from services.alert_rules import AlertRuleEngine, episodes, forward_fill, rule_state
+
+# No model imports here: backtest worker processes and tests load this module on its own
+STAT_KEYS = ('alerts', 'suppressed', 'open', 'total_duration_seconds', 'max_duration_seconds')
+
+def apply_cooldown(starts: np.ndarray, cooldown_seconds: float) -> np.ndarray:
+    """Mask of episode start times that the suppressor would let through"""
+    allowed = np.ones(len(starts), dtype=bool)
+    if cooldown_seconds <= 0 or len(starts) < 2:
+        return allowed
+    if np.all(np.diff(starts) >= cooldown_seconds):
+        return allowed
+
+    last = None
+    for i, start in enumerate(starts):
+        if last is not None and start - last < cooldown_seconds:
+            allowed[i] = False
+        else:
+            last = start
+    return allowed
+
+def backtest_device(rules: Dict[str, Dict[str, Any]], params: Dict[str, Any], timestamps: np.ndarray,
+                    columns: Dict[str, np.ndarray]) -> Dict[str, List[float]]:
+    """Replay one device's history through a rule set; returns per-type stat lists (see STAT_KEYS)"""
+    results = {}
+    if len(timestamps) == 0:
+        return results
+    filled = {field: forward_fill(values) for field, values in columns.items()}
+
+    def record(alert_type: str, fire_times: np.ndarray, end_times: np.ndarray, ongoing: np.ndarray) -> None:
+        if len(fire_times) == 0:
+            return
+        rule = rules[alert_type]
+        allowed = apply_cooldown(fire_times, rule.get('cooldown_minutes', 0) * 60)
+        durations = (end_times - fire_times)[allowed]
+        stats = results.setdefault(alert_type, [0, 0, 0, 0.0, 0.0])
+        stats[0] += int(allowed.sum())
+        stats[1] += int((~allowed).sum())
+        stats[2] += int(ongoing[allowed].sum())
+        stats[3] += float(durations.sum())
+        stats[4] = max(stats[4], float(durations.max()) if len(durations) else 0.0)
+
+    # Threshold rules: compiled as the live engine compiles them, and switched on and off by the
+    # same per-rule state mask as evaluate_batch, starting with no active alerts
+    engine = AlertRuleEngine(rules)
+    engine.compile_device('backtest', params)
+    for field, checks in engine.evaluators['backtest']:
+        values = filled.get(field)
+        if values is None:
+            continue
+        known = ~np.isnan(values)
+        taken = np.zeros(len(values), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for compare, threshold, alert_type, _, _ in checks:
+                starts, ends = episodes(rule_state(values, known, compare, threshold, taken, False))
+                ongoing = ends == len(values)
+                end_times = timestamps[np.minimum(ends, len(values) - 1)]
+                record(alert_type, timestamps[starts], end_times, ongoing)
+
+    # Duration rules: runs of a truthy field, or gaps between readings
+    for alert_type, rule in rules.items():
+        threshold = rule.get('duration_threshold')
+        condition = rule.get('condition')
+        if not threshold or not condition:
+            continue
+
+        if condition == 'silence':
+            gaps = np.diff(timestamps)
+            late = np.flatnonzero(gaps > threshold)
+            record(alert_type, timestamps[late] + threshold, timestamps[late + 1], np.zeros(len(late), dtype=bool))
+
+        elif condition == 'truthy' and rule.get('field') in filled:
+            values = filled[rule['field']]
+            starts, ends = episodes(np.nan_to_num(values) != 0)
+            ongoing = ends == len(values)
+            end_times = timestamps[np.minimum(ends, len(values) - 1)]
+            held = end_times - timestamps[starts] >= threshold
+            record(alert_type, timestamps[starts][held] + threshold, end_times[held], ongoing[held])
+
+    return results
+
+def backtest_chunk(rule_sets: Dict[str, Dict[str, Dict[str, Any]]],
+                    items: List[Tuple[str, Dict[str, Any], np.ndarray, Dict[str, np.ndarray]]]
+                    ) -> List[Tuple[str, Dict[str, Dict[str, List[float]]]]]:
+    """Worker entry point: evaluate every rule set for a chunk of devices"""
+    return [(device_id, {name: backtest_device(rules, params, timestamps, columns)
+                         for name, rules in rule_sets.items()})
+            for device_id, params, timestamps, columns in items]
@@ -0,0 +1,223 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+import threading
+from sqlalchemy import func
+from models import SensorData, SensorRollup, db
+from services.quantile_sketch import QuantileSketch
+
+ROLLUP_FIELDS = ('temperature', 'humidity', 'battery_level')
+ROLLUP_UNITS = {'temperature': '°C', 'humidity': '%', 'battery_level': '%'}
+
+class SensorRollupService:
+    """Hourly sensor rollups carrying mergeable quantile sketches
+
+    Readings are folded into in-memory buckets at ingest; closed buckets
+    are flushed to ``sensor_rollups`` (merging into any existing row).
+    ``rebuild`` refolds raw readings of buckets that never reached the
+    table, on startup.
+    Percentile queries merge the sketches of every bucket overlapping the
+    window, so they never touch raw sensor rows. Window edges are resolved
+    at bucket granularity (see ``get_series``).
+    """
+
+    def __init__(self, bucket_minutes: int = 60, relative_accuracy: float = 0.01):
+        self.logger = logging.getLogger(__name__)
+        self.bucket_seconds = bucket_minutes * 60
+        self.relative_accuracy = relative_accuracy
+        self.buckets = {}  # (device_id, sensor_type, bucket_start) -> QuantileSketch
+        self.latest = {}  # (device_id, sensor_type) -> (epoch, value)
+        self._lock = threading.Lock()
+
+    def record(self, device_id: str, reading: Dict[str, Any], timestamp: datetime) -> None:
+        """Fold a reading into the current buckets"""
+        epoch = timestamp.timestamp()
+        with self._lock:
+            for field in ROLLUP_FIELDS:
+                value = reading.get(field)
+                if value is not None:
+                    self._add(device_id, field, float(value), epoch)
+
+    def rebuild(self, since: datetime, now: Optional[datetime] = None) -> int:
+        """Refold raw readings whose buckets were never persisted, after a restart or deploy
+
+        Each device and field resumes after its newest persisted bucket, or
+        from ``since`` when it has none, so the first start after deploy
+        backfills history and later restarts replay only the hours that were
+        still in memory. Closed buckets are flushed straight away.
+        """
+        try:
+            since_epoch = since.timestamp()
+            resume = {
+                (device_id, sensor_type): self._aware(last).timestamp() + self.bucket_seconds
+                for device_id, sensor_type, last in db.session.query(
+                    SensorRollup.device_id, SensorRollup.sensor_type, func.max(SensorRollup.bucket_start)
+                ).group_by(SensorRollup.device_id, SensorRollup.sensor_type).all()
+            }
+
+            columns = [getattr(SensorData, field) for field in ROLLUP_FIELDS]
+            rows = db.session.query(SensorData.device_id, SensorData.timestamp, *columns).filter(
+                SensorData.timestamp >= since
+            ).order_by(SensorData.timestamp).all()
+
+            with self._lock:
+                for device_id, timestamp, *values in rows:
+                    epoch = self._aware(timestamp).timestamp()
+                    for field, value in zip(ROLLUP_FIELDS, values):
+                        if value is not None and epoch >= resume.get((device_id, field), since_epoch):
+                            self._add(device_id, field, float(value), epoch)
+
+            self.flush(now)
+            return len(rows)
+
+        except Exception as e:
+            self.logger.error(f"Failed to rebuild sensor rollups: {str(e)}")
+            db.session.rollback()
+            return 0
+
+    def flush(self, now: Optional[datetime] = None) -> int:
+        """Persist closed buckets and drop them from memory"""
+        current_bucket = self._bucket_start((now or datetime.now(timezone.utc)).timestamp())
+        with self._lock:
+            closed = {k: v for k, v in self.buckets.items() if k[2] < current_bucket}
+            for key in closed:
+                del self.buckets[key]
+
+        if not closed:
+            return 0
+
+        try:
+            for (device_id, sensor_type, bucket_start), sketch in closed.items():
+                start = datetime.fromtimestamp(bucket_start, tz=timezone.utc)
+                row = SensorRollup.query.filter_by(
+                    device_id=device_id, sensor_type=sensor_type, bucket_start=start
+                ).first()
+                if row is None:
+                    row = SensorRollup(device_id=device_id, sensor_type=sensor_type, bucket_start=start)
+                    db.session.add(row)
+                elif row.sketch:
+                    sketch = QuantileSketch.from_json(row.sketch).merge(sketch)
+
+                row.count = sketch.count
+                row.sum = sketch.total
+                row.min = sketch.min
+                row.max = sketch.max
+                row.sketch = sketch.to_json()
+
+            db.session.commit()
+            return len(closed)
+
+        except Exception as e:
+            self.logger.error(f"Failed to persist sensor rollups: {str(e)}")
+            db.session.rollback()
+            with self._lock:
+                for key, sketch in closed.items():
+                    existing = self.buckets.get(key)
+                    self.buckets[key] = existing.merge(sketch) if existing else sketch
+            return 0
+
+    def get_series(self, device_ids: List[str], sensor_type: str,
+                   start_time: datetime, end_time: datetime) -> List[Tuple[float, QuantileSketch]]:
+        """Per-bucket sketches for devices and a window, merged across devices, oldest first
+
+        Buckets that start in [start_time, end_time) are included whole, the
+        same rule at both edges: a bucket that starts before ``start_time``
+        is left out even if it overlaps the window, and the last bucket may
+        run past ``end_time``.
+        """
+        series = {}
+
+        def add(bucket_start: float, sketch: QuantileSketch) -> None:
+            existing = series.get(bucket_start)
+            if existing is None:
+                existing = series[bucket_start] = QuantileSketch(self.relative_accuracy)
+            existing.merge(sketch)
+
+        query = db.session.query(SensorRollup.bucket_start, SensorRollup.sketch).filter(
+            SensorRollup.sensor_type == sensor_type,
+            SensorRollup.bucket_start >= start_time,
+            SensorRollup.bucket_start < end_time
+        )
+        if device_ids:
+            query = query.filter(SensorRollup.device_id.in_(device_ids))
+
+        for bucket_start, raw in query.all():
+            if raw:
+                aware = bucket_start if bucket_start.tzinfo else bucket_start.replace(tzinfo=timezone.utc)
+                add(aware.timestamp(), QuantileSketch.from_json(raw))
+
+        start_epoch, end_epoch = start_time.timestamp(), end_time.timestamp()
+        wanted = set(device_ids) if device_ids else None
+        with self._lock:
+            live = [(bucket_start, sketch) for (device_id, field, bucket_start), sketch in self.buckets.items()
+                    if field == sensor_type and start_epoch <= bucket_start < end_epoch
+                    and (wanted is None or device_id in wanted)]
+            for bucket_start, sketch in live:
+                add(bucket_start, sketch)
+
+        return sorted(series.items())
+
+    def get_sketch(self, device_ids: List[str], sensor_type: str,
+                   start_time: datetime, end_time: datetime) -> QuantileSketch:
+        """Merge all persisted and live sketches for devices and a window (see get_series)"""
+        merged = QuantileSketch(self.relative_accuracy)
+        for _, sketch in self.get_series(device_ids, sensor_type, start_time, end_time):
+            merged.merge(sketch)
+        return merged
+
+    def get_latest(self, device_id: str, sensor_type: str) -> Optional[float]:
+        """Most recent value folded in for a device since startup"""
+        latest = self.latest.get((device_id, sensor_type))
+        return latest[1] if latest else None
+
+    def get_quantiles(self, device_ids: List[str], sensor_type: str, start_time: datetime,
+                      end_time: datetime) -> Dict[str, Any]:
+        """Median, IQR outlier bounds and tail percentiles for a window"""
+        try:
+            return self.summarize(self.get_sketch(device_ids, sensor_type, start_time, end_time))
+
+        except Exception as e:
+            self.logger.error(f"Failed to get quantiles for {sensor_type}: {str(e)}")
+            return {'error': str(e)}
+
+    def summarize(self, sketch: QuantileSketch) -> Dict[str, Any]:
+        """Count, moments, percentiles and IQR outlier bounds of a sketch"""
+        if sketch.count == 0:
+            return {'count': 0}
+
+        q1, median, q3 = sketch.quantile(0.25), sketch.quantile(0.5), sketch.quantile(0.75)
+        iqr = q3 - q1
+        return {
+            'count': sketch.count,
+            'mean': sketch.mean(),
+            'std': sketch.std(),
+            'min': sketch.min,
+            'max': sketch.max,
+            'median': median,
+            'p25': q1,
+            'p75': q3,
+            'p95': sketch.quantile(0.95),
+            'p99': sketch.quantile(0.99),
+            'iqr': iqr,
+            'outlier_bounds': {'lower': q1 - 1.5 * iqr, 'upper': q3 + 1.5 * iqr},
+            'relative_accuracy': self.relative_accuracy
+        }
+
+    def _add(self, device_id: str, field: str, value: float, epoch: float) -> None:
+        """Fold one value into its bucket; caller holds the lock"""
+        key = (device_id, field, self._bucket_start(epoch))
+        sketch = self.buckets.get(key)
+        if sketch is None:
+            sketch = self.buckets[key] = QuantileSketch(self.relative_accuracy)
+        sketch.add(value)
+        latest = self.latest.get((device_id, field))
+        if latest is None or epoch >= latest[0]:
+            self.latest[(device_id, field)] = (epoch, value)
+
+    def _aware(self, value: datetime) -> datetime:
+        """Treat naive database timestamps as UTC"""
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    def _bucket_start(self, epoch: float) -> float:
+        """Align an epoch to its bucket start"""
+        return epoch - epoch % self.bucket_seconds
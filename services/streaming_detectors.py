@@ -0,0 +1,248 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from abc import ABC, abstractmethod
+from array import array
+import logging
+import math
+import time
+
+class StreamingDetector(ABC):
+    """Base class for O(1) online anomaly detectors
+
+    A detector is stateless itself; per-series state is a compact
+    ``array('d')`` created by ``new_state`` and updated in place by ``update``.
+    ``min_scale`` floors the spread estimate (std or MAD) at roughly the
+    sensor's resolution, so a long run of identical values does not make
+    the next small step look like an anomaly.
+    """
+
+    name = 'base'
+
+    def __init__(self, threshold: float = 3.0, warmup: int = 10, min_scale: float = 0.05):
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_scale = min_scale
+
+    @abstractmethod
+    def new_state(self) -> array:
+        """Create empty per-series state"""
+
+    @abstractmethod
+    def update(self, state: array, value: float, timestamp: datetime) -> Tuple[float, bool]:
+        """Consume one value and return (score, is_anomaly)"""
+
+class EWMAZScoreDetector(StreamingDetector):
+    """Exponentially weighted mean/variance z-score"""
+
+    name = 'ewma'
+
+    def __init__(self, alpha: float = 0.05, threshold: float = 3.5, warmup: int = 20,
+                 min_scale: float = 0.05):
+        super().__init__(threshold, warmup, min_scale)
+        self.alpha = alpha
+
+    def new_state(self) -> array:
+        return array('d', [0.0, 0.0, 0.0])  # mean, variance, count
+
+    def update(self, state: array, value: float, timestamp: datetime) -> Tuple[float, bool]:
+        mean, variance, count = state
+        if count == 0:
+            state[0], state[2] = value, 1.0
+            return 0.0, False
+
+        score = abs(value - mean) / max(math.sqrt(variance), self.min_scale)
+
+        diff = value - mean
+        increment = self.alpha * diff
+        state[0] = mean + increment
+        state[1] = (1 - self.alpha) * (variance + diff * increment)
+        state[2] = count + 1
+
+        return score, count >= self.warmup and score > self.threshold
+
+class RobustMADDetector(StreamingDetector):
+    """Median/MAD score using frugal streaming quantile sketches
+
+    The running median and the median absolute deviation are each tracked
+    with a single-float frugal sketch (sign-driven stochastic updates scaled
+    by the current MAD), so the detector is robust to outliers without
+    keeping a window of values.
+    """
+
+    name = 'mad'
+
+    def __init__(self, threshold: float = 4.0, warmup: int = 30, rate: float = 0.05,
+                 min_scale: float = 0.05):
+        super().__init__(threshold, warmup, min_scale)
+        self.rate = rate
+
+    def new_state(self) -> array:
+        return array('d', [0.0, 0.0, 0.0])  # median, mad, count
+
+    def update(self, state: array, value: float, timestamp: datetime) -> Tuple[float, bool]:
+        median, mad, count = state
+        if count == 0:
+            state[0], state[1], state[2] = value, max(abs(value) * self.rate, self.min_scale), 1.0
+            return 0.0, False
+
+        deviation = abs(value - median)
+        # 1.4826 scales MAD to a standard deviation for normal data
+        score = deviation / (1.4826 * mad)
+
+        if value > median:
+            state[0] = median + self.rate * mad
+        elif value < median:
+            state[0] = median - self.rate * mad
+        state[1] = mad * (1 + self.rate) if deviation > mad else max(mad * (1 - self.rate), self.min_scale)
+        state[2] = count + 1
+
+        return score, count >= self.warmup and score > self.threshold
+
+class HourOfDayBaselineDetector(StreamingDetector):
+    """Seasonal z-score against an EWMA baseline per hour of day"""
+
+    name = 'seasonal'
+
+    def __init__(self, alpha: float = 0.05, threshold: float = 3.5, warmup: int = 5,
+                 min_scale: float = 0.05):
+        super().__init__(threshold, warmup, min_scale)
+        self.alpha = alpha
+
+    def new_state(self) -> array:
+        return array('d', [0.0] * 72)  # (mean, variance, count) x 24 hours
+
+    def update(self, state: array, value: float, timestamp: datetime) -> Tuple[float, bool]:
+        offset = timestamp.hour * 3
+        mean, variance, count = state[offset], state[offset + 1], state[offset + 2]
+        if count == 0:
+            state[offset], state[offset + 2] = value, 1.0
+            return 0.0, False
+
+        score = abs(value - mean) / max(math.sqrt(variance), self.min_scale)
+
+        diff = value - mean
+        increment = self.alpha * diff
+        state[offset] = mean + increment
+        state[offset + 1] = (1 - self.alpha) * (variance + diff * increment)
+        state[offset + 2] = count + 1
+
+        return score, count >= self.warmup and score > self.threshold
+
+DETECTORS = {
+    EWMAZScoreDetector.name: EWMAZScoreDetector,
+    RobustMADDetector.name: RobustMADDetector,
+    HourOfDayBaselineDetector.name: HourOfDayBaselineDetector
+}
+
+# Detectors per device type: field -> list of (detector name, parameters)
+DEFAULT_DETECTOR_CONFIG = {
+    'default': {
+        'temperature': [('ewma', {}), ('mad', {})],
+        'humidity': [('ewma', {'threshold': 4.0})],
+        'battery_level': [('mad', {'threshold': 5.0, 'min_scale': 1.0})]  # whole-percent resolution
+    },
+    'cold_storage': {
+        'temperature': [('ewma', {}), ('mad', {}), ('seasonal', {})],
+        'humidity': [('ewma', {'threshold': 4.0})]
+    }
+}
+
+class StreamingDetectorService:
+    """Runs configured streaming detectors on every reading for every device"""
+
+    def __init__(self, config: Optional[Dict[str, Dict[str, List[Tuple[str, Dict[str, Any]]]]]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.config = config or DEFAULT_DETECTOR_CONFIG
+        self.pipelines = {
+            device_type: {
+                field: [(name, DETECTORS[name](**params)) for name, params in detectors]
+                for field, detectors in fields.items()
+            } for device_type, fields in self.config.items()
+        }
+        self.states = {}  # (device_id, field, detector name) -> array state
+
+    def observe(self, device_id: str, data: Dict[str, Any],
+                device_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Update detectors with one reading and return any anomalies"""
+        pipeline = self.pipelines.get(device_type) or self.pipelines['default']
+        timestamp = self._parse_timestamp(data.get('timestamp'))
+
+        anomalies = []
+        for field, detectors in pipeline.items():
+            value = data.get(field)
+            if value is None:
+                continue
+
+            for name, detector in detectors:
+                key = (device_id, field, name)
+                state = self.states.get(key)
+                if state is None:
+                    state = self.states[key] = detector.new_state()
+
+                score, is_anomaly = detector.update(state, float(value), timestamp)
+                if is_anomaly:
+                    anomalies.append({
+                        'device_id': device_id,
+                        'field': field,
+                        'detector': name,
+                        'value': value,
+                        'score': round(score, 3)
+                    })
+
+        return anomalies
+
+    def _parse_timestamp(self, value: Any) -> datetime:
+        """Parse a reading timestamp, defaulting to now"""
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, (int, float)):
+            # Device clocks report epoch milliseconds
+            return datetime.fromtimestamp(value / 1000 if value > 1e11 else value, tz=timezone.utc)
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                pass
+        return datetime.now(timezone.utc)
+
+    def reset_device(self, device_id: str) -> None:
+        """Drop detector state for a device"""
+        for key in [k for k in self.states if k[0] == device_id]:
+            del self.states[key]
+
+def detect_series(values: List[float], detector_name: str,
+                  timestamps: Optional[List[datetime]] = None, **params) -> Dict[str, Any]:
+    """Run a single streaming detector over a series and report flagged indices"""
+    detector = DETECTORS[detector_name](**params)
+    state = detector.new_state()
+    now = datetime.now(timezone.utc)
+
+    anomaly_indices = []
+    for i, value in enumerate(values):
+        timestamp = timestamps[i] if timestamps else now
+        _, is_anomaly = detector.update(state, float(value), timestamp)
+        if is_anomaly:
+            anomaly_indices.append(i)
+
+    return {
+        'count': len(anomaly_indices),
+        'indices': anomaly_indices,
+        'threshold': detector.threshold,
+        'method': detector_name
+    }
+
+def benchmark_detector(detector_name: str, readings: int = 100000, **params) -> float:
+    """Per-reading update cost of one detector in microseconds, over a slowly varying signal"""
+    detector = DETECTORS[detector_name](**params)
+    state = detector.new_state()
+    timestamp = datetime.now(timezone.utc)
+    values = [5.0 + math.sin(i / 50.0) for i in range(readings)]
+
+    started = time.perf_counter()
+    for value in values:
+        detector.update(state, value, timestamp)
+    return (time.perf_counter() - started) / readings * 1e6
+
+def benchmark(readings: int = 100000) -> Dict[str, float]:
+    """Per-reading update cost of every registered detector in microseconds"""
+    return {name: round(benchmark_detector(name, readings), 3) for name in DETECTORS}
@@ -0,0 +1,299 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+import math
+import threading
+from sqlalchemy import func
+from models import Device, SensorData, ThermalExposureBucket, db
+
+# Bucket accumulator layout
+SECONDS, ARRHENIUS, HIGH, LOW, HEAT, COLD, MIN_TEMP, MAX_TEMP, READINGS = range(9)
+SUM_FIELDS = (SECONDS, ARRHENIUS, HIGH, LOW, HEAT, COLD, READINGS)
+
+class ThermalExposureEngine:
+    """Incremental cold chain exposure accounting per device and shipment
+
+    Each reading closes the interval since the previous reading of the same
+    device; that interval is attributed to the previous temperature (sample
+    and hold) and accumulated into fixed time buckets. Buckets hold only sums
+    and extremes, so they merge by addition: compliance for any window is a
+    merge of persisted buckets plus the still-open in-memory ones.
+
+    Buckets not yet flushed live only in memory; ``rebuild`` replays them
+    from ``SensorData`` after a restart.
+    """
+
+    def __init__(self, bucket_minutes: int = 60, max_gap_seconds: int = 900,
+                 activation_energy: float = 83.144):
+        self.logger = logging.getLogger(__name__)
+        self.bucket_seconds = bucket_minutes * 60
+        self.max_gap_seconds = max_gap_seconds
+        # ΔH/R in Kelvin (ΔH in kJ/mol, R = 8.3144 J/mol/K)
+        self.delta_h_over_r = activation_energy * 1000 / 8.3144
+        self.last_readings = {}  # device_id -> (epoch, temperature, min, max, shipment_id)
+        self.buckets = {}  # (subject_type, subject_id) -> {bucket_start: accumulator list}
+        self._lock = threading.Lock()
+
+    def record(self, device_id: str, temperature: Optional[float], timestamp: datetime,
+               temp_min: float, temp_max: float, shipment_id: Optional[str] = None) -> None:
+        """Account for the interval since the device's previous reading"""
+        if temperature is None:
+            return
+
+        with self._lock:
+            self._record(device_id, float(temperature), timestamp.timestamp(), temp_min, temp_max, shipment_id)
+
+    def rebuild(self, lookback_hours: int = 24, now: Optional[datetime] = None) -> int:
+        """Replay readings not yet covered by persisted buckets, after a restart
+
+        Each device is replayed from the end of its newest persisted bucket,
+        or from the lookback horizon if it has none. The reading just before
+        that point seeds the sample-and-hold state without being counted
+        again. Shipment ids are not stored with readings, so only device
+        buckets are rebuilt.
+        """
+        try:
+            horizon = (now or datetime.now(timezone.utc)).timestamp() - lookback_hours * 3600
+            persisted = {
+                subject_id: self._aware(last).timestamp() + self.bucket_seconds
+                for subject_id, last in db.session.query(
+                    ThermalExposureBucket.subject_id, func.max(ThermalExposureBucket.bucket_start)
+                ).filter(ThermalExposureBucket.subject_type == 'device')
+                 .group_by(ThermalExposureBucket.subject_id).all()
+            }
+            ranges = {
+                device_id: (temp_min if temp_min is not None else 2.0, temp_max if temp_max is not None else 8.0)
+                for device_id, temp_min, temp_max in Device.query.with_entities(
+                    Device.device_id, Device.target_temp_min, Device.target_temp_max
+                ).all()
+            }
+
+            since = datetime.fromtimestamp(horizon - self.max_gap_seconds, tz=timezone.utc)
+            rows = db.session.query(SensorData.device_id, SensorData.timestamp, SensorData.temperature).filter(
+                SensorData.timestamp >= since, SensorData.temperature.isnot(None)
+            ).order_by(SensorData.device_id, SensorData.timestamp).all()
+
+            with self._lock:
+                for device_id, timestamp, temperature in rows:
+                    temp_min, temp_max = ranges.get(device_id, (2.0, 8.0))
+                    floor = max(persisted.get(device_id, horizon), horizon)
+                    self._record(device_id, float(temperature), self._aware(timestamp).timestamp(),
+                                 temp_min, temp_max, None, floor)
+            return len(rows)
+
+        except Exception as e:
+            self.logger.error(f"Failed to rebuild thermal exposure buckets: {str(e)}")
+            return 0
+
+    def _record(self, device_id: str, temperature: float, epoch: float, temp_min: float,
+                temp_max: float, shipment_id: Optional[str], floor: Optional[float] = None) -> None:
+        """Close the interval since the previous reading; caller holds the lock
+
+        Time before ``floor`` only updates the held reading, it is not accumulated.
+        A backfilled reading older than the held one is counted in its own
+        bucket but adds no time, since that interval was already attributed.
+        """
+        previous = self.last_readings.get(device_id)
+        if previous is not None and epoch < previous[0]:
+            if floor is None or epoch >= floor:
+                bucket_start = self._bucket_start(epoch)
+                self._accumulate(('device', device_id), bucket_start, 0.0, temperature, temp_min, temp_max, 1)
+                if shipment_id:
+                    self._accumulate(('shipment', shipment_id), bucket_start, 0.0,
+                                     temperature, temp_min, temp_max, 1)
+            return
+
+        self.last_readings[device_id] = (epoch, temperature, temp_min, temp_max, shipment_id)
+
+        if previous is None:
+            return
+
+        prev_epoch, prev_temp, prev_min, prev_max, prev_shipment = previous
+        # Gaps longer than max_gap are connectivity loss, not measured exposure
+        end = min(epoch, prev_epoch + self.max_gap_seconds)
+        if floor is not None:
+            prev_epoch = max(prev_epoch, floor)
+        if end <= prev_epoch:
+            return
+
+        subjects = [('device', device_id)]
+        if prev_shipment:
+            subjects.append(('shipment', prev_shipment))
+
+        start = prev_epoch
+        readings = 1
+        while start < end:
+            bucket_start = self._bucket_start(start)
+            segment_end = min(end, bucket_start + self.bucket_seconds)
+            for subject_type, subject_id in subjects:
+                self._accumulate((subject_type, subject_id), bucket_start, segment_end - start,
+                                 prev_temp, prev_min, prev_max, readings)
+            start = segment_end
+            readings = 0
+
+    def flush(self, now: Optional[datetime] = None) -> int:
+        """Persist closed buckets, merging into existing rows, and drop them from memory"""
+        current_bucket = self._bucket_start((now or datetime.now(timezone.utc)).timestamp())
+        closed = {}
+        with self._lock:
+            for subject, subject_buckets in self.buckets.items():
+                for bucket_start in [b for b in subject_buckets if b < current_bucket]:
+                    closed[subject + (bucket_start,)] = subject_buckets.pop(bucket_start)
+
+        if not closed:
+            return 0
+
+        try:
+            for (subject_type, subject_id, bucket_start), acc in closed.items():
+                start = datetime.fromtimestamp(bucket_start, tz=timezone.utc)
+                row = ThermalExposureBucket.query.filter_by(
+                    subject_type=subject_type, subject_id=subject_id, bucket_start=start
+                ).first()
+                if row is None:
+                    row = ThermalExposureBucket(
+                        subject_type=subject_type, subject_id=subject_id, bucket_start=start,
+                        seconds=0.0, arrhenius_sum=0.0, high_seconds=0.0, low_seconds=0.0,
+                        heat_degree_seconds=0.0, cold_degree_seconds=0.0, readings=0
+                    )
+                    db.session.add(row)
+
+                row.seconds += acc[SECONDS]
+                row.arrhenius_sum += acc[ARRHENIUS]
+                row.high_seconds += acc[HIGH]
+                row.low_seconds += acc[LOW]
+                row.heat_degree_seconds += acc[HEAT]
+                row.cold_degree_seconds += acc[COLD]
+                row.readings += int(acc[READINGS])
+                row.min_temperature = acc[MIN_TEMP] if row.min_temperature is None else min(row.min_temperature, acc[MIN_TEMP])
+                row.max_temperature = acc[MAX_TEMP] if row.max_temperature is None else max(row.max_temperature, acc[MAX_TEMP])
+
+            db.session.commit()
+            return len(closed)
+
+        except Exception as e:
+            self.logger.error(f"Failed to persist thermal exposure buckets: {str(e)}")
+            db.session.rollback()
+            with self._lock:
+                for (subject_type, subject_id, bucket_start), acc in closed.items():
+                    subject_buckets = self.buckets.setdefault((subject_type, subject_id), {})
+                    self._merge_into(subject_buckets.setdefault(bucket_start, self._empty()), acc)
+            return 0
+
+    def get_exposure(self, subject_id: str, start_time: datetime, end_time: datetime,
+                     subject_type: str = 'device') -> Dict[str, Any]:
+        """Summarize exposure for a window by merging persisted and live buckets
+
+        The window is resolved at bucket granularity: buckets that start in
+        [start_time, end_time) are included whole. A bucket that starts
+        before ``start_time`` is left out even if it overlaps the window, and
+        the last bucket may run past ``end_time``. The effective window is
+        reported as ``bucket_window``.
+        """
+        try:
+            acc = self._empty()
+
+            row = db.session.query(
+                func.sum(ThermalExposureBucket.seconds),
+                func.sum(ThermalExposureBucket.arrhenius_sum),
+                func.sum(ThermalExposureBucket.high_seconds),
+                func.sum(ThermalExposureBucket.low_seconds),
+                func.sum(ThermalExposureBucket.heat_degree_seconds),
+                func.sum(ThermalExposureBucket.cold_degree_seconds),
+                func.min(ThermalExposureBucket.min_temperature),
+                func.max(ThermalExposureBucket.max_temperature),
+                func.sum(ThermalExposureBucket.readings)
+            ).filter(
+                ThermalExposureBucket.subject_type == subject_type,
+                ThermalExposureBucket.subject_id == subject_id,
+                ThermalExposureBucket.bucket_start >= start_time,
+                ThermalExposureBucket.bucket_start < end_time
+            ).one()
+            if row[SECONDS]:
+                persisted = [v if v is not None else 0.0 for v in row]
+                persisted[MIN_TEMP] = row[MIN_TEMP] if row[MIN_TEMP] is not None else math.inf
+                persisted[MAX_TEMP] = row[MAX_TEMP] if row[MAX_TEMP] is not None else -math.inf
+                self._merge_into(acc, persisted)
+
+            start_epoch, end_epoch = start_time.timestamp(), end_time.timestamp()
+            with self._lock:
+                for bucket_start, live in self.buckets.get((subject_type, subject_id), {}).items():
+                    if start_epoch <= bucket_start < end_epoch:
+                        self._merge_into(acc, live)
+
+            summary = self._summarize(acc)
+            summary['bucket_window'] = {
+                'start': datetime.fromtimestamp(self._bucket_ceil(start_epoch), tz=timezone.utc).isoformat(),
+                'end': datetime.fromtimestamp(self._bucket_ceil(end_epoch), tz=timezone.utc).isoformat()
+            }
+            return summary
+
+        except Exception as e:
+            self.logger.error(f"Failed to get thermal exposure for {subject_id}: {str(e)}")
+            return {'error': str(e)}
+
+    def _accumulate(self, subject: Tuple[str, str], bucket_start: float, seconds: float,
+                    temperature: float, temp_min: float, temp_max: float, readings: int) -> None:
+        """Add one held-temperature segment to a bucket"""
+        subject_buckets = self.buckets.setdefault(subject, {})
+        acc = subject_buckets.get(bucket_start)
+        if acc is None:
+            acc = subject_buckets[bucket_start] = self._empty()
+
+        acc[SECONDS] += seconds
+        acc[ARRHENIUS] += seconds * math.exp(-self.delta_h_over_r / (temperature + 273.15))
+        if temperature > temp_max:
+            acc[HIGH] += seconds
+            acc[HEAT] += seconds * (temperature - temp_max)
+        elif temperature < temp_min:
+            acc[LOW] += seconds
+            acc[COLD] += seconds * (temp_min - temperature)
+        acc[MIN_TEMP] = min(acc[MIN_TEMP], temperature)
+        acc[MAX_TEMP] = max(acc[MAX_TEMP], temperature)
+        acc[READINGS] += readings
+
+    def _summarize(self, acc: List[float]) -> Dict[str, Any]:
+        """Convert an accumulator into reportable metrics"""
+        seconds = acc[SECONDS]
+        if seconds <= 0:
+            return {'monitored_minutes': 0, 'time_in_range_percentage': None, 'mean_kinetic_temperature': None}
+
+        excursion_seconds = acc[HIGH] + acc[LOW]
+        mkt_kelvin = self.delta_h_over_r / -math.log(acc[ARRHENIUS] / seconds)
+
+        return {
+            'monitored_minutes': round(seconds / 60, 2),
+            'excursion_minutes': round(excursion_seconds / 60, 2),
+            'high_excursion_minutes': round(acc[HIGH] / 60, 2),
+            'low_excursion_minutes': round(acc[LOW] / 60, 2),
+            'time_in_range_percentage': round((seconds - excursion_seconds) / seconds * 100, 2),
+            'mean_kinetic_temperature': round(mkt_kelvin - 273.15, 2),
+            'heat_exposure_degree_minutes': round(acc[HEAT] / 60, 2),
+            'cold_exposure_degree_minutes': round(acc[COLD] / 60, 2),
+            'min_temperature': acc[MIN_TEMP],
+            'max_temperature': acc[MAX_TEMP],
+            'readings': int(acc[READINGS])
+        }
+
+    def _merge_into(self, target: List[float], source: List[float]) -> None:
+        """Merge one accumulator into another"""
+        for index in SUM_FIELDS:
+            target[index] += source[index]
+        target[MIN_TEMP] = min(target[MIN_TEMP], source[MIN_TEMP])
+        target[MAX_TEMP] = max(target[MAX_TEMP], source[MAX_TEMP])
+
+    def _empty(self) -> List[float]:
+        """Create an empty accumulator"""
+        return [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, math.inf, -math.inf, 0.0]
+
+    def _bucket_start(self, epoch: float) -> float:
+        """Align an epoch to its bucket start"""
+        return epoch - epoch % self.bucket_seconds
+
+    def _bucket_ceil(self, epoch: float) -> float:
+        """First bucket boundary at or after an epoch"""
+        start = self._bucket_start(epoch)
+        return start if start == epoch else start + self.bucket_seconds
+
+    def _aware(self, value: datetime) -> datetime:
+        """Treat naive database timestamps as UTC"""
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
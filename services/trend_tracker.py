@@ -0,0 +1,112 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import deque
+
+class SlidingRegression:
+    """Least-squares slope over the last ``window`` points, updated in O(1)
+
+    Points are indexed x = 0..n-1 within the window. Sliding the window
+    drops the x=0 point and shifts every x down by one, which maps to
+    Σxy -= Σy, so only Σy, Σxy and the value ring are stored; Σx and Σx²
+    are closed-form in n. Sums are rebuilt from the ring periodically to
+    bound floating-point drift.
+    """
+
+    __slots__ = ('window', 'values', 'sum_y', 'sum_xy', 'updates')
+
+    REBUILD_INTERVAL = 10000
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.updates = 0
+
+    def add(self, y: float) -> None:
+        """Append a value, evicting the oldest when the window is full"""
+        if len(self.values) == self.window:
+            self.sum_y -= self.values[0]
+            self.sum_xy -= self.sum_y  # shift remaining x down by one
+
+        self.sum_xy += min(len(self.values), self.window - 1) * y
+        self.sum_y += y
+        self.values.append(y)
+
+        self.updates += 1
+        if self.updates % self.REBUILD_INTERVAL == 0:
+            self.sum_y = sum(self.values)
+            self.sum_xy = sum(x * v for x, v in enumerate(self.values))
+
+    def slope(self) -> float:
+        """Return the current least-squares slope"""
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        denominator = n * sum_xx - sum_x * sum_x
+        return (n * self.sum_xy - sum_x * self.sum_y) / denominator
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+class TrendTracker:
+    """Per-device, per-field sliding trends with direction-change detection"""
+
+    def __init__(self, fields: Tuple[str, ...] = ('temperature', 'humidity', 'battery_level', 'pressure'),
+                 default_window: int = 10, windows: Optional[Dict[str, int]] = None,
+                 stable_slope: float = 0.01):
+        self.fields = fields
+        self.default_window = default_window
+        self.windows = windows or {}
+        self.stable_slope = stable_slope
+        self.regressions = {}  # (device_id, field) -> SlidingRegression
+        self.directions = {}  # (device_id, field) -> last reported direction
+
+    def update(self, device_id: str, reading: Dict[str, Any]) -> Tuple[Dict[str, Any], list]:
+        """Add a reading and return (trends for full windows, fields whose direction changed)"""
+        trends = {}
+        changed = []
+
+        for field in self.fields:
+            value = reading.get(field)
+            if value is None:
+                continue
+
+            key = (device_id, field)
+            regression = self.regressions.get(key)
+            if regression is None:
+                regression = self.regressions[key] = SlidingRegression(
+                    self.windows.get(field, self.default_window)
+                )
+            regression.add(float(value))
+
+            if len(regression) < regression.window:
+                continue
+
+            slope = regression.slope()
+            if abs(slope) < self.stable_slope:
+                direction = 'stable'
+            elif slope > 0:
+                direction = 'increasing'
+            else:
+                direction = 'decreasing'
+
+            trends[field] = {
+                'direction': direction,
+                'strength': round(min(abs(slope) * 100, 100), 2),
+                'slope': round(slope, 4)
+            }
+
+            if self.directions.get(key) != direction:
+                self.directions[key] = direction
+                changed.append(field)
+
+        return trends, changed
+
+    def reset_device(self, device_id: str) -> None:
+        """Drop trend state for a device"""
+        for key in [k for k in self.regressions if k[0] == device_id]:
+            self.regressions.pop(key, None)
+            self.directions.pop(key, None)
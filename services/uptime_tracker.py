@@ -0,0 +1,219 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict
+import logging
+import threading
+from models import DeviceConnectionInterval, db
+
+class UptimeTracker:
+    """Connection interval tracking for device uptime and fleet availability
+
+    A device's online session starts on connect (or its first heartbeat)
+    and ends on disconnect or when heartbeats stop for longer than the
+    heartbeat timeout, in which case it ends at the last heartbeat. Last
+    heard times are read from the heartbeat watchdog rather than tracked
+    here. Only closed sessions are persisted, one row each; the open
+    session lives in memory. Uptime for a window is an interval merge, and
+    results for completed days are cached.
+    """
+
+    def __init__(self, watchdog, heartbeat_timeout_seconds: int = 600):
+        self.logger = logging.getLogger(__name__)
+        self.watchdog = watchdog
+        self.heartbeat_timeout = timedelta(seconds=heartbeat_timeout_seconds)
+        self.open_sessions = {}  # device_id -> started_at
+        self.daily_cache = {}  # (device_id, date) -> online seconds
+        self._lock = threading.Lock()
+
+    def connect(self, device_id: str, timestamp: Optional[datetime] = None) -> None:
+        """Open a session unless one is already open; called on connect and on every heartbeat"""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        with self._lock:
+            self.open_sessions.setdefault(device_id, timestamp)
+
+    def disconnect(self, device_id: str, timestamp: Optional[datetime] = None) -> None:
+        """Record a device disconnection and persist its session"""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        with self._lock:
+            started_at = self.open_sessions.pop(device_id, None)
+
+        if started_at is not None:
+            self._persist([(device_id, started_at, timestamp, 'disconnect')])
+
+    def expire_stale(self, now: Optional[datetime] = None) -> int:
+        """Close sessions whose heartbeats stopped, ending them at the last heartbeat"""
+        now = now or datetime.now(timezone.utc)
+        expired = []
+        with self._lock:
+            for device_id, started_at in list(self.open_sessions.items()):
+                last_heartbeat = self._last_heartbeat(device_id, started_at)
+                if now - last_heartbeat > self.heartbeat_timeout:
+                    expired.append((device_id, started_at, last_heartbeat, 'heartbeat_timeout'))
+                    del self.open_sessions[device_id]
+
+        if expired:
+            self._persist(expired)
+        return len(expired)
+
+    def get_uptime(self, device_id: str, start_time: datetime, end_time: datetime) -> float:
+        """Get uptime percentage for a device over a window"""
+        try:
+            total = (end_time - start_time).total_seconds()
+            if total <= 0:
+                return 0.0
+
+            online = 0.0
+            today = datetime.now(timezone.utc).date()
+            for day_start, day_end in self._split_days(start_time, end_time):
+                full_day = day_end - day_start == timedelta(days=1)
+                cache_key = (device_id, day_start.date())
+                if full_day and day_start.date() < today and cache_key in self.daily_cache:
+                    online += self.daily_cache[cache_key]
+                    continue
+
+                day_online = self._online_seconds(device_id, day_start, day_end)
+                if full_day and day_start.date() < today:
+                    self.daily_cache[cache_key] = day_online
+                online += day_online
+
+            return round(min(100.0, online / total * 100), 2)
+
+        except Exception as e:
+            self.logger.error(f"Failed to calculate uptime for {device_id}: {str(e)}")
+            return 0.0
+
+    def get_fleet_availability(self, start_time: datetime, end_time: datetime,
+                               device_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get availability for every device from one interval query"""
+        try:
+            total = (end_time - start_time).total_seconds()
+            query = DeviceConnectionInterval.query.with_entities(
+                DeviceConnectionInterval.device_id,
+                DeviceConnectionInterval.started_at,
+                DeviceConnectionInterval.ended_at
+            ).filter(
+                DeviceConnectionInterval.ended_at > start_time,
+                DeviceConnectionInterval.started_at < end_time
+            )
+            if device_ids:
+                query = query.filter(DeviceConnectionInterval.device_id.in_(device_ids))
+
+            intervals = defaultdict(list)
+            for device_id, started_at, ended_at in query.all():
+                intervals[device_id].append((started_at, ended_at))
+
+            with self._lock:
+                now = datetime.now(timezone.utc)
+                for device_id, started_at in self.open_sessions.items():
+                    if device_ids is None or device_id in device_ids:
+                        intervals[device_id].append(self._open_interval(device_id, started_at, end_time, now))
+
+            availability = {}
+            for device_id in (device_ids or intervals.keys()):
+                online = self._merge_seconds(intervals.get(device_id, []), start_time, end_time)
+                availability[device_id] = round(online / total * 100, 2) if total > 0 else 0.0
+
+            values = list(availability.values())
+            return {
+                'period_start': start_time.isoformat(),
+                'period_end': end_time.isoformat(),
+                'devices': availability,
+                'fleet_availability': round(sum(values) / len(values), 2) if values else 0.0
+            }
+
+        except Exception as e:
+            self.logger.error(f"Failed to calculate fleet availability: {str(e)}")
+            return {'error': str(e)}
+
+    def _online_seconds(self, device_id: str, start_time: datetime, end_time: datetime) -> float:
+        """Merge persisted and open intervals for one device within a window"""
+        rows = DeviceConnectionInterval.query.with_entities(
+            DeviceConnectionInterval.started_at,
+            DeviceConnectionInterval.ended_at
+        ).filter(
+            DeviceConnectionInterval.device_id == device_id,
+            DeviceConnectionInterval.ended_at > start_time,
+            DeviceConnectionInterval.started_at < end_time
+        ).all()
+        intervals = [(r[0], r[1]) for r in rows]
+
+        with self._lock:
+            started_at = self.open_sessions.get(device_id)
+            if started_at is not None:
+                intervals.append(self._open_interval(device_id, started_at, end_time, datetime.now(timezone.utc)))
+
+        return self._merge_seconds(intervals, start_time, end_time)
+
+    def _last_heartbeat(self, device_id: str, started_at: datetime) -> datetime:
+        """Last time the watchdog heard from a device, not before its session started"""
+        last_seen = self.watchdog.get_last_seen(device_id)
+        return max(started_at, last_seen) if last_seen is not None else started_at
+
+    def _open_interval(self, device_id: str, started_at: datetime, end_time: datetime,
+                       now: datetime) -> Tuple[datetime, datetime]:
+        """Reportable extent of an open session
+
+        A session counts as online up to now while its heartbeats are within
+        the timeout. Once they have stopped it ends at the last heartbeat,
+        where ``expire_stale`` will close it, so reports do not depend on
+        when the expiry job last ran.
+        """
+        last_heartbeat = self._last_heartbeat(device_id, started_at)
+        online_until = now if now - last_heartbeat <= self.heartbeat_timeout else last_heartbeat
+        return started_at, max(last_heartbeat, min(end_time, online_until))
+
+    def _merge_seconds(self, intervals: List[Tuple[datetime, datetime]],
+                       start_time: datetime, end_time: datetime) -> float:
+        """Total length of the union of intervals clipped to a window"""
+        clipped = sorted(
+            (max(self._aware(s), start_time), min(self._aware(e), end_time))
+            for s, e in intervals
+        )
+
+        total = 0.0
+        current_start, current_end = None, None
+        for interval_start, interval_end in clipped:
+            if interval_end <= interval_start:
+                continue
+            if current_end is None or interval_start > current_end:
+                if current_end is not None:
+                    total += (current_end - current_start).total_seconds()
+                current_start, current_end = interval_start, interval_end
+            else:
+                current_end = max(current_end, interval_end)
+
+        if current_end is not None:
+            total += (current_end - current_start).total_seconds()
+        return total
+
+    def _split_days(self, start_time: datetime, end_time: datetime) -> List[Tuple[datetime, datetime]]:
+        """Split a window at UTC midnight boundaries"""
+        days = []
+        cursor = start_time
+        while cursor < end_time:
+            next_midnight = datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time(),
+                                             tzinfo=timezone.utc)
+            days.append((cursor, min(next_midnight, end_time)))
+            cursor = next_midnight
+        return days
+
+    def _persist(self, sessions: List[Tuple[str, datetime, datetime, str]]) -> None:
+        """Write closed sessions in one transaction and drop affected cached days"""
+        try:
+            for device_id, started_at, ended_at, reason in sessions:
+                db.session.add(DeviceConnectionInterval(
+                    device_id=device_id, started_at=started_at, ended_at=ended_at, end_reason=reason
+                ))
+                day = started_at.date()
+                while day <= ended_at.date():
+                    self.daily_cache.pop((device_id, day), None)
+                    day += timedelta(days=1)
+            db.session.commit()
+
+        except Exception as e:
+            self.logger.error(f"Failed to persist connection intervals: {str(e)}")
+            db.session.rollback()
+
+    def _aware(self, value: datetime) -> datetime:
+        """Treat naive database timestamps as UTC"""
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -0,0 +1,183 @@
+"""Tables the services query, for tests
+
+``models.py`` declares several revisions of the same tables on one
+metadata and does not import, so the tests register this module as
+``models`` instead. Columns are copied from the definitions the services
+use; keep them in step when a service starts reading a new column.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+import json
+import uuid
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+class Device(db.Model):
+    __tablename__ = 'devices'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    device_id = db.Column(db.String(50), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False, default='')
+    location = db.Column(db.String(200), nullable=False, default='')
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    target_temp_min = db.Column(db.Float, default=2.0)
+    target_temp_max = db.Column(db.Float, default=8.0)
+    device_type = db.Column(db.String(50), nullable=False, default='refrigerator')
+    status = db.Column(db.String(20), default='active')
+    last_seen = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'device_id': self.device_id,
+            'name': self.name,
+            'location': self.location,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'target_temp_min': self.target_temp_min,
+            'target_temp_max': self.target_temp_max,
+            'device_type': self.device_type,
+            'status': self.status,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None
+        }
+
+class SensorData(db.Model):
+    __tablename__ = 'sensor_data'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    device_id = db.Column(db.String(50), nullable=False)
+    temperature = db.Column(db.Float, nullable=False)
+    humidity = db.Column(db.Float)
+    battery_level = db.Column(db.Integer)
+    door_open = db.Column(db.Boolean, default=False)
+    power_status = db.Column(db.String(20), default='normal')
+    signal_strength = db.Column(db.Integer)
+    sensor_type = db.Column(db.String(50))
+    value = db.Column(db.Float)
+    unit = db.Column(db.String(20))
+    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+class Alert(db.Model):
+    __tablename__ = 'alerts'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    device_id = db.Column(db.String(50), nullable=False)
+    alert_type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200), nullable=False, default='')
+    message = db.Column(db.Text, nullable=False, default='')
+    severity = db.Column(db.String(20), default='medium')
+    status = db.Column(db.String(20), default='active')
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    acknowledged_at = db.Column(db.DateTime)
+    resolved_at = db.Column(db.DateTime)
+    metadata_json = db.Column('metadata', db.Text)
+    incident_id = db.Column(db.String(36), index=True)
+
+    def set_metadata(self, data: Dict[str, Any]) -> None:
+        self.metadata_json = json.dumps(data) if data else None
+
+    def get_metadata(self) -> Optional[Dict[str, Any]]:
+        return json.loads(self.metadata_json) if self.metadata_json else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'device_id': self.device_id,
+            'alert_type': self.alert_type,
+            'title': self.title,
+            'message': self.message,
+            'severity': self.severity,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'acknowledged_at': self.acknowledged_at.isoformat() if self.acknowledged_at else None,
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+            'metadata': self.get_metadata(),
+            'incident_id': self.incident_id
+        }
+
+class MaintenancePrediction(db.Model):
+    __tablename__ = 'maintenance_predictions'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    device_id = db.Column(db.String(50), unique=True, nullable=False)
+    maintenance_score = db.Column(db.Float)
+    prediction = db.Column(db.Text)
+    computed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def set_prediction(self, data: Dict[str, Any]) -> None:
+        self.prediction = json.dumps(data) if data else None
+
+    def get_prediction(self) -> Optional[Dict[str, Any]]:
+        return json.loads(self.prediction) if self.prediction else None
+
+    def to_dict(self):
+        return {
+            **(self.get_prediction() or {}),
+            'device_id': self.device_id,
+            'maintenance_score': self.maintenance_score,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+class ThermalExposureBucket(db.Model):
+    __tablename__ = 'thermal_exposure_buckets'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject_type = db.Column(db.String(20), nullable=False)
+    subject_id = db.Column(db.String(50), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    seconds = db.Column(db.Float, default=0.0)
+    arrhenius_sum = db.Column(db.Float, default=0.0)
+    high_seconds = db.Column(db.Float, default=0.0)
+    low_seconds = db.Column(db.Float, default=0.0)
+    heat_degree_seconds = db.Column(db.Float, default=0.0)
+    cold_degree_seconds = db.Column(db.Float, default=0.0)
+    min_temperature = db.Column(db.Float)
+    max_temperature = db.Column(db.Float)
+    readings = db.Column(db.Integer, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('subject_type', 'subject_id', 'bucket_start', name='uq_exposure_bucket'),
+    )
+
+class DeviceConnectionInterval(db.Model):
+    __tablename__ = 'device_connection_intervals'
+
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime, nullable=False)
+    end_reason = db.Column(db.String(20))
+
+class SensorRollup(db.Model):
+    __tablename__ = 'sensor_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), nullable=False)
+    sensor_type = db.Column(db.String(50), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, default=0)
+    sum = db.Column(db.Float, default=0.0)
+    min = db.Column(db.Float)
+    max = db.Column(db.Float)
+    sketch = db.Column(db.Text)
+
+    __table_args__ = (
+        db.UniqueConstraint('device_id', 'sensor_type', 'bucket_start', name='uq_sensor_rollup'),
+    )
+
+class EscalationJob(db.Model):
+    __tablename__ = 'escalation_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    alert_id = db.Column(db.String(36), nullable=False)
+    device_id = db.Column(db.String(50), nullable=False)
+    alert_type = db.Column(db.String(50), nullable=False)
+    severity = db.Column(db.String(20))
+    incident_id = db.Column(db.String(36))
+    due_at = db.Column(db.DateTime, nullable=False)
+    next_run_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='pending')
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    processed_at = db.Column(db.DateTime)
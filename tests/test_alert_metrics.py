@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+from services.alert_metrics import FLEET, AlertMetrics
+
+def _recent(hours_ago: float) -> datetime:
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours_ago)
+
+def test_counts_per_device_and_fleet():
+    metrics = AlertMetrics()
+    created = _recent(2)
+    metrics.record_created('D1', 'temperature_high', 'high', created)
+    metrics.record_created('D1', 'door_open', 'medium', created + timedelta(minutes=30))
+    metrics.record_created('D2', 'temperature_high', 'critical', created)
+
+    device = metrics.get_analytics('D1', days=2)
+    assert device['total_alerts'] == 2
+    assert device['severity_distribution'] == {'high': 1, 'medium': 1}
+    assert device['peak_hours']['by_hour'][created.hour] == 2
+
+    fleet = metrics.get_analytics(FLEET, days=2)
+    assert fleet['patterns']['temperature_high']['count'] == 2
+    assert metrics.get_stats()['devices'] == 2
+
+def test_latencies_are_binned_into_histograms():
+    metrics = AlertMetrics()
+    created = _recent(3)
+    for minutes in (2, 4, 20):
+        metrics.record_created('D1', 'door_open', 'medium', created)
+        metrics.record_acknowledged('D1', created, created + timedelta(minutes=minutes))
+    metrics.record_resolved('D1', created, created + timedelta(hours=2, minutes=30))
+
+    times = metrics.get_analytics('D1', days=2)['resolution_times']
+    assert times['tta_histogram']['<5m'] == 2 and times['tta_histogram']['<30m'] == 1
+    assert times['tta_p50_seconds'] == 300.0
+    assert times['ttr_histogram']['<4h'] == 1
+    assert times['average_acknowledge_time_hours'] == round(26 * 60 / 3 / 3600, 3)
+
+def test_naive_timestamps_are_treated_as_utc():
+    metrics = AlertMetrics()
+    created = _recent(1)
+    metrics.record_created('D1', 'door_open', 'medium', created.replace(tzinfo=None))
+    metrics.record_acknowledged('D1', created.replace(tzinfo=None), created + timedelta(seconds=30))
+    assert metrics.get_analytics('D1', days=2)['resolution_times']['tta_histogram']['<1m'] == 1
+
+def test_window_and_prune_drop_old_days():
+    metrics = AlertMetrics(retention_days=30)
+    now = datetime.now(timezone.utc)
+    metrics.record_created('D1', 'door_open', 'medium', now - timedelta(days=10))
+    metrics.record_created('D1', 'door_open', 'medium', now - timedelta(days=40))
+
+    assert metrics.get_analytics('D1', days=7)['total_alerts'] == 0
+    assert metrics.get_analytics('D1', days=60)['total_alerts'] == 2
+    assert metrics.prune(now) == 2  # device and fleet aggregates of the old day
+    assert metrics.get_analytics('D1', days=60)['total_alerts'] == 1
+
+def test_load_rebuilds_from_rows():
+    metrics = AlertMetrics()
+    created = _recent(1)
+    metrics.record_created('D9', 'door_open', 'low', created)
+    rows = [('D1', 'door_open', 'medium', created, created + timedelta(minutes=1), None),
+            ('D1', 'battery_low', 'low', None, None, None)]
+    assert metrics.load(rows) == 1
+    assert metrics.get_analytics('D9', days=2)['total_alerts'] == 0
+    assert metrics.get_analytics('D1', days=2)['resolution_times']['acknowledged_alerts'] == 1
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from models import Alert
+from services.alert_resolution import AlertResolver
+
+CREATED = datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def alerts(database):
+    for alert_id, device_id, status in (('A1', 'D1', 'active'), ('A2', 'D1', 'active'),
+                                        ('A3', 'D2', 'active'), ('A4', 'D2', 'acknowledged')):
+        database.session.add(Alert(id=alert_id, device_id=device_id, alert_type='temperature_high',
+                                   status=status, created_at=CREATED))
+    database.session.commit()
+    return database
+
+def _statuses():
+    return {alert.id: alert.status for alert in Alert.query.all()}
+
+def test_flush_resolves_only_active_alerts(alerts):
+    resolver = AlertResolver(batch_size=2)
+    for alert_id, device_id in (('A1', 'D1'), ('A3', 'D2'), ('A4', 'D2')):
+        resolver.enqueue(alert_id, device_id, 'temperature_high', 'temperature back in range')
+
+    groups = resolver.flush()
+    assert _statuses() == {'A1': 'resolved', 'A2': 'active', 'A3': 'resolved', 'A4': 'acknowledged'}
+    assert alerts.session.get(Alert, 'A1').resolved_at is not None and alerts.session.get(Alert, 'A4').resolved_at is None
+    assert sorted(groups) == ['D1', 'D2']
+    assert [r['id'] for r in groups['D2']] == ['A3']
+    assert resolver.get_stats() == {'queued': 3, 'resolved': 2, 'flushes': 1, 'pending': 0}
+
+def test_alert_acknowledged_after_enqueue_is_left_alone(alerts):
+    resolver = AlertResolver()
+    resolver.enqueue('A1', 'D1', 'temperature_high', 'cleared')
+    resolver.enqueue('A2', 'D1', 'temperature_high', 'cleared')
+
+    alerts.session.get(Alert, 'A2').status = 'acknowledged'
+    alerts.session.commit()
+
+    groups = resolver.flush()
+    assert _statuses()['A2'] == 'acknowledged'
+    assert [r['id'] for r in groups['D1']] == ['A1']
+
+def test_grouped_payload_carries_resolution_details(alerts):
+    resolver = AlertResolver()
+    resolver.enqueue('A1', 'D1', 'temperature_high', 'first')
+    resolver.enqueue('A1', 'D1', 'temperature_high', 'cleared')  # re-queued: latest reason wins
+    resolver.enqueue('A2', 'D1', 'door_open', 'door closed')
+
+    groups = resolver.flush()
+    assert list(groups) == ['D1']
+    first, second = groups['D1']
+    assert first == {
+        'id': 'A1', 'device_id': 'D1', 'alert_type': 'temperature_high', 'reason': 'cleared',
+        'created_at': CREATED.replace(tzinfo=None).isoformat(),
+        'resolved_at': first['resolved_at']
+    }
+    assert second['alert_type'] == 'door_open' and second['resolved_at'] == first['resolved_at']
+    assert resolver.flush() == {}
+
+def test_failed_flush_requeues_pending(alerts, monkeypatch):
+    resolver = AlertResolver()
+    resolver.enqueue('A1', 'D1', 'temperature_high', 'cleared')
+    with monkeypatch.context() as patch:
+        patch.setattr(alerts.session, 'commit', lambda: (_ for _ in ()).throw(RuntimeError('db down')))
+        assert resolver.flush() == {}
+    assert resolver.get_stats()['pending'] == 1
+    assert list(resolver.flush()) == ['D1']
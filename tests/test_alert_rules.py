@@ -0,0 +1,129 @@
+import random
+
+import numpy as np
+import pytest
+
+from services.alert_rules import AlertRuleEngine, episodes, forward_fill
+from services.rule_replay import apply_cooldown, backtest_device
+
+RULES = {
+    'temperature_critical': {'field': 'temperature', 'op': '>', 'threshold': 10.0, 'group': 'temperature',
+                             'severity': 'critical'},
+    'temperature_high': {'field': 'temperature', 'op': '>', 'threshold': 5.0, 'group': 'temperature',
+                         'severity': 'high'},
+    'temperature_low': {'field': 'temperature', 'op': '<', 'threshold': 2.0, 'group': 'temperature',
+                        'severity': 'high'},
+    'battery_low': {'field': 'battery_level', 'op': '<', 'threshold': 20.0, 'severity': 'medium'}
+}
+
+def _sequential(engine, device_id, readings):
+    """Drive the per-reading path the way _check_alerts does: raise matches, then clear"""
+    events = []
+    for i, reading in enumerate(readings):
+        for match in engine.evaluate(device_id, reading):
+            engine.index.reserve(device_id, match['alert_type'])
+            engine.index.confirm(device_id, match['alert_type'], f'{match["alert_type"]}-{i}')
+            events.append((i, 'raised', match['alert_type']))
+        for cleared in engine.cleared(device_id, reading):
+            engine.index.discard(device_id, cleared['alert_type'])
+            events.append((i, 'cleared', cleared['alert_type']))
+    return events
+
+def _batch(engine, device_id, readings):
+    """Run evaluate_batch and apply its transitions to the index like process_sensor_batch"""
+    columns = {field: [r.get(field) for r in readings] for field in ('temperature', 'battery_level')}
+    columns = {f: [np.nan if v is None else v for v in values] for f, values in columns.items()}
+    events = []
+    for t in engine.evaluate_batch(device_id, columns):
+        if t['event'] == 'raised':
+            engine.index.reserve(device_id, t['alert_type'])
+            engine.index.confirm(device_id, t['alert_type'], f'{t["alert_type"]}-{t["index"]}')
+        else:
+            engine.index.discard(device_id, t['alert_type'])
+        events.append((t['index'], t['event'], t['alert_type']))
+    return events
+
+def _readings(rng, n):
+    readings = []
+    for _ in range(n):
+        reading = {}
+        if rng.random() > 0.1:
+            reading['temperature'] = rng.choice([0.0, 1.0, 3.0, 6.0, 9.0, 11.0, 14.0])
+        if rng.random() > 0.3:
+            reading['battery_level'] = rng.choice([10.0, 15.0, 50.0, 80.0])
+        readings.append(reading)
+    return readings
+
+def _counts(events):
+    counts = {}
+    for _, event, alert_type in events:
+        counts[(event, alert_type)] = counts.get((event, alert_type), 0) + 1
+    return counts
+
+@pytest.mark.parametrize('seed', range(50))
+def test_batch_matches_sequential(seed):
+    rng = random.Random(seed)
+    sequential, batch = AlertRuleEngine(RULES), AlertRuleEngine(RULES)
+
+    # Several chunks, so batches also start with alerts already active
+    for _ in range(3):
+        readings = _readings(rng, rng.randint(1, 40))
+        expected = _sequential(sequential, 'D1', readings)
+        assert sorted(_batch(batch, 'D1', readings)) == sorted(expected)
+        assert sequential.index.for_device('D1').keys() == batch.index.for_device('D1').keys()
+
+def test_lower_level_stays_active_while_group_moves_up():
+    engine = AlertRuleEngine(RULES)
+    readings = [{'temperature': t} for t in (0, 6, 11, 6, 11, 6, 0)]
+    counts = _counts(_batch(engine, 'D1', readings))
+    assert counts[('raised', 'temperature_high')] == 1
+    assert counts[('raised', 'temperature_critical')] == 2
+
+def _backtest_counts(temperatures, timestamps=None):
+    timestamps = np.arange(len(temperatures), dtype=float) * 60 if timestamps is None else timestamps
+    result = backtest_device(RULES, {}, timestamps, {'temperature': np.array(temperatures, dtype=float)})
+    return {alert_type: stats[0] for alert_type, stats in result.items()}
+
+def test_backtest_matches_live_on_group_moving_between_levels():
+    # High stays active while critical comes and goes; the readings at 0 also trip the low rule
+    assert _backtest_counts([0, 6, 11, 6, 11, 6, 0]) == {
+        'temperature_low': 2, 'temperature_high': 1, 'temperature_critical': 2
+    }
+
+@pytest.mark.parametrize('seed', range(50))
+def test_backtest_alert_counts_match_evaluate_batch(seed):
+    rng = random.Random(seed)
+    temperatures = [rng.choice([np.nan, 0.0, 3.0, 6.0, 9.0, 11.0]) for _ in range(rng.randint(1, 60))]
+
+    engine = AlertRuleEngine(RULES)
+    raised = {}
+    for t in engine.evaluate_batch('D1', {'temperature': temperatures}):
+        if t['event'] == 'raised':
+            raised[t['alert_type']] = raised.get(t['alert_type'], 0) + 1
+
+    assert _backtest_counts(temperatures) == raised
+
+def test_backtest_open_episode_and_duration():
+    result = backtest_device(RULES, {}, np.array([0.0, 60.0, 120.0, 180.0]),
+                             {'temperature': np.array([3.0, 12.0, 12.0, 12.0])})
+    alerts, suppressed, still_open, total, longest = result['temperature_critical']
+    assert (alerts, suppressed, still_open) == (1, 0, 1)
+    assert total == longest == 120.0
+
+def test_backtest_uses_device_params():
+    rules = {'temperature_high': {'field': 'temperature', 'op': '>', 'param': 'target_temp_max',
+                                  'threshold': 100.0}}
+    result = backtest_device(rules, {'target_temp_max': 8.0}, np.array([0.0, 60.0]),
+                             {'temperature': np.array([3.0, 9.0])})
+    assert result['temperature_high'][0] == 1
+
+def test_cooldown_suppresses_close_starts():
+    starts = np.array([0.0, 100.0, 700.0, 800.0, 1500.0])
+    assert list(apply_cooldown(starts, 600)) == [True, False, True, False, True]
+    assert apply_cooldown(starts, 0).all()
+
+def test_forward_fill_and_episodes():
+    assert np.array_equal(forward_fill(np.array([np.nan, 1.0, np.nan, 3.0])), [np.nan, 1.0, 1.0, 3.0],
+                          equal_nan=True)
+    starts, ends = episodes(np.array([True, True, False, True]))
+    assert list(starts) == [0, 3] and list(ends) == [2, 4]
@@ -0,0 +1,142 @@
+from services.alert_suppression import AlertSuppressor, InMemorySuppressionStore, RedisSuppressionStore
+
+class FakeRedis:
+    """Dict-backed stand-in for the redis-py calls the store makes, on a settable clock"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.data = {}  # key -> [value, expires_at or None]
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self.now:
+            del self.data[key]
+            entry = None
+        return entry
+
+    def mget(self, *keys):
+        return [str(e[0]).encode() if e else None for e in map(self._live, keys)]
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self._live(key):
+            return None
+        self.data[key] = [value, self.now + px / 1000 if px else None]
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        entry = self._live(key) or self.data.setdefault(key, [0, None])
+        entry[0] = int(entry[0]) + 1
+        return entry[0]
+
+    def expire(self, key, seconds):
+        if self._live(key):
+            self.data[key][1] = self.now + seconds
+
+    def pipeline(self):
+        redis, queued = self, []
+
+        class Pipeline:
+            def incr(self, key):
+                queued.append(lambda: redis.incr(key))
+
+            def expire(self, key, seconds):
+                queued.append(lambda: redis.expire(key, seconds))
+
+            def execute(self):
+                return [command() for command in queued]
+
+        return Pipeline()
+
+def _redis_check(store, redis, now, cooldown=600, max_per_hour=100, key='D1:door_open'):
+    redis.now = now
+    return store.check_and_record(key, now, cooldown, max_per_hour)
+
+def test_cooldown_suppresses_until_it_expires():
+    suppressor = AlertSuppressor(rules={'door_open': {'cooldown_minutes': 10}}, max_per_hour=100)
+    assert suppressor.check('D1', 'door_open', now=0) is None
+    assert suppressor.check('D1', 'door_open', now=599) == 'cooldown'
+    assert suppressor.check('D2', 'door_open', now=599) is None
+    assert suppressor.check('D1', 'door_open', now=600) is None
+    assert suppressor.get_stats() == {'allowed': 3, 'cooldown': 1, 'rate_limit': 0}
+
+def test_rate_limit_decays_over_time():
+    suppressor = AlertSuppressor(default_cooldown_minutes=0, max_per_hour=3)
+    assert [suppressor.check('D1', 'temperature_high', now=t) for t in (0, 1, 2, 3)] == \
+        [None, None, None, 'rate_limit']
+    # One time constant later the estimate has decayed to about 3/e
+    assert suppressor.check('D1', 'temperature_high', now=3603) is None
+
+def test_suppressed_attempts_do_not_extend_cooldown():
+    suppressor = AlertSuppressor(default_cooldown_minutes=1, max_per_hour=100)
+    suppressor.check('D1', 'battery_low', now=0)
+    assert suppressor.check('D1', 'battery_low', now=59) == 'cooldown'
+    assert suppressor.check('D1', 'battery_low', now=60) is None
+
+def test_reset_lifts_cooldown():
+    suppressor = AlertSuppressor(default_cooldown_minutes=30)
+    suppressor.check('D1', 'door_open', now=0)
+    suppressor.reset('D1', 'door_open')
+    assert suppressor.check('D1', 'door_open', now=1) is None
+
+def test_store_evicts_least_recently_used_keys():
+    store = InMemorySuppressionStore(max_keys=2)
+    for key in ('a', 'b', 'c'):
+        store.check_and_record(key, 0, 60, 10)
+    assert len(store) == 2
+    assert store.check_and_record('a', 1, 60, 10) is None
+    assert store.check_and_record('c', 1, 60, 10) == 'cooldown'
+
+def test_broken_store_fails_open():
+    class BrokenStore:
+        def check_and_record(self, *args):
+            raise ConnectionError('store down')
+
+    suppressor = AlertSuppressor(store=BrokenStore())
+    assert suppressor.check('D1', 'door_open', now=0) is None
+
+def test_redis_cooldown_expires_with_its_key():
+    redis = FakeRedis()
+    store = RedisSuppressionStore(redis, prefix='t:')
+    assert _redis_check(store, redis, 0) is None
+    assert _redis_check(store, redis, 599) == 'cooldown'
+    assert _redis_check(store, redis, 599, key='D2:door_open') is None
+    assert _redis_check(store, redis, 600) is None
+
+    store.clear('D1:door_open')
+    assert _redis_check(store, redis, 601) is None
+
+def test_redis_rate_weights_the_previous_hour_by_overlap():
+    redis = FakeRedis()
+    store = RedisSuppressionStore(redis, prefix='t:')
+    assert [_redis_check(store, redis, t, cooldown=0, max_per_hour=3) for t in (0, 1, 2, 3)] == \
+        [None, None, None, 'rate_limit']
+    assert redis.data['t:rate:D1:door_open:0'] == [3, 7202]  # rejected attempts are not counted
+
+    # Half way into the next hour the previous three count as 1.5
+    assert _redis_check(store, redis, 5400, cooldown=0, max_per_hour=3) is None
+    assert _redis_check(store, redis, 5401, cooldown=0, max_per_hour=3) == 'rate_limit'
+    # The first hour has slid out; only the single alert of the second one weighs in
+    assert _redis_check(store, redis, 7200, cooldown=0, max_per_hour=3) is None
+
+def test_redis_rate_limit_does_not_start_a_cooldown():
+    redis = FakeRedis()
+    store = RedisSuppressionStore(redis, prefix='t:')
+    assert _redis_check(store, redis, 0, cooldown=60, max_per_hour=2) is None
+    assert _redis_check(store, redis, 30, cooldown=60, max_per_hour=2) == 'cooldown'
+    assert _redis_check(store, redis, 120, cooldown=60, max_per_hour=2) is None
+    assert _redis_check(store, redis, 250, cooldown=60, max_per_hour=2) == 'rate_limit'
+    assert redis._live('t:cooldown:D1:door_open') is None
+    assert redis.data['t:rate:D1:door_open:0'][0] == 2  # cooldown hits are not counted either
+
+def test_suppressor_over_redis_store():
+    redis = FakeRedis()
+    suppressor = AlertSuppressor(RedisSuppressionStore(redis), rules={'door_open': {'cooldown_minutes': 10}})
+    assert suppressor.check('D1', 'door_open', now=0) is None
+    redis.now = 60
+    assert suppressor.check('D1', 'door_open', now=60) == 'cooldown'
+    suppressor.reset('D1', 'door_open')
+    assert suppressor.check('D1', 'door_open', now=61) is None
+    assert suppressor.get_stats() == {'allowed': 2, 'cooldown': 1, 'rate_limit': 0}
@@ -0,0 +1,33 @@
+import pytest
+
+from services.analytics_jobs import AnalyticsJobService
+
+@pytest.fixture
+def jobs():
+    service = AnalyticsJobService(max_queue=10)
+    service.register('stats', lambda device_id, hours=24: {'device_id': device_id}, ('device_id', 'hours'))
+    return service
+
+@pytest.mark.parametrize('priority, rank', [('high', 0), ('low', 2), (0, 0), (2, 2)])
+def test_accepts_named_and_in_range_priorities(jobs, priority, rank):
+    assert jobs.submit('stats', {'device_id': 'D1'}, priority=priority)['priority'] == rank
+
+@pytest.mark.parametrize('priority', [-1, 3, True, False, 1.0, 'urgent', None])
+def test_rejects_invalid_priorities(jobs, priority):
+    with pytest.raises(ValueError):
+        jobs.submit('stats', {'device_id': 'D1'}, priority=priority)
+
+def test_rejects_params_outside_whitelist(jobs):
+    with pytest.raises(ValueError, match='self'):
+        jobs.submit('stats', {'device_id': 'D1', 'self': None})
+    with pytest.raises(ValueError):
+        jobs.submit('stats', ['D1'])
+
+def test_completion_reports_owner(jobs):
+    completed = []
+    jobs.on_complete = completed.append
+    job = jobs.submit('stats', {'device_id': 'D1'}, owner='42')
+    jobs._run(job)
+    assert completed[0]['owner'] == '42'
+    assert job['status'] == 'completed' and job['result'] == {'device_id': 'D1'}
+    assert 'owner' not in jobs.to_response(job)
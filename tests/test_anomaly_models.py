@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+import random
+
+import numpy as np
+import pytest
+
+from models import Device, SensorData
+from services.anomaly_models import AnomalyModelService
+
+@pytest.fixture
+def history(database):
+    rng = random.Random(5)
+    now = datetime.now(timezone.utc)
+    for device_id, device_type, samples in (('D1', 'refrigerator', 200), ('D2', 'freezer', 30),
+                                            ('D3', 'freezer', 40), ('D4', 'incubator', 10)):
+        database.session.add(Device(device_id=device_id, name=device_id, device_type=device_type))
+        base = -18.0 if device_type == 'freezer' else 5.0
+        for i in range(samples):
+            database.session.add(SensorData(
+                device_id=device_id, temperature=base + rng.gauss(0, 0.5),
+                humidity=None if i % 4 == 0 else 50.0 + rng.gauss(0, 2),
+                battery_level=None if device_id == 'D1' else 90,
+                timestamp=now - timedelta(minutes=i)
+            ))
+    database.session.add(SensorData(device_id='D1', temperature=40.0, timestamp=now - timedelta(days=10)))
+    database.session.commit()
+    return database
+
+@pytest.fixture
+def service(history):
+    service = AnomalyModelService(contamination=0.01, min_samples=50, history_hours=72)
+    assert service.train_models() == {'device_models': 1, 'cohort_models': 2}
+    return service
+
+def test_devices_without_enough_samples_fall_back_to_their_cohort(service):
+    assert {key for key in service.models} == {('device', 'D1'), ('cohort', 'refrigerator'), ('cohort', 'freezer')}
+    assert service.get_model('D1')['scope'] == 'device'
+    assert (service.get_model('D2')['scope'], service.get_model('D2')['key']) == ('cohort', 'freezer')
+    assert service.models[('cohort', 'freezer')]['samples'] == 70
+    assert service.get_model('D4') is None  # cohort too small as well
+    assert service.get_model('D9') is None  # unknown device, no default cohort trained
+
+def test_missing_features_are_imputed_with_training_medians(service):
+    medians = service.models[('device', 'D1')]['medians']
+    humidity = np.array([r.humidity for r in SensorData.query.filter(
+        SensorData.device_id == 'D1', SensorData.humidity.isnot(None)).all()])
+    assert medians[1] == pytest.approx(np.median(humidity))
+    assert medians[2] == 0.0  # never reported in the window
+
+    X = np.array([[5.0, np.nan, np.nan]])
+    assert service._impute(X, medians).tolist() == [[5.0, medians[1], 0.0]]
+
+def test_pending_readings_are_scored_in_one_batch_per_model(service, monkeypatch):
+    calls = []
+    for entry in service.models.values():
+        predict = entry['model'].predict
+        monkeypatch.setattr(entry['model'], 'predict',
+                            lambda X, predict=predict, key=entry['key']: calls.append((key, len(X))) or predict(X))
+
+    for device_id, temperature, humidity, battery in (('D1', 5.1, None, None), ('D1', 35.0, None, None),
+                                                      ('D1', 4.9, 51.0, None), ('D2', -18.2, None, 90),
+                                                      ('D3', 10.0, 95.0, 5), ('D4', 99.0, None, 90)):
+        service.submit(device_id, {'temperature': temperature, 'humidity': humidity, 'battery_level': battery})
+
+    anomalies = service.score_pending()
+    assert sorted(calls) == [('D1', 3), ('freezer', 2)]
+    assert [(a['device_id'], a['data']['temperature']) for a in anomalies] == [('D1', 35.0), ('D3', 10.0)]
+    assert {a['model_scope'] for a in anomalies} == {'device', 'cohort'}
+    assert all(a['score'] < 0 and a['model_version'] == 1 for a in anomalies)
+    assert not service.pending and service.score_pending() == []
+
+def test_retraining_bumps_model_versions(service):
+    service.train_models()
+    assert {entry['version'] for entry in service.models.values()} == {2}
+    assert len(service.get_model_info()) == 3
@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+from services import cache_service
+from services.cache_service import AnalyticsCache, InMemoryCacheBackend, RedisCacheBackend
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class FakeRedis:
+    """Dict-backed stand-in for the redis-py calls the backend makes"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}  # key -> (expires_at or None, bytes)
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or (entry[0] is not None and entry[0] <= self.clock()):
+            self.data.pop(key, None)
+            return None
+        return entry[1]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = (self.clock() + ttl, value.encode('utf-8'))
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = (None, str(value).encode('utf-8'))
+        return value
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_service.time, 'monotonic', clock)
+    return clock
+
+def test_memory_backend_evicts_least_recently_used(clock):
+    backend = InMemoryCacheBackend(max_entries=2)
+    backend.set('a', 1, 60)
+    backend.set('b', 2, 60)
+    assert backend.get('a') == 1
+    backend.set('c', 3, 60)
+    assert (backend.get('a'), backend.get('b'), backend.get('c')) == (1, None, 3)
+    assert len(backend) == 2
+
+def test_memory_backend_expires_entries(clock):
+    backend = InMemoryCacheBackend()
+    backend.set('a', {'x': 1}, 10)
+    clock.now += 9.9
+    assert backend.get('a') == {'x': 1}
+    clock.now += 0.1
+    assert backend.get('a') is None and len(backend) == 0
+
+def test_memory_backend_caps_counters_without_reusing_values():
+    backend = InMemoryCacheBackend(max_entries=10, max_counters=2)
+    for _ in range(5):
+        backend.incr('gen:D1')
+    backend.incr('gen:D2')
+    backend.incr('gen:D3')  # evicts D1 at 5
+    assert len(backend._counters) == 2
+    assert backend.get_counter('gen:D1') == 5
+    assert backend.incr('gen:D1') == 6
+
+def test_generation_bump_invalidates_only_that_device(clock):
+    cache = AnalyticsCache(ttl=300)
+    calls = []
+
+    def compute(device_id):
+        calls.append(device_id)
+        return {'device_id': device_id, 'call': len(calls)}
+
+    for device_id in ('D1', 'D2', 'D1', 'D2'):
+        cache.get_or_compute(device_id, 'statistics', {'hours': 24}, lambda: compute(device_id))
+    assert calls == ['D1', 'D2']
+
+    cache.invalidate_device('D1')
+    for device_id in ('D1', 'D2'):
+        cache.get_or_compute(device_id, 'statistics', {'hours': 24}, lambda: compute(device_id))
+    assert calls == ['D1', 'D2', 'D1']
+    assert cache.get_stats()['hits'] == 3 and cache.get_stats()['invalidations'] == 1
+
+def test_errors_are_not_cached(clock):
+    cache = AnalyticsCache()
+    results = iter([{'error': 'timeout'}, {'value': 1}])
+    assert 'error' in cache.get_or_compute('D1', 'trends', {}, lambda: next(results))
+    assert cache.get_or_compute('D1', 'trends', {}, lambda: next(results)) == {'value': 1}
+
+def test_redis_backend_round_trips_and_expires():
+    clock = FakeClock()
+    redis = FakeRedis(clock)
+    backend = RedisCacheBackend(redis, prefix='t:')
+
+    backend.set('a', {'when': 'now', 'values': [1, 2]}, 30)
+    assert set(redis.data) == {'t:a'}
+    assert backend.get('a') == {'when': 'now', 'values': [1, 2]}
+    clock.now += 30
+    assert backend.get('a') is None
+
+    assert backend.get_counter('gen:D1') == 0
+    assert [backend.incr('gen:D1') for _ in range(2)] == [1, 2]
+    assert backend.get_counter('gen:D1') == 2
+
+    backend.set('b', 1, 30)
+    backend.delete('b')
+    assert backend.get('b') is None
+
+def test_analytics_cache_over_redis_invalidates_by_generation():
+    cache = AnalyticsCache(RedisCacheBackend(FakeRedis(time.monotonic)), ttl=300)
+    calls = []
+    compute = lambda: calls.append(1) or {'calls': len(calls)}
+    cache.get_or_compute('D1', 'statistics', {}, compute)
+    cache.get_or_compute('D1', 'statistics', {}, compute)
+    cache.invalidate_device('D1')
+    assert cache.get_or_compute('D1', 'statistics', {}, compute) == {'calls': 2}
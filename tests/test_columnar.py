@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services.columnar import columnar_from_rows, model_fields
+
+def _model(tablename, *names):
+    columns = [SimpleNamespace(name=name) for name in names]
+    return SimpleNamespace(__tablename__=tablename, __table__=SimpleNamespace(columns=columns))
+
+DEVICE = _model('devices', 'id', 'device_id', 'name', 'mac_address', 'ip_address', 'user_id')
+
+def test_default_projection_excludes_private_columns():
+    assert model_fields(DEVICE) == ['id', 'device_id', 'name']
+
+@pytest.mark.parametrize('field', ['mac_address', 'ip_address', 'user_id', 'missing'])
+def test_private_and_unknown_fields_rejected(field):
+    with pytest.raises(ValueError):
+        model_fields(DEVICE, ['device_id', field])
+
+def test_unlisted_table_exposes_nothing():
+    assert model_fields(_model('users', 'id', 'password_hash')) == []
+
+def test_rows_transposed_with_epoch_ms():
+    at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    result = columnar_from_rows(['device_id', 'last_seen'], [('D1', at), ('D2', None)])
+    assert result['count'] == 2
+    assert result['columns'] == {'device_id': ['D1', 'D2'], 'last_seen': [1704067200000, None]}
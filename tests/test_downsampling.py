@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from services.downsampling import METHODS, MIN_POINTS, downsample_indices, downsample_records
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), np.cumsum(rng.normal(size=n))
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('max_points', [-5, 0, 1, 2, 3])
+def test_small_max_points_clamped_to_minimum(method, max_points):
+    x, y = _series(1000)
+    kept = downsample_indices(x, y, max_points, method)
+    assert 2 <= len(kept) <= MIN_POINTS[method]
+    assert kept[0] == 0 and kept[-1] == 999
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('max_points', [4, 5, 10, 101, 500])
+def test_output_bounded_sorted_and_keeps_endpoints(method, max_points):
+    x, y = _series(1000, seed=max_points)
+    kept = downsample_indices(x, y, max_points, method)
+    assert len(kept) <= max_points
+    assert np.all(np.diff(kept) > 0)
+    assert kept[0] == 0 and kept[-1] == 999
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('n', [0, 1, 2, 3, 4])
+def test_short_series_returned_whole(method, n):
+    x, y = _series(n)
+    assert list(downsample_indices(x, y, 10, method)) == list(range(n))
+
+@pytest.mark.parametrize('method', METHODS)
+def test_spike_survives(method):
+    x, y = np.arange(1000, dtype=float), np.zeros(1000)
+    y[537] = 50.0
+    assert 537 in downsample_indices(x, y, 20, method)
+
+def test_minmax_keeps_bucket_extremes():
+    x, y = _series(1000, seed=3)
+    kept = downsample_indices(x, y, 1000 // 10 * 2 + 2, 'minmax')
+    assert int(np.argmax(y)) in kept and int(np.argmin(y)) in kept
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        downsample_indices([0.0, 1.0], [0.0, 1.0], 10, 'median')
+
+def test_records_skip_missing_values_and_respect_limit():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    records = [{'timestamp': start + timedelta(minutes=i), 'value': None if i % 7 == 0 else float(i % 13)}
+               for i in range(300)]
+    sampled = downsample_records(records, 50)
+    assert len(sampled) <= 50
+    assert all(r['value'] is not None for r in sampled)
+    assert downsample_records(records, None) is records
@@ -0,0 +1,57 @@
+from services.duration_rules import CLEARED, FIRING, PENDING, DurationRuleEngine
+
+RULES = {
+    'door_open': {'condition': 'truthy', 'field': 'door_open', 'duration_threshold': 300},
+    'connectivity_loss': {'condition': 'silence', 'duration_threshold': 600},
+    'temperature_high': {'field': 'temperature', 'op': '>', 'threshold': 8.0}
+}
+
+def _state(engine, alert_type, device_id='D1'):
+    return engine.states[(device_id, alert_type)][0]
+
+def test_only_duration_rules_are_tracked():
+    assert set(DurationRuleEngine(RULES).rules) == {'door_open', 'connectivity_loss'}
+
+def test_truthy_rule_fires_after_threshold_and_clears():
+    engine = DurationRuleEngine(RULES)
+    engine.observe('D1', {'door_open': True}, now=0)
+    engine.observe('D1', {'door_open': True}, now=100)  # still open: clock keeps running
+    assert [e['alert_type'] for e in engine.advance(now=299)] == []
+    fired = engine.advance(now=300)
+    assert [e['alert_type'] for e in fired] == ['door_open']
+    assert _state(engine, 'door_open') == FIRING
+
+    cleared = engine.observe('D1', {'door_open': False}, now=400)
+    assert [(e['event'], e['alert_type']) for e in cleared] == [('cleared', 'door_open')]
+    assert _state(engine, 'door_open') == CLEARED
+
+def test_closing_before_threshold_never_fires():
+    engine = DurationRuleEngine(RULES)
+    engine.observe('D1', {'door_open': True}, now=0)
+    engine.observe('D1', {'door_open': False}, now=200)
+    assert [e for e in engine.advance(now=1000) if e['alert_type'] == 'door_open'] == []
+
+def test_readings_push_silence_deadline_back():
+    engine = DurationRuleEngine(RULES)
+    engine.observe('D1', {}, now=0)
+    engine.observe('D1', {}, now=500)
+    assert engine.advance(now=700) == []
+    assert [e['alert_type'] for e in engine.advance(now=1100)] == ['connectivity_loss']
+
+def test_rearm_retries_suppressed_fire():
+    engine = DurationRuleEngine(RULES)
+    engine.observe('D1', {}, now=0)
+    assert [e['alert_type'] for e in engine.advance(now=600)] == ['connectivity_loss']
+
+    assert engine.rearm('D1', 'connectivity_loss', now=600)
+    assert _state(engine, 'connectivity_loss') == PENDING
+    assert engine.advance(now=1199) == []
+    retried = engine.advance(now=1200)
+    assert [e['alert_type'] for e in retried] == ['connectivity_loss']
+    assert retried[0]['duration_seconds'] == 1200  # measured from the original silence start
+
+def test_rearm_ignores_rules_that_are_not_firing():
+    engine = DurationRuleEngine(RULES)
+    assert not engine.rearm('D1', 'door_open', now=0)
+    engine.observe('D1', {'door_open': True}, now=0)
+    assert not engine.rearm('D1', 'door_open', now=10)
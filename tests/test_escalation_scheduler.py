@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import EscalationJob
+from services.escalation_scheduler import EscalationScheduler
+
+RULES = {
+    'power_failure': {'escalate_after_minutes': 5},
+    'temperature_high': {'escalate_after_minutes': 30}
+}
+
+@pytest.fixture
+def scheduler(database):
+    return EscalationScheduler(RULES, retry_seconds=60, max_attempts=3)
+
+def _later(minutes):
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+def test_incident_alerts_share_one_job(scheduler):
+    job_id = scheduler.schedule('A1', 'D1', 'power_failure', 'high', incident_id='I1')
+    assert scheduler.schedule('A2', 'D2', 'power_failure', 'critical', incident_id='I1') == job_id
+    assert scheduler.schedule('A3', 'D3', 'power_failure', 'high', incident_id='I2') != job_id
+    assert EscalationJob.query.count() == 2
+
+    due = scheduler.run_due(_later(6))
+    assert sorted(job['incident_id'] for job in due) == ['I1', 'I2']
+
+def test_acknowledging_opener_keeps_shared_job(scheduler):
+    scheduler.schedule('A1', 'D1', 'power_failure', 'high', incident_id='I1')
+    scheduler.schedule('A2', 'D2', 'power_failure', 'high', incident_id='I1')
+    assert not scheduler.cancel('A1')
+    assert len(scheduler.run_due(_later(6))) == 1
+
+def test_single_alert_incident_cancels(scheduler):
+    scheduler.schedule('A1', 'D1', 'power_failure', 'high', incident_id='I1')
+    assert scheduler.cancel('A1')
+    assert scheduler.run_due(_later(6)) == []
+    assert EscalationJob.query.one().status == 'cancelled'
+
+    # A new alert in the same incident starts a new job
+    assert scheduler.schedule('A2', 'D1', 'power_failure', 'high', incident_id='I1') is not None
+    assert len(scheduler.run_due(_later(6))) == 1
+
+def test_reloaded_incident_job_is_not_cancelled_by_opener(scheduler):
+    scheduler.schedule('A1', 'D1', 'power_failure', 'high', incident_id='I1')
+    restarted = EscalationScheduler(RULES)
+    assert restarted.load() == 1
+    assert not restarted.cancel('A1')
+    assert restarted.schedule('A2', 'D2', 'power_failure', 'high', incident_id='I1') == \
+        restarted.jobs_by_incident['I1']
+
+def test_due_jobs_come_out_in_due_order_and_in_batches(database):
+    scheduler = EscalationScheduler(RULES, batch_size=2)
+    scheduler.schedule('A1', 'D1', 'temperature_high', 'high')
+    scheduler.schedule('A2', 'D2', 'power_failure', 'high')
+    scheduler.schedule('A3', 'D3', 'power_failure', 'critical')
+
+    assert scheduler.run_due(_later(1)) == []
+    assert [job['alert_id'] for job in scheduler.run_due(_later(31))] == ['A2', 'A3']
+    assert [job['alert_id'] for job in scheduler.run_due(_later(31))] == ['A1']
+    assert EscalationJob.query.filter_by(status='pending').count() == 3  # until complete
+
+def test_cancelled_job_never_runs(scheduler):
+    scheduler.schedule('A1', 'D1', 'power_failure', 'high')
+    scheduler.schedule('A2', 'D2', 'power_failure', 'high')
+    assert scheduler.cancel('A1') and not scheduler.cancel('A1')
+    assert [job['alert_id'] for job in scheduler.run_due(_later(6))] == ['A2']
+    assert scheduler.get_stats()['pending'] == 0
+
+def test_complete_closes_rows_in_one_batch(scheduler):
+    for alert_id in ('A1', 'A2'):
+        scheduler.schedule(alert_id, 'D1', 'power_failure', 'high')
+    scheduler.complete([job['job_id'] for job in scheduler.run_due(_later(6))])
+    assert {row.status for row in EscalationJob.query.all()} == {'done'}
+    assert EscalationScheduler(RULES).load() == 0
+
+def test_retry_backs_off_then_gives_up(scheduler):
+    scheduler.schedule('A1', 'D1', 'power_failure', 'high')
+    now = _later(6)
+    job, = scheduler.run_due(now)
+
+    assert scheduler.retry(job, now)
+    assert scheduler.run_due(now + timedelta(seconds=59)) == []
+    job, = scheduler.run_due(now + timedelta(seconds=60))
+
+    now += timedelta(seconds=60)
+    assert scheduler.retry(job, now)
+    assert scheduler.run_due(now + timedelta(seconds=119)) == []
+    job, = scheduler.run_due(now + timedelta(seconds=120))
+
+    assert not scheduler.retry(job)
+    row = EscalationJob.query.one()
+    assert (row.status, row.attempts) == ('failed', 3)
+
+def test_restart_resumes_attempts_and_next_run(scheduler):
+    scheduler.schedule('A1', 'D1', 'power_failure', 'high')
+    now = _later(6)
+    job, = scheduler.run_due(now)
+    scheduler.retry(job, now)
+    scheduler.retry(scheduler.run_due(now + timedelta(seconds=60))[0], now)
+
+    restarted = EscalationScheduler(RULES, retry_seconds=60, max_attempts=3)
+    assert restarted.load() == 1
+    assert restarted.run_due(now + timedelta(seconds=119)) == []
+    job, = restarted.run_due(now + timedelta(seconds=120))
+    assert job['attempts'] == 2
+    assert not restarted.retry(job)
+    assert EscalationJob.query.one().status == 'failed'
@@ -0,0 +1,119 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import random
+
+import numpy as np
+import pytest
+
+from models import SensorData
+from services.analytics_service import AnalyticsService
+from services.fleet_analytics import FleetComparisonEngine
+
+def _old_sensor_stats(values, unit, threshold):
+    """Per-sensor statistics as the per-device loop computed them"""
+    numeric = [v for v in values if v is not None]
+    slope = float(np.polyfit(np.arange(len(numeric)), numeric, 1)[0]) if len(numeric) > 1 else 0.0
+    direction = 'stable' if abs(slope) < 0.01 else ('increasing' if slope > 0 else 'decreasing')
+
+    std = np.std(numeric)
+    anomalies = 0
+    if len(numeric) >= 3 and std:
+        anomalies = sum(abs((v - np.mean(numeric)) / std) > threshold for v in numeric)
+
+    score, issues = 100, []
+    if len(numeric) < len(values):
+        missing_ratio = (len(values) - len(numeric)) / len(values)
+        score -= missing_ratio * 30
+        issues.append(f'missing_values: {missing_ratio:.2%}')
+    if len(set(numeric)) == 1 and len(numeric) > 1:
+        score -= 20
+        issues.append('constant_values')
+    if len(numeric) > 3:
+        q1, q3 = np.percentile(numeric, 25), np.percentile(numeric, 75)
+        outliers = [v for v in numeric if v < q1 - 1.5 * (q3 - q1) or v > q3 + 1.5 * (q3 - q1)]
+        if outliers:
+            score -= len(outliers) / len(numeric) * 20
+            issues.append(f'outliers: {len(outliers) / len(numeric):.2%}')
+
+    return {
+        'count': len(numeric), 'min': min(numeric), 'max': max(numeric),
+        'avg': float(np.mean(numeric)), 'median': float(np.median(numeric)),
+        'std': float(std) if len(numeric) > 1 else 0.0, 'latest': numeric[-1], 'unit': unit,
+        'trend': {'direction': direction, 'strength': min(abs(slope) * 100, 100), 'slope': slope},
+        'anomalies': {'count': int(anomalies), 'threshold': threshold},
+        'data_quality': {'score': round(max(0, min(100, score)), 2), 'issues': issues}
+    }
+
+@pytest.fixture
+def readings(database):
+    rng = random.Random(11)
+    start = datetime.now(timezone.utc) - timedelta(hours=10)
+    series = defaultdict(list)
+    for device_index, device_id in enumerate(('D1', 'D2', 'D3', 'D4')):
+        for i in range(60):
+            timestamp = start + timedelta(minutes=5 * i)
+            temperature = 4.0 + device_index + rng.gauss(0, 0.3) + (12.0 if i == 30 and device_id == 'D2' else 0)
+            battery = None if device_id == 'D3' and i % 7 == 0 else 100.0 - i * 0.2 * (device_index + 1)
+            humidity = 50.0 if device_id == 'D4' else 45.0 + rng.random()
+            for sensor_type, value, unit in (('temperature', temperature, 'C'),
+                                             ('battery_level', battery, '%'),
+                                             ('humidity', humidity, '%RH')):
+                database.session.add(SensorData(device_id=device_id, temperature=temperature,
+                                                sensor_type=sensor_type, value=value, unit=unit,
+                                                timestamp=timestamp))
+                series[(device_id, sensor_type)].append((value, unit))
+    database.session.add(SensorData(device_id='D5', temperature=5.0, sensor_type='temperature',
+                                    value=5.0, unit='C', timestamp=start - timedelta(days=2)))
+    database.session.commit()
+    return series
+
+def _engine():
+    service = AnalyticsService()
+    return service.fleet_engine, service._calculate_device_health_score
+
+def test_statistics_match_per_device_loop(readings):
+    engine, health = _engine()
+    result = engine.compare(['D1', 'D2', 'D3', 'D4', 'D5'], hours=24)
+
+    assert result['devices_analyzed'] == 4
+    assert result['individual_stats']['D5']['total_readings'] == 0
+    for device_id in ('D1', 'D2', 'D3', 'D4'):
+        stats = result['individual_stats'][device_id]
+        assert stats['total_readings'] == 180
+        expected = {
+            sensor_type: _old_sensor_stats([v for v, _ in series], series[-1][1], engine.anomaly_threshold)
+            for (d, sensor_type), series in readings.items() if d == device_id
+        }
+        for sensor_type, old in expected.items():
+            new = stats['statistics'][sensor_type]
+            assert new['trend'] == pytest.approx(old['trend'])
+            assert new['data_quality'] == old['data_quality']
+            assert new['anomalies'] == old['anomalies']
+            for key in ('count', 'min', 'max', 'avg', 'median', 'std', 'latest', 'unit'):
+                assert new[key] == pytest.approx(old[key]), (device_id, sensor_type, key)
+        assert stats['health_score'] == health(expected)
+
+def test_rankings_and_outliers_match_per_device_loop(readings):
+    engine, _ = _engine()
+    result = engine.compare(['D1', 'D2', 'D3', 'D4', 'D5'], hours=24)
+
+    scores = [(d, s['health_score']) for d, s in result['individual_stats'].items() if s['total_readings']]
+    expected = sorted(scores, key=lambda item: item[1], reverse=True)
+    assert [(r['device_id'], r['health_score']) for r in result['rankings']['ranked_devices']] == expected
+    assert result['rankings']['top_device'] == expected[0][0]
+    assert 'D5' not in result['outliers']
+
+    values = np.array([score for _, score in scores])
+    assert result['outliers'] == [d for d, score in scores if abs(score - values.mean()) > 2 * values.std()]
+
+def test_comparative_metrics_per_sensor_type(readings):
+    engine, _ = _engine()
+    metrics = engine.compare(['D1', 'D2', 'D3', 'D4'], hours=24)['comparative_metrics']
+    means = {d: np.mean([v for v, _ in readings[(d, 'temperature')]]) for d in ('D1', 'D2', 'D3', 'D4')}
+    assert metrics['temperature']['fleet_avg'] == pytest.approx(np.mean(list(means.values())))
+    assert metrics['temperature']['min_device'] == 'D1' and metrics['temperature']['max_device'] == 'D4'
+    assert metrics['humidity']['devices'] == 4
+
+def test_no_data_is_an_error(database):
+    engine, _ = _engine()
+    assert engine.compare(['D9']) == {'error': 'No valid data for comparison'}
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from services.geo_index import GeoIndex, geohash_encode, haversine_km
+
+def test_geohash_known_value():
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+def test_haversine_known_distance():
+    # Paris to London is about 344 km
+    assert haversine_km(48.8566, 2.3522, 51.5074, -0.1278) == pytest.approx(343.5, abs=1.0)
+
+def _random_index(seed, count=300):
+    rng = random.Random(seed)
+    index = GeoIndex(precision=5)
+    for i in range(count):
+        index.upsert(f'D{i}', rng.uniform(51.0, 52.0), rng.uniform(-1.0, 1.0))
+    return index
+
+@pytest.mark.parametrize('radius_km', [0.5, 3.0, 12.0, 80.0])
+def test_radius_query_matches_brute_force(radius_km):
+    index = _random_index(int(radius_km * 10))
+    center = (51.5, 0.0)
+    expected = sorted(
+        device_id for device_id, (lat, lng, _) in index.positions.items()
+        if haversine_km(*center, lat, lng) <= radius_km
+    )
+    results = index.within_radius(*center, radius_km)
+    assert sorted(r['device_id'] for r in results) == expected
+    assert [r['distance_km'] for r in results] == sorted(r['distance_km'] for r in results)
+
+def test_bbox_query_matches_brute_force():
+    index = _random_index(7)
+    box = (51.2, -0.3, 51.4, 0.05)
+    expected = sorted(
+        device_id for device_id, (lat, lng, _) in index.positions.items()
+        if box[0] <= lat <= box[2] and box[1] <= lng <= box[3]
+    )
+    assert sorted(r['device_id'] for r in index.within_bbox(*box)) == expected
+
+def test_move_and_remove_keep_cells_consistent():
+    index = GeoIndex(precision=5)
+    index.upsert('D1', 51.5, 0.0, status='online')
+    index.upsert('D1', 40.7, -74.0)
+    assert index.within_radius(51.5, 0.0, 10) == []
+    assert index.within_radius(40.7, -74.0, 1)[0]['status'] == 'online'
+    assert sum(len(members) for members in index.cells.values()) == 1
+
+    index.remove('D1')
+    assert not index.cells and not index.positions
+
+def test_invalid_positions_are_rejected():
+    index = GeoIndex()
+    assert not index.upsert('D1', None, 0.0)
+    assert not index.upsert('D1', 91.0, 0.0)
+    assert not index.positions
+
+def test_aggregate_by_geohash_and_region():
+    index = GeoIndex(precision=5)
+    index.upsert('D1', 51.5, 0.0, location='Dock 1, London', temperature=4.0)
+    index.upsert('D2', 51.5001, 0.0001, location='Dock 2, London', temperature=6.0)
+    index.upsert('D3', 40.7, -74.0, location='Pier 9, New York')
+
+    by_cell = index.aggregate(precision=4)
+    assert by_cell['total_devices'] == 3
+    london = by_cell['regions'][geohash_encode(51.5, 0.0, 4)]
+    assert london['device_count'] == 2 and london['avg_temperature'] == 5.0
+
+    by_region = index.aggregate(by='region')['regions']
+    assert by_region['London']['device_count'] == 2
+    assert by_region['New York']['avg_temperature'] is None
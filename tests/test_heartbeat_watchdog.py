@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import Device
+from services.duration_rules import DurationRuleEngine
+from services.heartbeat_watchdog import HeartbeatWatchdog
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+SILENCE = {'connectivity_loss': {'condition': 'silence', 'duration_threshold': 600}}
+
+@pytest.fixture
+def devices(database):
+    for device_id in ('D1', 'D2', 'D3'):
+        database.session.add(Device(device_id=device_id, name=device_id))
+    database.session.commit()
+    return database
+
+def _last_seen():
+    return {d.device_id: d.last_seen for d in Device.query.all()}
+
+def test_flush_persists_only_dirty_devices_in_batches(devices):
+    watchdog = HeartbeatWatchdog(batch_size=2)
+    for minutes, device_id in enumerate(('D1', 'D2', 'D3', 'D1')):
+        watchdog.heartbeat(device_id, NOW + timedelta(minutes=minutes))
+    assert watchdog.get_stats() == {'tracked_devices': 3, 'pending_writes': 3}
+
+    assert watchdog.flush() == 3
+    naive = NOW.replace(tzinfo=None)
+    assert _last_seen() == {'D1': naive + timedelta(minutes=3), 'D2': naive + timedelta(minutes=1),
+                            'D3': naive + timedelta(minutes=2)}
+    assert watchdog.flush() == 0
+
+    watchdog.heartbeat('D2', NOW + timedelta(minutes=10))
+    assert watchdog.flush() == 1
+    assert _last_seen()['D2'] == naive + timedelta(minutes=10)
+
+def test_failed_flush_keeps_devices_dirty(devices, monkeypatch):
+    watchdog = HeartbeatWatchdog()
+    watchdog.heartbeat('D1', NOW)
+    with monkeypatch.context() as patch:
+        patch.setattr(devices.session, 'commit', lambda: (_ for _ in ()).throw(RuntimeError('db down')))
+        assert watchdog.flush() == 0
+    assert watchdog.get_stats()['pending_writes'] == 1
+    assert watchdog.flush() == 1
+
+def test_load_seeds_from_last_seen_without_marking_dirty():
+    watchdog = HeartbeatWatchdog()
+    watchdog.heartbeat('D2', NOW)
+    watchdog._dirty.clear()
+    assert watchdog.load([('D1', NOW.replace(tzinfo=None)), ('D2', NOW - timedelta(days=1)), ('D3', None)]) == 2
+    assert watchdog.get_last_seen('D1') == NOW
+    assert watchdog.get_last_seen('D2') == NOW  # heard since startup: newer than the stored value
+    assert watchdog.get_last_seen('D3') is None
+    assert watchdog.get_stats()['pending_writes'] == 0
+
+def test_silence_after_restart_fires_then_clears_on_reconnect():
+    watchdog = HeartbeatWatchdog()
+    rules = DurationRuleEngine(SILENCE)
+    watchdog.load([('D1', NOW), ('D2', NOW - timedelta(minutes=5))])
+    for device_id, last_seen in watchdog.last_heard.items():
+        rules.observe(device_id, {}, now=last_seen.timestamp())
+
+    now = NOW.timestamp()
+    assert [e['device_id'] for e in rules.advance(now + 299)] == []
+    assert [e['device_id'] for e in rules.advance(now + 300)] == ['D2']
+
+    # D1 keeps reporting; D2 comes back
+    watchdog.heartbeat('D1', NOW + timedelta(minutes=9))
+    rules.observe('D1', {}, now=now + 540)
+    watchdog.heartbeat('D2', NOW + timedelta(minutes=15))
+    cleared = rules.observe('D2', {}, now=now + 900)
+    assert [(e['event'], e['device_id']) for e in cleared] == [('cleared', 'D2')]
+    assert rules.advance(now + 1139) == []
+    assert [e['device_id'] for e in rules.advance(now + 1140)] == ['D1']
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import SensorData
+from services.history_service import SensorHistoryService
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+NAIVE_START = START.replace(tzinfo=None)  # SQLite returns naive timestamps
+
+@pytest.fixture
+def history(database):
+    for minute in range(500):
+        database.session.add(SensorData(device_id='D1', temperature=float(minute % 50),
+                                        timestamp=START + timedelta(minutes=minute)))
+    database.session.commit()
+    return database
+
+def test_keyset_pages_cover_the_range_without_overlap(history):
+    service = SensorHistoryService()
+    seen, cursor = [], None
+    while True:
+        page = service.query('D1', limit=150, fields=['temperature'], cursor=cursor, order='asc')
+        seen.extend(page['columns']['timestamp'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert len(seen) == 500 and seen == sorted(set(seen))
+
+def test_max_points_downsamples_the_whole_window(history):
+    page = SensorHistoryService().query('D1', fields=['temperature'], max_points=50)
+    timestamps = page['columns']['timestamp']
+    assert page['downsampled'] and page['count'] == 50 and page['next_cursor'] is None
+    # Endpoints of the full range survive, not just the newest default_limit rows
+    assert timestamps[0] == NAIVE_START + timedelta(minutes=499)
+    assert timestamps[-1] == NAIVE_START
+
+def test_explicit_limit_still_bounds_a_downsampled_page(history):
+    page = SensorHistoryService().query('D1', limit=100, fields=['temperature'], max_points=20)
+    assert page['count'] == 20 and page['next_cursor'] is not None
+    assert page['columns']['timestamp'][-1] == NAIVE_START + timedelta(minutes=400)
+
+def test_max_points_fetch_is_capped_by_max_limit(history):
+    page = SensorHistoryService(max_limit=200).query('D1', fields=['temperature'], max_points=50)
+    assert page['count'] == 50 and page['next_cursor'] is not None
+
+def test_unknown_field_is_rejected(history):
+    with pytest.raises(ValueError):
+        SensorHistoryService().query('D1', fields=['pressure'])
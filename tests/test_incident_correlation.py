@@ -0,0 +1,62 @@
+import pytest
+
+from services.incident_correlation import IncidentCorrelator, incident_from_alerts
+
+def test_nearby_alerts_in_window_share_an_incident():
+    correlator = IncidentCorrelator(window_seconds=300, radius_km=10)
+    first, _ = correlator.correlate(1, 'D1', 'temperature_high', 'high', (51.50, 0.00), now=0)
+    second, _ = correlator.correlate(2, 'D2', 'temperature_high', 'high', (51.52, 0.03), now=100)
+    assert first['id'] == second['id']
+    assert second['alert_count'] == 2 and second['device_ids'] == ['D1', 'D2']
+
+def test_far_or_late_alerts_open_new_incidents():
+    correlator = IncidentCorrelator(window_seconds=300, radius_km=10)
+    first, _ = correlator.correlate(1, 'D1', 'temperature_high', 'high', (51.5, 0.0), now=0)
+    far, _ = correlator.correlate(2, 'D2', 'temperature_high', 'high', (52.5, 0.0), now=10)
+    late, _ = correlator.correlate(3, 'D3', 'temperature_high', 'high', (51.5, 0.0), now=400)
+    assert len({first['id'], far['id'], late['id']}) == 3
+
+def test_match_across_cell_boundary_at_high_latitude():
+    correlator = IncidentCorrelator(radius_km=10)
+    # About 9 km apart in longitude at 70N, several grid columns away
+    first, _ = correlator.correlate(1, 'D1', 'door_open', 'medium', (70.0, 20.0), now=0)
+    second, _ = correlator.correlate(2, 'D2', 'door_open', 'medium', (70.0, 20.24), now=1)
+    assert first['id'] == second['id']
+
+def test_devices_without_position_cluster_by_location():
+    correlator = IncidentCorrelator()
+    a, _ = correlator.correlate(1, 'D1', 'power_failure', 'critical', location='Warehouse A', now=0)
+    b, _ = correlator.correlate(2, 'D2', 'power_failure', 'critical', location='Warehouse A', now=1)
+    c, _ = correlator.correlate(3, 'D3', 'power_failure', 'critical', location='Warehouse B', now=2)
+    assert a['id'] == b['id'] != c['id']
+
+def test_storm_notifies_logarithmically_and_on_severity_rise():
+    correlator = IncidentCorrelator(renotify_factor=5)
+    notified = [i for i in range(1, 201)
+                if correlator.correlate(i, f'D{i}', 'temperature_high', 'medium', (51.5, 0.0), now=i)[1]]
+    assert notified == [1, 5, 25, 125]
+
+    _, notify = correlator.correlate(201, 'D0', 'temperature_critical', 'critical', (51.5, 0.0), now=201)
+    assert notify
+
+def test_expire_closes_quiet_incidents():
+    correlator = IncidentCorrelator(window_seconds=300)
+    correlator.correlate(1, 'D1', 'temperature_high', 'high', (51.5, 0.0), now=0)
+    assert correlator.expire(now=200) == []
+    closed = correlator.expire(now=301)
+    assert len(closed) == 1 and closed[0]['alert_count'] == 1
+    assert not correlator.incidents and not correlator.cells and correlator.get_incident(1) is None
+
+def test_incident_rebuilt_from_active_alerts():
+    alerts = [
+        {'device_id': 'D1', 'alert_type': 'power_failure', 'severity': 'high', 'created_at': '2026-01-01T10:05:00'},
+        {'device_id': 'D2', 'alert_type': 'power_failure', 'severity': 'critical', 'created_at': '2026-01-01T10:00:00'},
+        {'device_id': 'D2', 'alert_type': 'temperature_high', 'severity': 'medium', 'created_at': '2026-01-01T10:09:00'}
+    ]
+    incident = incident_from_alerts('I1', alerts, {'D1': (51.0, 0.0, 'u10hb'), 'D2': (52.0, 1.0, 'u12zz')})
+    assert incident['severity'] == 'critical'
+    assert (incident['alert_count'], incident['device_count']) == (3, 2)
+    assert incident['alert_types'] == {'power_failure': 2, 'temperature_high': 1}
+    assert incident['opened_at'] == '2026-01-01T10:00:00'
+    assert incident['centroid'] == [pytest.approx(51 + 2 / 3), pytest.approx(2 / 3)]
+    assert incident_from_alerts('I1', alerts)['centroid'] is None
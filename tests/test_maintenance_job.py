@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from models import MaintenancePrediction, SensorData
+from services.analytics_service import AnalyticsService
+from services.maintenance_job import MaintenanceBatchJob, _predict_chunk
+
+NOW = datetime.now(timezone.utc)
+
+def _add_readings(database, device_id, count, drain):
+    for i in range(count):
+        timestamp = NOW - timedelta(hours=count - i)
+        database.session.add(SensorData(device_id=device_id, temperature=5.0, sensor_type='battery_level',
+                                        value=100.0 - drain * i, timestamp=timestamp))
+        database.session.add(SensorData(device_id=device_id, temperature=5.0, sensor_type='temperature',
+                                        value=5.0 + (i % 7) * 0.1 if i % 10 else None, timestamp=timestamp))
+
+@pytest.fixture
+def fleet(database):
+    _add_readings(database, 'D1', 120, 0.5)
+    _add_readings(database, 'D2', 30, 0.1)
+    _add_readings(database, 'D3', 150, 0.2)
+    database.session.add(SensorData(device_id='D4', temperature=5.0, sensor_type='humidity', value=40.0,
+                                    timestamp=NOW - timedelta(days=40)))
+    database.session.commit()
+    return database
+
+def test_load_arrays_partitions_readings_by_device(fleet):
+    device_ids, offsets, values, codes, sensor_types = MaintenanceBatchJob()._load_arrays(NOW)
+
+    assert device_ids == ['D1', 'D2', 'D3']  # D4 is outside the history window
+    assert offsets.tolist() == [0, 240, 300, 600]
+    assert sensor_types == ['battery_level', 'temperature']
+    assert len(values) == len(codes) == 600
+
+    d2 = slice(offsets[1], offsets[2])
+    battery = values[d2][codes[d2] == 0]
+    assert battery.tolist() == [100.0 - 0.1 * i for i in range(30)]
+    assert np.isnan(values[d2][codes[d2] == 1][0])
+
+def test_predict_chunk_matches_per_device_prediction(fleet):
+    device_ids, offsets, values, codes, sensor_types = MaintenanceBatchJob()._load_arrays(NOW)
+    values_block = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    codes_block = shared_memory.SharedMemory(create=True, size=codes.nbytes)
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=values_block.buf)[:] = values
+        np.ndarray(codes.shape, dtype=codes.dtype, buffer=codes_block.buf)[:] = codes
+        devices = [(device_id, int(offsets[i]), int(offsets[i + 1])) for i, device_id in enumerate(device_ids)]
+        results = _predict_chunk(values_block.name, codes_block.name, len(values), sensor_types, devices)
+    finally:
+        for block in (values_block, codes_block):
+            block.close()
+            block.unlink()
+
+    service = AnalyticsService()
+    for device_id, result in zip(device_ids, results):
+        expected = service.predict_maintenance(device_id)
+        expected.setdefault('device_id', device_id)
+        for prediction in (result, expected):
+            prediction.pop('next_check_date', None)  # dated from now
+        assert result == expected
+
+def _store(database, computed_at):
+    record = MaintenancePrediction(device_id='D1', maintenance_score=42.0, computed_at=computed_at)
+    record.set_prediction({'device_id': 'D1', 'maintenance_score': 42.0})
+    database.session.add(record)
+    database.session.commit()
+
+def test_fresh_stored_prediction_is_served(fleet):
+    _store(fleet, NOW - timedelta(hours=1))
+    prediction = AnalyticsService().get_maintenance_prediction('D1')
+    assert prediction['maintenance_score'] == 42.0 and prediction['stale'] is False
+
+def test_stale_stored_prediction_is_recomputed(fleet):
+    _store(fleet, NOW - timedelta(days=3))
+    prediction = AnalyticsService(maintenance_max_age_hours=36).get_maintenance_prediction('D1')
+    assert prediction['maintenance_score'] != 42.0 and 'stale' not in prediction
+
+def test_stale_prediction_is_flagged_when_recompute_fails(fleet, monkeypatch):
+    _store(fleet, NOW - timedelta(days=3))
+    service = AnalyticsService()
+    monkeypatch.setattr(service, 'predict_maintenance', lambda device_id: {'error': 'database unavailable'})
+    prediction = service.get_maintenance_prediction('D1')
+    assert prediction['maintenance_score'] == 42.0 and prediction['stale'] is True
@@ -0,0 +1,77 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from services.quantile_sketch import QuantileSketch
+
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+def _values(seed, n=5000):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(1.0, 1.5) * rng.choice((1, 1, 1, -1)) for _ in range(n)]
+
+def _true_quantile(values, q):
+    # Same rank convention as the sketch: the value holding rank q * (n - 1)
+    ordered = sorted(values)
+    return ordered[int(math.floor(q * (len(ordered) - 1)))]
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+@pytest.mark.parametrize('seed', range(3))
+def test_quantiles_within_relative_accuracy(accuracy, seed):
+    values = _values(seed)
+    sketch = QuantileSketch(accuracy)
+    for value in values:
+        sketch.add(value)
+
+    for q in QUANTILES:
+        expected = _true_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= accuracy * abs(expected) + 1e-12
+
+def test_merge_matches_single_sketch():
+    values = _values(7)
+    whole = QuantileSketch()
+    parts = [QuantileSketch() for _ in range(4)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 4].add(value)
+
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(part)
+    assert merged.count == whole.count
+    for q in QUANTILES:
+        assert merged.quantile(q) == whole.quantile(q)
+
+def test_exact_moments_and_extremes():
+    values = [3.0, -1.5, 0.0, 7.25, 2.0]
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    assert sketch.min == -1.5 and sketch.max == 7.25
+    assert sketch.mean() == pytest.approx(np.mean(values))
+    assert sketch.std() == pytest.approx(np.std(values))
+    assert sketch.quantile(0) == -1.5 and sketch.quantile(1) == 7.25
+
+def test_json_round_trip_and_legacy_rows():
+    sketch = QuantileSketch()
+    for value in _values(3, 500):
+        sketch.add(value)
+    restored = QuantileSketch.from_json(sketch.to_json())
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+    assert restored.std() == pytest.approx(sketch.std())
+
+    legacy = sketch.to_json().replace(',"q":', ',"unused":')
+    assert QuantileSketch.from_json(legacy).std() is None
+
+def test_count_outside_bounds():
+    sketch = QuantileSketch()
+    for value in [10.0] * 95 + [100.0] * 5:
+        sketch.add(value)
+    assert sketch.count_outside(5.0, 50.0) == 5
+
+def test_empty_sketch():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.mean() is None and sketch.std() is None
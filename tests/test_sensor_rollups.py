@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import SensorData, SensorRollup
+from services.sensor_rollups import SensorRollupService
+
+NOW = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+@pytest.fixture
+def readings(database):
+    # Three hours of history: 10:00, 11:00 and the open 12:00 bucket
+    for minutes in range(0, 150, 10):
+        timestamp = NOW - timedelta(minutes=150) + timedelta(minutes=minutes)
+        database.session.add(SensorData(device_id='D1', temperature=float(minutes), humidity=50.0,
+                                        timestamp=timestamp))
+    database.session.commit()
+    return database
+
+def _counts():
+    return sorted((r.sensor_type, r.bucket_start.hour, r.count) for r in SensorRollup.query.all())
+
+def test_rebuild_backfills_history_and_keeps_open_bucket_live(readings):
+    rollups = SensorRollupService()
+    assert rollups.rebuild(NOW - timedelta(days=1), now=NOW) == 15
+
+    assert _counts() == [('humidity', 10, 6), ('humidity', 11, 6), ('temperature', 10, 6), ('temperature', 11, 6)]
+    assert [sketch.count for sketch in rollups.buckets.values()] == [3, 3]
+    assert rollups.get_latest('D1', 'temperature') == 140.0
+    assert rollups.get_sketch(['D1'], 'temperature', NOW - timedelta(hours=3), NOW).count == 15
+
+def test_rebuild_after_restart_does_not_double_count(readings):
+    SensorRollupService().rebuild(NOW - timedelta(days=1), now=NOW)
+
+    restarted = SensorRollupService()
+    restarted.rebuild(NOW - timedelta(days=1), now=NOW)
+    assert _counts() == [('humidity', 10, 6), ('humidity', 11, 6), ('temperature', 10, 6), ('temperature', 11, 6)]
+    assert restarted.get_sketch(['D1'], 'temperature', NOW - timedelta(hours=3), NOW).count == 15
+
+def test_rebuild_respects_since(readings):
+    rollups = SensorRollupService()
+    rollups.rebuild(NOW - timedelta(minutes=60), now=NOW)
+    assert rollups.get_sketch(['D1'], 'temperature', NOW - timedelta(hours=3), NOW).count == 6
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from services.cache_service import SingleFlight, single_flight
+
+def _wait_for_waiters(flights, key, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with flights._lock:
+            call = flights._calls.get(key)
+            if call is not None and call[3] >= count:
+                return
+        time.sleep(0.001)
+    raise AssertionError(f'{count} waiters never joined {key!r}')
+
+def _run_concurrently(flights, key, compute, callers):
+    """Start callers for one key, releasing the leader only once all have joined"""
+    release = threading.Event()
+    outcomes = [None] * callers
+
+    def gated():
+        release.wait(5)
+        return compute()
+
+    def call(index):
+        try:
+            outcomes[index] = ('ok', flights.do(key, gated))
+        except Exception as e:
+            outcomes[index] = ('error', e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    _wait_for_waiters(flights, key, callers - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    runs = []
+    outcomes = _run_concurrently(flights, 'k', lambda: runs.append(1) or {'value': 42}, callers=16)
+
+    assert len(runs) == 1
+    assert all(outcome == ('ok', {'value': 42}) for outcome in outcomes)
+    assert flights.stats == {'executions': 1, 'coalesced': 15}
+
+def test_every_waiter_receives_the_leaders_exception():
+    flights = SingleFlight()
+    failure = RuntimeError('query failed')
+
+    def compute():
+        raise failure
+
+    outcomes = _run_concurrently(flights, 'k', compute, callers=8)
+    assert all(kind == 'error' and error is failure for kind, error in outcomes)
+    assert flights.stats['executions'] == 1
+
+def test_key_is_released_after_an_error():
+    flights = SingleFlight()
+    with pytest.raises(ValueError):
+        flights.do('k', lambda: (_ for _ in ()).throw(ValueError('boom')))
+    assert not flights._calls
+    assert flights.do('k', lambda: 'retried') == 'retried'
+    assert flights.stats['executions'] == 2
+
+def test_sequential_calls_are_not_cached():
+    flights = SingleFlight()
+    assert [flights.do('k', lambda i=i: i) for i in range(3)] == [0, 1, 2]
+
+def test_decorator_coalesces_per_method_and_arguments():
+    class Service:
+        def __init__(self):
+            self.flights = SingleFlight()
+            self.release = threading.Event()
+            self.calls = []
+
+        @single_flight
+        def statistics(self, device_id, hours=24):
+            self.calls.append((device_id, hours))
+            self.release.wait(5)
+            return (device_id, hours)
+
+    service = Service()
+    results = {}
+
+    def call(name, *args, **kwargs):
+        results.setdefault(name, []).append(service.statistics(*args, **kwargs))
+
+    threads = [threading.Thread(target=call, args=('a', 'D1'), kwargs={'hours': 6}) for _ in range(3)]
+    threads.append(threading.Thread(target=call, args=('b', 'D2'), kwargs={'hours': 6}))
+    for thread in threads:
+        thread.start()
+    _wait_for_waiters(service.flights, ('statistics', "('D1',)", "[('hours', 6)]"), 2)
+    service.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(service.calls) == [('D1', 6), ('D2', 6)]
+    assert results == {'a': [('D1', 6)] * 3, 'b': [('D2', 6)]}
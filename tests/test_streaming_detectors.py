@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from services.streaming_detectors import DETECTORS, StreamingDetector, benchmark, benchmark_detector, detect_series
+
+@pytest.mark.parametrize('name', sorted(DETECTORS))
+def test_constant_series_does_not_flag_small_step(name):
+    assert detect_series([5.0] * 500 + [5.1], name)['count'] == 0
+
+@pytest.mark.parametrize('name', sorted(DETECTORS))
+def test_constant_series_flags_large_jump(name):
+    result = detect_series([5.0] * 500 + [9.0], name)
+    assert result['indices'] == [500]
+
+@pytest.mark.parametrize('name', sorted(DETECTORS))
+def test_no_flags_during_warmup(name):
+    detector = DETECTORS[name]()
+    assert detect_series([5.0] * (detector.warmup - 1) + [50.0], name)['count'] == 0
+
+def test_mad_floor_holds_after_repeats():
+    detector = DETECTORS['mad'](min_scale=0.2)
+    state = detector.new_state()
+    now = datetime.now(timezone.utc)
+    for _ in range(1000):
+        detector.update(state, 5.0, now)
+    assert state[1] == pytest.approx(0.2)
+
+def test_base_detector_is_abstract():
+    with pytest.raises(TypeError):
+        StreamingDetector()
+
+def test_benchmark_reports_every_detector():
+    results = benchmark(readings=2000)
+    assert set(results) == set(DETECTORS)
+    assert all(0 < microseconds < 1000 for microseconds in results.values())
+
+def test_benchmark_detector_accepts_params():
+    assert benchmark_detector('ewma', readings=500, alpha=0.1) > 0
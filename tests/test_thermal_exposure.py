@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+import math
+
+import pytest
+
+from services.thermal_exposure import ThermalExposureEngine
+
+START = datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)
+
+def _feed(engine, readings, device_id='D1', shipment_id=None):
+    for minutes, temperature in readings:
+        engine.record(device_id, temperature, START + timedelta(minutes=minutes), 2.0, 8.0, shipment_id)
+
+def _exposure(engine, subject_id='D1', subject_type='device'):
+    return engine.get_exposure(subject_id, START, START + timedelta(hours=1), subject_type)
+
+def test_intervals_are_held_at_the_previous_temperature(database):
+    engine = ThermalExposureEngine()
+    _feed(engine, [(0, 5.0), (10, 10.0), (20, 0.0), (30, 5.0)], shipment_id='S1')
+
+    exposure = _exposure(engine)
+    assert exposure['monitored_minutes'] == 30
+    assert exposure['high_excursion_minutes'] == 10 and exposure['low_excursion_minutes'] == 10
+    assert exposure['heat_exposure_degree_minutes'] == 20 and exposure['cold_exposure_degree_minutes'] == 20
+    assert exposure['time_in_range_percentage'] == pytest.approx(33.33)
+    assert (exposure['min_temperature'], exposure['max_temperature'], exposure['readings']) == (0.0, 10.0, 3)
+    assert _exposure(engine, 'S1', 'shipment')['monitored_minutes'] == 30
+
+def test_mean_kinetic_temperature_matches_arrhenius_average(database):
+    engine = ThermalExposureEngine(max_gap_seconds=3600)
+    _feed(engine, [(0, 4.0), (10, 12.0), (40, 4.0)])
+
+    delta_h_over_r = 83.144 * 1000 / 8.3144
+    terms = [math.exp(-delta_h_over_r / (t + 273.15)) for t in (4.0, 12.0, 12.0, 12.0)]
+    expected = delta_h_over_r / -math.log(sum(terms) / len(terms)) - 273.15
+    assert _exposure(engine)['mean_kinetic_temperature'] == pytest.approx(expected, abs=0.01)
+
+def test_gaps_beyond_max_gap_are_not_counted(database):
+    engine = ThermalExposureEngine(max_gap_seconds=600)
+    _feed(engine, [(0, 5.0), (45, 5.0)])
+    assert _exposure(engine)['monitored_minutes'] == 10
+
+def test_backfilled_reading_does_not_move_the_held_reading(database):
+    engine = ThermalExposureEngine()
+    _feed(engine, [(0, 5.0), (10, 5.0), (5, 20.0), (20, 5.0)])
+
+    exposure = _exposure(engine)
+    assert exposure['monitored_minutes'] == 20
+    assert exposure['high_excursion_minutes'] == 0
+    assert exposure['max_temperature'] == 20.0 and exposure['readings'] == 3
+    assert engine.last_readings['D1'][0] == (START + timedelta(minutes=20)).timestamp()
+
+def test_flushed_buckets_merge_with_live_ones(database):
+    engine = ThermalExposureEngine(max_gap_seconds=3600)
+    _feed(engine, [(0, 5.0), (30, 10.0), (90, 5.0)])
+    assert engine.flush(now=START + timedelta(minutes=90)) == 1
+
+    assert _exposure(engine)['high_excursion_minutes'] == 30
+    both_hours = engine.get_exposure('D1', START, START + timedelta(hours=2))
+    assert both_hours['monitored_minutes'] == 90 and both_hours['high_excursion_minutes'] == 60
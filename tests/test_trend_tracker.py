@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+import pytest
+
+from services.trend_tracker import SlidingRegression, TrendTracker
+
+@pytest.mark.parametrize('window', [2, 5, 10])
+def test_slope_matches_least_squares_over_window(window):
+    rng = random.Random(window)
+    regression = SlidingRegression(window)
+    values = []
+    for _ in range(200):
+        value = rng.uniform(-10, 10)
+        regression.add(value)
+        values.append(value)
+        recent = values[-window:]
+        expected = np.polyfit(np.arange(len(recent)), recent, 1)[0] if len(recent) > 1 else 0.0
+        assert regression.slope() == pytest.approx(expected, abs=1e-9)
+
+def test_rebuild_keeps_sums_consistent(monkeypatch):
+    monkeypatch.setattr(SlidingRegression, 'REBUILD_INTERVAL', 7)
+    regression = SlidingRegression(4)
+    for i in range(50):
+        regression.add(float(i * i % 13))
+    assert regression.sum_y == pytest.approx(sum(regression.values))
+    assert regression.sum_xy == pytest.approx(sum(x * v for x, v in enumerate(regression.values)))
+
+def test_trend_reported_once_window_is_full():
+    tracker = TrendTracker(fields=('temperature',), default_window=3)
+    assert tracker.update('D1', {'temperature': 1.0}) == ({}, [])
+    assert tracker.update('D1', {'temperature': 2.0}) == ({}, [])
+    trends, changed = tracker.update('D1', {'temperature': 3.0})
+    assert trends['temperature']['direction'] == 'increasing'
+    assert trends['temperature']['slope'] == 1.0
+    assert changed == ['temperature']
+
+def test_direction_change_reported_only_on_change():
+    tracker = TrendTracker(fields=('temperature',), default_window=3)
+    changes = [tracker.update('D1', {'temperature': t})[1] for t in (1, 2, 3, 4, 4, 4, 4, 2)]
+    assert changes == [[], [], ['temperature'], [], [], ['temperature'], [], ['temperature']]
+
+def test_missing_fields_and_reset():
+    tracker = TrendTracker(fields=('temperature', 'humidity'), default_window=2)
+    tracker.update('D1', {'temperature': 1.0})
+    trends, _ = tracker.update('D1', {'temperature': 1.0, 'humidity': 50.0})
+    assert set(trends) == {'temperature'}
+
+    tracker.reset_device('D1')
+    assert not tracker.regressions and not tracker.directions
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import DeviceConnectionInterval
+from services.heartbeat_watchdog import HeartbeatWatchdog
+from services.uptime_tracker import UptimeTracker
+
+MIDNIGHT = datetime(2026, 3, 2, tzinfo=timezone.utc)
+
+@pytest.fixture
+def tracker(database):
+    return UptimeTracker(HeartbeatWatchdog(), heartbeat_timeout_seconds=600)
+
+def _session(tracker, device_id, start_hours, end_hours):
+    tracker.connect(device_id, MIDNIGHT + timedelta(hours=start_hours))
+    tracker.disconnect(device_id, MIDNIGHT + timedelta(hours=end_hours))
+
+def test_overlapping_intervals_across_midnight_are_counted_once(tracker):
+    _session(tracker, 'D1', -6, 6)  # 18:00 to 06:00 over midnight
+    tracker._persist([('D1', MIDNIGHT - timedelta(hours=2), MIDNIGHT + timedelta(hours=1), 'disconnect')])
+
+    assert tracker.get_uptime('D1', MIDNIGHT - timedelta(days=1), MIDNIGHT + timedelta(days=1)) == 25.0
+    assert tracker.daily_cache == {
+        ('D1', (MIDNIGHT - timedelta(days=1)).date()): 6 * 3600,
+        ('D1', MIDNIGHT.date()): 6 * 3600
+    }
+    # A partial day is computed but never cached
+    assert tracker.get_uptime('D1', MIDNIGHT - timedelta(hours=12), MIDNIGHT + timedelta(hours=12)) == 50.0
+    assert len(tracker.daily_cache) == 2
+
+def test_new_session_drops_cached_days_it_touches(tracker):
+    _session(tracker, 'D1', -6, 6)
+    window = (MIDNIGHT - timedelta(days=1), MIDNIGHT + timedelta(days=1))
+    assert tracker.get_uptime('D1', *window) == 25.0
+
+    _session(tracker, 'D1', 12, 18)
+    assert ('D1', MIDNIGHT.date()) not in tracker.daily_cache
+    assert ('D1', (MIDNIGHT - timedelta(days=1)).date()) in tracker.daily_cache
+    assert tracker.get_uptime('D1', *window) == 37.5
+
+def test_stalled_open_session_counts_only_until_last_heartbeat(tracker):
+    now = datetime.now(timezone.utc)
+    tracker.connect('D1', now - timedelta(hours=2))
+    tracker.watchdog.heartbeat('D1', now - timedelta(hours=1))
+
+    assert tracker.get_uptime('D1', now - timedelta(hours=2), now) == pytest.approx(50.0, abs=0.1)
+    fleet = tracker.get_fleet_availability(now - timedelta(hours=2), now)
+    assert fleet['devices']['D1'] == pytest.approx(50.0, abs=0.1)
+
+def test_expire_stale_ends_session_at_last_heartbeat(tracker):
+    start = MIDNIGHT + timedelta(hours=1)
+    tracker.connect('D1', start)
+    tracker.watchdog.heartbeat('D1', start + timedelta(minutes=30))
+    tracker.connect('D2', start)
+    tracker.watchdog.heartbeat('D2', start + timedelta(minutes=55))
+
+    assert tracker.expire_stale(start + timedelta(hours=1)) == 1
+    row = DeviceConnectionInterval.query.one()
+    assert (row.device_id, row.end_reason) == ('D1', 'heartbeat_timeout')
+    assert row.ended_at == (start + timedelta(minutes=30)).replace(tzinfo=None)
+    assert list(tracker.open_sessions) == ['D2']
+
+    # The next heartbeat after expiry opens a fresh session
+    tracker.connect('D1', start + timedelta(hours=2))
+    assert tracker.open_sessions['D1'] == start + timedelta(hours=2)
+
+def test_fleet_availability_for_requested_devices(tracker):
+    _session(tracker, 'D1', 0, 12)
+    _session(tracker, 'D2', 6, 30)
+    fleet = tracker.get_fleet_availability(MIDNIGHT, MIDNIGHT + timedelta(days=1), ['D1', 'D2', 'D3'])
+    assert fleet['devices'] == {'D1': 50.0, 'D2': 75.0, 'D3': 0.0}
+    assert fleet['fleet_availability'] == 41.67